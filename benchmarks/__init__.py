@@ -0,0 +1 @@
+# Benchmarks for the Mergington High School Activities API
@@ -0,0 +1,88 @@
+"""
+Run the benchmark scenarios and compare them with a saved baseline
+
+    python -m benchmarks                              # every scenario, in-process
+    python -m benchmarks --target uvicorn --scale 4   # against a local server
+    python -m benchmarks --save-baseline              # record the current numbers
+    python -m benchmarks --baseline benchmarks/results/baseline-inprocess.json
+
+Results are written as JSON under benchmarks/results/. With a baseline,
+the exit status is 1 if any operation's throughput, p50 or p99 latency got
+worse by more than the threshold.
+"""
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.harness import (InProcessTarget, UvicornTarget, compare, environment,
+                                format_histogram, load_results, run_scenario, save_results)
+from benchmarks.scenarios import SCENARIOS
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def baseline_path(target):
+    return os.path.join(RESULTS_DIR, f"baseline-{target}.json")
+
+
+def report(name, result, show_histograms):
+    print(f"\n{name}: {result['requests']} requests in {result['elapsed_s']:.2f} s "
+          f"({result['throughput']:,.0f} req/s, {result['errors']} unexpected)")
+    for label, metrics in result["operations"].items():
+        statuses = " ".join(f"{status}x{count}" for status, count in metrics["statuses"].items())
+        print(f"  {label:<20} {metrics['count']:>7}  {metrics['throughput']:>9,.0f} req/s  "
+              f"p50 {metrics['p50_ms']:7.2f} ms  p90 {metrics['p90_ms']:7.2f} ms  "
+              f"p99 {metrics['p99_ms']:7.2f} ms  max {metrics['max_ms']:7.2f} ms  [{statuses}]")
+        if show_histograms:
+            print("\n".join(format_histogram(metrics["histogram"])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Mergington High School API")
+    parser.add_argument("--target", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--port", type=int, help="port for the uvicorn target (default: any free port)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run; repeat for several (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the work in every scenario")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<target>-<time>.json)")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="also store the results as this target's default baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative change that counts as a regression (default: 0.2)")
+    parser.add_argument("--histograms", action="store_true", help="print latency histograms")
+    args = parser.parse_args(argv)
+
+    target = InProcessTarget() if args.target == "inprocess" else UvicornTarget(args.port)
+    results = {"target": target.name, "scale": args.scale, "environment": environment(), "scenarios": {}}
+    try:
+        for name in args.scenario or SCENARIOS:
+            results["scenarios"][name] = run_scenario(target, SCENARIOS[name], args.scale)
+            report(name, results["scenarios"][name], args.histograms)
+    finally:
+        target.close()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{target.name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    save_results(results, output)
+    print(f"\nResults written to {output}")
+    if args.save_baseline:
+        save_results(results, baseline_path(target.name))
+        print(f"Baseline written to {baseline_path(target.name)}")
+
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        if baseline.get("target") != target.name:
+            print(f"Baseline is for the {baseline.get('target')} target; nothing compared")
+            return 0
+        regressions = compare(results, baseline, args.threshold)
+        for scenario, operation, metric, old, new in regressions:
+            print(f"REGRESSION {scenario} / {operation}: {metric} {old:,.2f} -> {new:,.2f}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Read latency while one client floods the mutation endpoints
+
+Readers poll GET /activities while a single abusive client sends
+signup/unregister pairs over many connections as fast as it can. The run
+is repeated three ways against a fresh ``python -m src.serve``: readers
+alone, the flood with admission control turned off
+(MERGINGTON_ADMISSION=off), and the flood with the default limits:
+
+    python -m benchmarks.bench_admission --seconds 5 --readers 16 --flooders 64
+
+Clients are told apart by X-Forwarded-For, which uvicorn trusts from
+localhost. Every admitted mutation invalidates the /activities snapshot, so
+an unchecked flood costs readers both event loop time and re-encoding.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_workers import REPO_ROOT, free_port, wait_until_ready
+
+FLOODER_ADDRESS = "192.0.2.1"
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(base_url, seconds, readers, flooders):
+    """Return (read latencies, mutation status counts) for one run"""
+    limits = httpx.Limits(max_connections=readers + flooders)
+    latencies = []
+    statuses = {}
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as http:
+        names = list((await http.get("/activities")).json())
+        deadline = time.perf_counter() + seconds
+
+        async def reader(number):
+            headers = {"X-Forwarded-For": f"10.0.0.{number + 1}"}
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                (await http.get("/activities", headers=headers)).raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        async def flooder(number):
+            headers = {"X-Forwarded-For": FLOODER_ADDRESS}
+            i = 0
+            while time.perf_counter() < deadline:
+                name = names[i % len(names)]
+                options = {"params": {"email": f"flood{number}-{i}@mergington.edu"}, "headers": headers}
+                for method, action in (("POST", "signup"), ("DELETE", "unregister")):
+                    response = await http.request(method, f"/activities/{name}/{action}", **options)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                i += 1
+
+        await asyncio.gather(*(reader(number) for number in range(readers)),
+                             *(flooder(number) for number in range(flooders)))
+    return sorted(latencies), statuses
+
+
+def measure(admission, seconds, readers, flooders):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.serve", "--port", str(port), "--storage", "memory",
+         "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env={**os.environ, "MERGINGTON_ADMISSION": admission},
+    )
+    try:
+        wait_until_ready(f"{base_url}/activities")
+        return asyncio.run(run(base_url, seconds, readers, flooders))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--flooders", type=int, default=64)
+    args = parser.parse_args()
+
+    runs = {
+        "reads only": ("on", 0),
+        "flood, no limits": ("off", args.flooders),
+        "flood, limited": ("on", args.flooders),
+    }
+    print(f"{args.readers} readers for {args.seconds:g}s per run")
+    for label, (admission, flooders) in runs.items():
+        latencies, statuses = measure(admission, args.seconds, args.readers, flooders)
+        line = (f"  {label:<17} {len(latencies) / args.seconds:>8,.0f} reads/s   "
+                f"p50 {percentile(latencies, 0.50) * 1000:6.2f} ms   "
+                f"p99 {percentile(latencies, 0.99) * 1000:6.2f} ms")
+        if statuses:
+            line += "   mutations: " + ", ".join(f"{count} x {status}"
+                                                  for status, count in sorted(statuses.items()))
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Latency and throughput of async handlers versus thread-pool handlers
+
+Both apps serve the same routes over the same in-memory store. The
+"threadpool" app declares them with plain ``def``, as src/app.py did before
+the handlers became coroutines, so every request takes a hop through
+anyio's worker threads. Requests go through httpx's in-process ASGI
+transport at a fixed concurrency:
+
+    python -m benchmarks.bench_async --concurrency 64 --requests 20000
+
+The workload is 80% GET /activities and 20% signup/unregister pairs.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from src.app import activities, admission, app as async_app
+from src.roster import RosterError
+from src.serialization import encode_json
+
+
+def threadpool_app(store):
+    """The same routes as src/app.py, declared as plain functions"""
+    app = FastAPI()
+    cache = {"version": None, "body": b""}
+
+    @app.exception_handler(RosterError)
+    def roster_error_handler(request: Request, exc: RosterError):
+        return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)})
+
+    @app.get("/activities")
+    def get_activities():
+        if cache["version"] != store.version:
+            cache["version"] = store.version
+            cache["body"] = encode_json(store.to_dict())
+        return Response(cache["body"], media_type="application/json")
+
+    @app.post("/activities/{activity_name}/signup")
+    def signup_for_activity(activity_name: str, email: str):
+        store.signup(activity_name, email)
+        return {"message": f"Signed up {email} for {activity_name}"}
+
+    @app.delete("/activities/{activity_name}/unregister")
+    def unregister_from_activity(activity_name: str, email: str):
+        store.unregister(activity_name, email)
+        return {"message": f"Unregistered {email} from {activity_name}"}
+
+    return app
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(app, requests, concurrency):
+    """Return (requests/sec, latencies in seconds) for one app"""
+    names = list(activities)
+    latencies = []
+
+    async def client(http, worker):
+        for i in range(worker, requests, concurrency):
+            name = names[i % len(names)]
+            email = f"bench{worker}@mergington.edu"
+            started = time.perf_counter()
+            if i % 10 == 8:
+                await http.post(f"/activities/{name}/signup", params={"email": email})
+            elif i % 10 == 9:
+                await http.delete(f"/activities/{names[(i - 1) % len(names)]}/unregister",
+                                  params={"email": email})
+            else:
+                (await http.get("/activities")).raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http, worker) for worker in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return requests / elapsed, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    # Roomy copies of the seed data so the benchmark never fills an activity
+    seed = {name: {**details, "max_participants": 10**6}
+            for name, details in activities.to_dict().items()}
+    # Every request comes from one client, which the rate limits would throttle
+    admission.enabled = False
+    apps = {"threadpool (def)": threadpool_app(activities), "async (async def)": async_app}
+
+    print(f"{args.requests} requests at concurrency {args.concurrency}")
+    for label, app in apps.items():
+        activities.clear()
+        activities.update(seed)
+        rate, latencies = asyncio.run(run(app, args.requests, args.concurrency))
+        print(f"  {label:<18} {rate:>9,.0f} req/s   "
+              f"p50 {percentile(latencies, 0.50) * 1000:6.2f} ms   "
+              f"p99 {percentile(latencies, 0.99) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cost of email validation per request
+
+Times ``normalize_email`` on realistic addresses:
+
+- uncached: every call validates from scratch (the function under the cache)
+- cached: the address was seen before, the common case for signups
+- skewed: a stream where a small set of students makes most requests,
+  through the real bounded cache
+
+    python -m benchmarks.bench_emails --calls 200000
+"""
+import argparse
+import random
+import time
+
+from src.emails import normalize_email
+
+validate = normalize_email.__wrapped__
+
+
+def addresses(count, seed=0):
+    rng = random.Random(seed)
+    spellings = ("{}@mergington.edu", "{}@Mergington.edu", " {}@mergington.edu ", "{}+clubs@mergington.edu")
+    return [rng.choice(spellings).format(f"student{rng.randrange(count)}") for _ in range(count)]
+
+
+def per_call(function, emails):
+    started = time.perf_counter()
+    for email in emails:
+        function(email)
+    return (time.perf_counter() - started) / len(emails)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--students", type=int, default=5_000)
+    args = parser.parse_args()
+
+    # Fresh string objects each time, as if parsed from separate requests
+    unique = ["".join(email) for email in addresses(args.calls)]
+    repeated = unique[:1000] * (args.calls // 1000)
+    rng = random.Random(1)
+    students = addresses(args.students, seed=2)
+    skewed = [students[min(int(rng.paretovariate(1.2)) - 1, len(students) - 1)] for _ in range(args.calls)]
+
+    normalize_email.cache_clear()
+    runs = {
+        "uncached": per_call(validate, unique),
+        "cached": per_call(normalize_email, repeated),
+    }
+    normalize_email.cache_clear()
+    runs["skewed"] = per_call(normalize_email, skewed)
+    info = normalize_email.cache_info()
+
+    print(f"{args.calls:,} calls each")
+    for label, seconds in runs.items():
+        print(f"  {label:<9} {seconds * 1e9:7.0f} ns/call")
+    print(f"  skewed cache hit rate {info.hits / (info.hits + info.misses):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Write throughput and restart time of the journal storage backend
+
+Logs ``--operations`` signups and unregistrations to a temporary directory,
+then times how long reopening it takes. This is done twice: with the
+default compaction, where a restart decodes the snapshot and replays at
+most one segment, and with compaction disabled, where every operation ever
+logged is replayed:
+
+    python -m benchmarks.bench_journal --operations 1000000 --concurrency 16
+
+The catalog holds ``--activities`` activities with a steady population of
+about ``--students`` students each, so the snapshot stays the same size
+however many operations are logged.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from src.roster import ActivityStore
+from src.storage import JournalStorage
+
+
+def make_seed(activity_count):
+    return {
+        f"Activity {i}": {
+            "description": "Benchmark activity",
+            "schedule": "Mondays, 3:00 PM - 4:00 PM",
+            "max_participants": 10**9,
+            "participants": [],
+        }
+        for i in range(activity_count)
+    }
+
+
+async def write(storage, operations, concurrency, activity_count, students):
+    """Alternate signups and unregistrations; returns operations/sec"""
+    async def client(first):
+        for i in range(first, operations, concurrency):
+            student = i // 2
+            name = f"Activity {student % activity_count}"
+            if i % 2 == 0:
+                await storage.signup(name, f"student{student}@mergington.edu")
+            elif student >= students * activity_count:
+                # Keep the population steady by retiring an older student
+                older = student - students * activity_count
+                await storage.unregister(f"Activity {older % activity_count}",
+                                         f"student{older}@mergington.edu")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(first) for first in range(concurrency)))
+    return operations / (time.perf_counter() - started)
+
+
+def measure(args, compact_every):
+    with tempfile.TemporaryDirectory() as directory:
+        storage = JournalStorage(directory, ActivityStore(make_seed(args.activities)),
+                                 compact_every=compact_every)
+        rate = asyncio.run(write(storage, args.operations, args.concurrency,
+                                 args.activities, args.students))
+        storage.close()
+
+        started = time.perf_counter()
+        store = ActivityStore()
+        JournalStorage(directory, store, compact_every=compact_every).close()
+        restart = time.perf_counter() - started
+    members = sum(len(details["participants"]) for details in store.values())
+    return rate, restart, members
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--compact-every", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{args.operations:,} operations at concurrency {args.concurrency}")
+    for label, compact_every in (("compacted", args.compact_every), ("full replay", 10**12)):
+        rate, restart, members = measure(args, compact_every)
+        print(f"  {label:<12} {rate:>9,.0f} ops/s   restart {restart * 1000:8.1f} ms   "
+              f"({members:,} memberships)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+JSON encoding cost of /activities, standard library versus the fast mode
+
+Two measurements per catalog size, the seed catalog and a generated one of
+``--activities`` activities with ``--participants`` students each:
+
+- encode: milliseconds to turn the catalog into a response body, through
+  FastAPI's default path (``jsonable_encoder`` then ``json.dumps``), with
+  ``encode_json`` and with ``encode_json_fast`` (orjson, when installed)
+- requests: GET /activities per second through the app in-process, where
+  every request follows a signup or unregistration so the snapshot has to
+  be encoded again, as under a stream of signups. The rate is given with
+  MERGINGTON_FAST_JSON off and on.
+
+    python -m benchmarks.bench_json --activities 2000 --participants 500
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+
+import src.app as app_module
+from src import serialization
+from src.serialization import FastJSONResponse, encode_json, encode_json_fast
+from tests.conftest import SEED_ACTIVITIES
+
+
+def make_catalog(activities, participants):
+    return {
+        f"Activity {i}": {
+            "description": "Benchmark activity with a description of typical length",
+            "schedule": "Mondays and Wednesdays, 3:30 PM - 5:00 PM",
+            "max_participants": 10**9,
+            "participants": [f"student{i}-{j}@mergington.edu" for j in range(participants)],
+        }
+        for i in range(activities)
+    }
+
+
+def best_of(function, data, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(data)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def set_fast_mode(enabled):
+    """What MERGINGTON_FAST_JSON=on selects at import, switched at runtime"""
+    app_module.encode_body = encode_json_fast if enabled else encode_json
+    app_module.json_response = FastJSONResponse if enabled else app_module.JSONResponse
+    app_module.activity_snapshots.encode = app_module.encode_body
+
+
+async def request_rate(requests, name):
+    """GET /activities per second, each after a roster change to ``name``"""
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        # Untimed, so the first request's setup is not counted
+        await http.get("/activities")
+        elapsed = 0.0
+        for i in range(requests):
+            op = "signup" if i % 2 == 0 else "unregister"
+            app_module.activities.apply_batch([(op, name, "bench@mergington.edu")])
+            started = time.perf_counter()
+            (await http.get("/activities", headers={"Accept-Encoding": "identity"})).raise_for_status()
+            elapsed += time.perf_counter() - started
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--activities", type=int, default=2_000)
+    parser.add_argument("--participants", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    # One client makes every request; the rate limits are not being measured
+    app_module.admission.enabled = False
+    print(f"fast encoder: {'orjson' if serialization.orjson is not None else 'standard library (orjson not installed)'}")
+    large = make_catalog(args.activities, args.participants)
+    catalogs = {
+        "seed": SEED_ACTIVITIES,
+        f"{args.activities:,} x {args.participants:,}": large,
+    }
+    for label, catalog in catalogs.items():
+        encoders = {
+            "jsonable_encoder+json": lambda data: encode_json(jsonable_encoder(data)),
+            "encode_json": encode_json,
+            "encode_json_fast": encode_json_fast,
+        }
+        size = len(encode_json(catalog))
+        print(f"  {label} catalog, {size / 1024:,.0f} KiB")
+        print("    encode   " + "   ".join(
+            f"{name} {best_of(encode, catalog, args.repeat) * 1000:8.3f} ms"
+            for name, encode in encoders.items()))
+
+        rates = []
+        for fast in (False, True):
+            set_fast_mode(fast)
+            app_module.activities.clear()
+            app_module.activities.update(catalog)
+            # Large catalogs take long enough per request that fewer will do
+            count = args.requests if size < 2**20 else max(10, args.requests // 10)
+            rates.append(asyncio.run(request_rate(count, next(iter(catalog)))))
+        print(f"    requests off {rates[0]:9,.1f} req/s   on {rates[1]:9,.1f} req/s")
+    set_fast_mode(app_module.FAST_JSON)
+
+
+if __name__ == "__main__":
+    main()
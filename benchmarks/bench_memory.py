@@ -0,0 +1,102 @@
+"""
+Memory used by rosters: plain dicts and lists versus the compact ActivityStore
+
+Builds the same memberships in each layout and measures the allocations with
+tracemalloc:
+
+- "dict/list" is the original layout: one dict per activity and a list of
+  email strings per roster. Every membership gets its own email string, as
+  it does when each signup arrives in its own request.
+- "dict+index" is the layout ActivityStore had before the compact model:
+  dict-backed rosters plus an email -> {activity: None} reverse index.
+- "compact" is the current ActivityStore: slotted records, interned student
+  IDs, array rosters and the student -> activities reverse index, filled
+  through ``signup``.
+
+    python -m benchmarks.bench_memory --memberships 10000 100000 1000000
+
+Each student joins ``--per-student`` activities. Sizes are followed by
+bytes per membership.
+"""
+import argparse
+import gc
+import tracemalloc
+
+from src.roster import ActivityStore
+
+
+def shape(memberships, per_student):
+    """``(activity, email)`` per membership, with a fresh email string each time"""
+    activities = max(per_student, memberships // 200)
+    for membership in range(memberships):
+        student, k = divmod(membership, per_student)
+        yield f"Activity {(student * 7 + k) % activities}", f"student{student}@mergington.edu"
+
+
+def activity_details():
+    return {
+        "description": "Benchmark activity",
+        "schedule": "Mondays, 3:00 PM - 4:00 PM",
+        "max_participants": 10**9,
+    }
+
+
+def build_dicts(memberships, per_student):
+    catalog = {}
+    for name, email in shape(memberships, per_student):
+        if name not in catalog:
+            catalog[name] = {**activity_details(), "participants": []}
+        catalog[name]["participants"].append(email)
+    return catalog
+
+
+def build_indexed_dicts(memberships, per_student):
+    catalog, enrollments = {}, {}
+    for name, email in shape(memberships, per_student):
+        if name not in catalog:
+            catalog[name] = {**activity_details(), "participants": {}}
+        catalog[name]["participants"][email] = None
+        enrollments.setdefault(email, {})[name] = None
+    return catalog, enrollments
+
+
+def build_store(memberships, per_student):
+    store = ActivityStore()
+    for name, email in shape(memberships, per_student):
+        if name not in store:
+            store[name] = {**activity_details(), "participants": []}
+        store.signup(name, email)
+    return store
+
+
+def measure(build, memberships, per_student):
+    """Bytes still allocated once ``build`` has returned"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        built = build(memberships, per_student)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del built
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--memberships", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--per-student", type=int, default=4)
+    args = parser.parse_args()
+
+    layouts = {"dict/list": build_dicts, "dict+index": build_indexed_dicts, "compact": build_store}
+    print(f"{args.per_student} activities per student")
+    for memberships in args.memberships:
+        sizes = {label: measure(build, memberships, args.per_student) for label, build in layouts.items()}
+        print(f"  {memberships:>9,} memberships   " + "   ".join(
+            f"{label} {size / 2**20:6.1f} MiB ({size / memberships:5.1f} B)"
+            for label, size in sizes.items()))
+
+
+if __name__ == "__main__":
+    main()
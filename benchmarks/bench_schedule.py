@@ -0,0 +1,102 @@
+"""
+Cost of schedule conflict checks and per-student schedules by catalog size
+
+For each catalog size, times:
+
+- load: storing every activity, which parses its schedule and indexes it
+- signup: a signup by a student who already holds ``--per-student`` spots,
+  including the conflict check
+- schedule: ``ActivityStore.schedule_for``, from the reverse index
+- scan: the same schedule found by scanning every roster and parsing every
+  schedule, as the app would have to without the indexes
+
+    python -m benchmarks.bench_schedule --activities 100 1000 10000
+"""
+import argparse
+import random
+import time
+
+from src.roster import ActivityStore, RosterError
+from src.schedule import DAYS, parse_schedule
+
+
+def make_catalog(count, seed=0):
+    rng = random.Random(seed)
+    catalog = {}
+    for i in range(count):
+        start = rng.randrange(7 * 60, 20 * 60, 15)
+        end = start + rng.choice((30, 45, 60, 90, 120))
+        days = " and ".join(day.capitalize() + "s" for day in rng.sample(DAYS, rng.randint(1, 2)))
+        catalog[f"Activity {i}"] = {
+            "description": "Benchmark activity",
+            "schedule": f"{days}, {start // 60 % 12 or 12}:{start % 60:02d} {'AM' if start < 720 else 'PM'}"
+                        f" - {end // 60 % 12 or 12}:{end % 60:02d} {'AM' if end < 720 else 'PM'}",
+            "max_participants": 10**9,
+            "participants": [],
+        }
+    return catalog
+
+
+def scan(store, email):
+    """The student's slots without the indexes"""
+    return sorted((day, start, end, name) for name in store
+                  if email in store[name]["participants"]
+                  for day, start, end in parse_schedule(store[name]["schedule"]))
+
+
+def per_call(function, arguments):
+    started = time.perf_counter()
+    for argument in arguments:
+        function(*argument)
+    return (time.perf_counter() - started) / len(arguments)
+
+
+def measure(count, students, per_student):
+    catalog = make_catalog(count)
+    started = time.perf_counter()
+    store = ActivityStore(catalog)
+    load = time.perf_counter() - started
+
+    rng = random.Random(1)
+    names = list(store)
+    emails = [f"student{i}@mergington.edu" for i in range(students)]
+    for email in emails:
+        for name in rng.sample(names, per_student):
+            try:
+                store.signup(name, email)
+            except RosterError:
+                pass
+
+    def signup(name, email):
+        try:
+            store.signup(name, email)
+        except RosterError:
+            pass
+
+    attempts = [(rng.choice(names), rng.choice(emails)) for _ in range(2000)]
+    lookups = [(rng.choice(emails),) for _ in range(2000)]
+    return {
+        "load": load,
+        "signup": per_call(signup, attempts),
+        "schedule": per_call(store.schedule_for, lookups),
+        "scan": per_call(lambda email: scan(store, email), lookups[:max(1, 20_000 // count)]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--activities", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--students", type=int, default=2_000)
+    parser.add_argument("--per-student", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.students:,} students trying {args.per_student} activities each")
+    for count in args.activities:
+        times = measure(count, args.students, args.per_student)
+        print(f"  {count:>7,} activities   load {times['load'] * 1000:8.1f} ms   "
+              f"signup {times['signup'] * 1e6:6.1f} us   schedule {times['schedule'] * 1e6:6.1f} us   "
+              f"scan {times['scan'] * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
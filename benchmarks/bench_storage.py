@@ -0,0 +1,71 @@
+"""
+Signup throughput of the storage backends
+
+Runs fully offline against temporary files:
+
+    python -m benchmarks.bench_storage --concurrency 16 --signups 20000
+
+Reports signups/sec for the memory backend, the journal backend, SQLite
+committing every write on its own (``max_batch=1``) and SQLite with group
+commit.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from src.roster import ActivityStore
+from src.storage import JournalStorage, MemoryStorage, SQLiteStorage
+
+
+def make_seed(activity_count):
+    return {
+        f"Activity {i}": {
+            "description": "Benchmark activity",
+            "schedule": "Mondays, 3:00 PM - 4:00 PM",
+            "max_participants": 10**9,
+            "participants": [],
+        }
+        for i in range(activity_count)
+    }
+
+
+async def run(storage, signups, concurrency, activity_count):
+    """Sign up ``signups`` distinct students and return signups/sec"""
+    async def client(first):
+        for i in range(first, signups, concurrency):
+            await storage.signup(f"Activity {i % activity_count}", f"student{i}@mergington.edu")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(first) for first in range(concurrency)))
+    return signups / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--signups", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--activities", type=int, default=50)
+    args = parser.parse_args()
+
+    seed = make_seed(args.activities)
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": lambda: MemoryStorage(ActivityStore(seed)),
+            "journal": lambda: JournalStorage(os.path.join(tmp, "journal"), ActivityStore(seed)),
+            "sqlite (max_batch=1)": lambda: SQLiteStorage(os.path.join(tmp, "single.db"), seed=seed, max_batch=1),
+            "sqlite (group commit)": lambda: SQLiteStorage(os.path.join(tmp, "batched.db"), seed=seed),
+        }
+        print(f"{args.signups} signups, {args.concurrency} concurrent clients, {args.activities} activities")
+        for label, factory in backends.items():
+            storage = factory()
+            try:
+                rate = asyncio.run(run(storage, args.signups, args.concurrency, args.activities))
+            finally:
+                storage.close()
+            print(f"  {label:<24} {rate:>12,.0f} signups/sec")
+
+
+if __name__ == "__main__":
+    main()
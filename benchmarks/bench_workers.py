@@ -0,0 +1,96 @@
+"""
+Read throughput of /activities as the number of uvicorn workers grows
+
+Starts ``python -m src.serve`` against a temporary SQLite database for each
+worker count and drives it with several client processes:
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --clients 8 --duration 10
+
+Scaling is only meaningful on a machine with at least as many cores as the
+largest worker count plus the client processes.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def client(url, duration, results):
+    """Issue GETs on one keep-alive connection until ``duration`` expires"""
+    count = 0
+    with httpx.Client() as http:
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            http.get(url).raise_for_status()
+            count += 1
+    results.put(count)
+
+
+def measure(workers, clients, duration):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/activities"
+    with tempfile.TemporaryDirectory() as tmp:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "src.serve", "--workers", str(workers), "--port", str(port),
+             "--storage", f"sqlite:///{os.path.join(tmp, 'activities.db')}", "--log-level", "warning"],
+            cwd=REPO_ROOT,
+        )
+        try:
+            wait_until_ready(url)
+            results = multiprocessing.Queue()
+            procs = [multiprocessing.Process(target=client, args=(url, duration, results))
+                     for _ in range(clients)]
+            for proc in procs:
+                proc.start()
+            total = sum(results.get() for _ in procs)
+            for proc in procs:
+                proc.join()
+        finally:
+            server.terminate()
+            server.wait()
+    return total / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{args.clients} client processes, {args.duration:.0f}s per run, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in args.workers:
+        rate = measure(workers, args.clients, args.duration)
+        baseline = baseline or rate
+        print(f"  {workers} worker(s): {rate:>10,.0f} req/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
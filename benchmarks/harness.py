@@ -0,0 +1,271 @@
+"""
+Load-generation harness for the benchmark scenarios
+
+A Target hands out an httpx.AsyncClient talking either to the app in this
+process or to a local uvicorn server, and restores the seed data before
+each scenario. run_scenario() drives a Scenario's virtual users against it
+and records per-operation latencies; the results are plain dicts that can
+be written to JSON and compared against a saved baseline.
+"""
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from tests.conftest import restore_activities
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Latency histogram buckets: upper bounds in seconds, 4 per power of ten
+# from 10 microseconds to 10 seconds
+BUCKETS = tuple(10 ** (exponent / 4) * 1e-5 for exponent in range(25))
+
+# Metrics compared against a baseline, and whether higher values are better
+COMPARED_METRICS = {"throughput": True, "p50_ms": False, "p99_ms": False}
+# Operations with fewer samples than this are too noisy to compare
+MIN_COMPARED_SAMPLES = 100
+
+
+class InProcessTarget:
+    """The FastAPI app in this process, called through httpx's ASGI transport"""
+
+    name = "inprocess"
+
+    def __init__(self):
+        from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+        from src.app import app
+        # Honour X-Forwarded-For like uvicorn does, so virtual users have their own IPs
+        self._app = ProxyHeadersMiddleware(app, trusted_hosts="127.0.0.1")
+
+    def reset(self):
+        restore_activities()
+
+    def client(self):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self._app), base_url="http://bench")
+
+    def close(self):
+        pass
+
+
+class UvicornTarget:
+    """
+    A local ``python -m src.serve`` process with in-memory storage
+
+    Restarting the server is how its state returns to the seed data, which
+    is the same catalog src/app.py and tests/conftest.py start from.
+    """
+
+    name = "uvicorn"
+
+    def __init__(self, port=None):
+        self._port = port
+        self._server = None
+
+    def reset(self):
+        self.close()
+        port = self._port or _free_port()
+        self._base_url = f"http://127.0.0.1:{port}"
+        self._server = subprocess.Popen(
+            [sys.executable, "-m", "src.serve", "--port", str(port), "--storage", "memory",
+             "--log-level", "warning"],
+            cwd=REPO_ROOT,
+        )
+        _wait_until_ready(f"{self._base_url}/activities")
+
+    def client(self):
+        limits = httpx.Limits(max_connections=256, max_keepalive_connections=256)
+        return httpx.AsyncClient(base_url=self._base_url, limits=limits, timeout=30)
+
+    def close(self):
+        if self._server is not None:
+            self._server.terminate()
+            self._server.wait()
+            self._server = None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+class Recorder:
+    """Latencies and outcomes of one scenario run, grouped by operation label"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, label, seconds, status, expected):
+        self.latencies.setdefault(label, []).append(seconds)
+        statuses = self.statuses.setdefault(label, {})
+        statuses[status] = statuses.get(status, 0) + 1
+        if status not in expected:
+            self.errors[label] = self.errors.get(label, 0) + 1
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def histogram(latencies):
+    """Counts per BUCKETS upper bound, with a final overflow bucket"""
+    counts = [0] * (len(BUCKETS) + 1)
+    for seconds in latencies:
+        position = 0 if seconds <= BUCKETS[0] else math.ceil(4 * math.log10(seconds / 1e-5))
+        counts[min(position, len(BUCKETS))] += 1
+    return counts
+
+
+def summarize(latencies, elapsed, statuses, errors):
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "histogram": histogram(latencies),
+    }
+
+
+def client_address(number):
+    return f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}"
+
+
+async def _run_users(target, scenario, scale, recorder):
+    async with target.client() as http:
+        for request in scenario.setup(scale):
+            response = await http.request(request.method, request.url, **request.options)
+            if response.status_code not in request.expected:
+                raise RuntimeError(f"{scenario.name} setup failed: {request.method} {request.url} "
+                                   f"-> {response.status_code}")
+
+        async def user(number, requests):
+            # Each virtual user is its own client as far as rate limits go
+            headers = {"X-Forwarded-For": client_address(number)}
+            for request in requests:
+                started = time.perf_counter()
+                try:
+                    response = await http.request(request.method, request.url, headers=headers,
+                                                  **request.options)
+                    status = response.status_code
+                except httpx.TransportError:
+                    status = 0
+                recorder.record(request.label, time.perf_counter() - started, status, request.expected)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(number, requests)
+                               for number, requests in enumerate(scenario.users(scale))))
+        elapsed = time.perf_counter() - started
+
+        if scenario.check is not None:
+            await scenario.check(http, recorder)
+    return elapsed
+
+
+def run_scenario(target, scenario, scale=1.0):
+    """Run one scenario from the seed data and return its results dict"""
+    target.reset()
+    recorder = Recorder()
+    elapsed = asyncio.run(_run_users(target, scenario, scale, recorder))
+    operations = {
+        label: summarize(latencies, elapsed, recorder.statuses[label], recorder.errors.get(label, 0))
+        for label, latencies in recorder.latencies.items()
+    }
+    total = sum(len(latencies) for latencies in recorder.latencies.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "errors": sum(recorder.errors.values()),
+        "operations": operations,
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def save_results(results, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Regressions of ``results`` against ``baseline`` beyond ``threshold``
+
+    Only runs against the same target are compared. Returns a list of
+    ``(scenario, operation, metric, baseline value, current value)``.
+    """
+    regressions = []
+    if results["target"] != baseline.get("target"):
+        return regressions
+    for scenario, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(scenario)
+        if previous is None:
+            continue
+        for operation, metrics in current["operations"].items():
+            before = previous["operations"].get(operation)
+            if before is None or min(before["count"], metrics["count"]) < MIN_COMPARED_SAMPLES:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                old, new = before[metric], metrics[metric]
+                if not old:
+                    continue
+                change = (new - old) / old
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append((scenario, operation, metric, old, new))
+    return regressions
+
+
+def format_histogram(counts, width=40):
+    """Text rendering of a latency histogram, skipping empty buckets at the ends"""
+    used = [i for i, count in enumerate(counts) if count]
+    if not used:
+        return []
+    peak = max(counts)
+    lines = []
+    for i in range(used[0], used[-1] + 1):
+        label = f"<= {BUCKETS[i] * 1000:9.3f} ms" if i < len(BUCKETS) else f" > {BUCKETS[-1] * 1000:9.3f} ms"
+        bar = "#" * max(1 if counts[i] else 0, round(width * counts[i] / peak))
+        lines.append(f"      {label} {counts[i]:>8} {bar}")
+    return lines
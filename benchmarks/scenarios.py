@@ -0,0 +1,168 @@
+"""
+Benchmark scenarios
+
+Each scenario starts from the seed catalog in tests/conftest.py and is
+described by the requests its virtual users send. ``users(scale)`` returns
+one request sequence per concurrent user; ``scale`` multiplies the amount
+of work so a quick smoke run and a long soak use the same definitions.
+"""
+import random
+from typing import Callable, NamedTuple, Optional
+
+from tests.conftest import SEED_ACTIVITIES
+
+
+class Request(NamedTuple):
+    """One HTTP request issued by a virtual user"""
+
+    label: str
+    method: str
+    url: str
+    options: dict = {}
+    expected: frozenset = frozenset({200})
+
+
+class Scenario(NamedTuple):
+    name: str
+    description: str
+    users: Callable
+    setup: Callable = lambda scale: []
+    # Optional coroutine (http, recorder) that raises if the run left bad state
+    check: Optional[Callable] = None
+
+
+def signup(activity, email, label="signup"):
+    # 202 means the activity was full and the student joined its waitlist
+    return Request(label, "POST", f"/activities/{activity}/signup", {"params": {"email": email}},
+                   frozenset({200, 202, 400}))
+
+
+def unregister(activity, email, label="unregister"):
+    return Request(label, "DELETE", f"/activities/{activity}/unregister", {"params": {"email": email}},
+                   frozenset({200, 400}))
+
+
+def _spots_left():
+    return {name: details["max_participants"] - len(details["participants"])
+            for name, details in SEED_ACTIVITIES.items()}
+
+
+# --- Read-heavy browsing ---------------------------------------------------
+
+def _browsing_users(scale, users=32, requests_per_user=250):
+    names = list(SEED_ACTIVITIES)
+    students = [email for details in SEED_ACTIVITIES.values() for email in details["participants"]]
+    sequences = []
+    for user in range(users):
+        rng = random.Random(user)
+        requests = []
+        for step in range(max(1, int(requests_per_user * scale))):
+            roll = rng.random()
+            if roll < 0.70:
+                requests.append(Request("list activities", "GET", "/activities"))
+            elif roll < 0.85:
+                requests.append(Request("filtered listing", "GET", "/activities",
+                                        {"params": {"has_spots": "true", "fields": "schedule,spots_left"}}))
+            elif roll < 0.95:
+                requests.append(Request("student activities", "GET",
+                                        f"/students/{rng.choice(students)}/activities"))
+            else:
+                # An occasional change keeps the snapshot cache honest. The
+                # user acts for a different student each time, as a shared
+                # computer would, so per-student rate limits don't apply
+                activity = rng.choice(names)
+                email = f"browser{user}-{step}@mergington.edu"
+                requests.append(signup(activity, email))
+                requests.append(unregister(activity, email))
+        sequences.append(requests)
+    return sequences
+
+
+BROWSING = Scenario(
+    name="browsing",
+    description="Mostly catalog reads with occasional signup/unregister pairs",
+    users=_browsing_users,
+)
+
+
+# --- Registration-opening stampede ----------------------------------------
+
+def _stampede_users(scale, students=500):
+    names = list(SEED_ACTIVITIES)
+    # Popular activities draw most of the crowd
+    weights = [len(names) - position for position in range(len(names))]
+    rng = random.Random(0)
+    return [[signup(rng.choices(names, weights)[0], f"rush{student}@mergington.edu")]
+            for student in range(max(1, int(students * scale)))]
+
+
+async def _check_no_overbooking(http, recorder):
+    catalog = (await http.get("/activities")).json()
+    for name, details in catalog.items():
+        if len(details["participants"]) > details["max_participants"]:
+            raise AssertionError(f"{name} is overbooked")
+    admitted = recorder.statuses.get("signup", {}).get(200, 0)
+    filled = sum(len(details["participants"]) - len(SEED_ACTIVITIES[name]["participants"])
+                 for name, details in catalog.items())
+    if admitted != filled:
+        raise AssertionError(f"{admitted} signups succeeded but {filled} spots were filled")
+
+
+STAMPEDE = Scenario(
+    name="stampede",
+    description="Every student tries to sign up the moment registration opens",
+    users=_stampede_users,
+    check=_check_no_overbooking,
+)
+
+
+# --- Bulk unregister -------------------------------------------------------
+
+def _bulk_emails(name, spots):
+    slug = name.lower().replace(" ", "-")
+    return [f"bulk-{slug}-{i}@mergington.edu" for i in range(spots)]
+
+
+def _bulk_body(name, emails, op):
+    return {"json": [{"activity": name, "email": email, "op": op} for email in emails]}
+
+
+def _bulk_setup(scale):
+    return [Request("bulk refill", "POST", "/activities/bulk",
+                    _bulk_body(name, _bulk_emails(name, spots), "signup"))
+            for name, spots in _spots_left().items()]
+
+
+def _bulk_users(scale, rounds=20):
+    # One user per activity: unregister every filler in one request, then
+    # refill so the next round has a full roster to clear again
+    sequences = []
+    for name, spots in _spots_left().items():
+        emails = _bulk_emails(name, spots)
+        requests = []
+        for _ in range(max(1, int(rounds * scale))):
+            requests.append(Request("bulk unregister", "POST", "/activities/bulk",
+                                    _bulk_body(name, emails, "unregister")))
+            requests.append(Request("bulk refill", "POST", "/activities/bulk",
+                                    _bulk_body(name, emails, "signup")))
+        sequences.append(requests)
+    return sequences
+
+
+async def _check_rosters_full(http, recorder):
+    catalog = (await http.get("/activities")).json()
+    for name, details in catalog.items():
+        if len(details["participants"]) != details["max_participants"]:
+            raise AssertionError(f"{name} should be full after the last refill")
+
+
+BULK_UNREGISTER = Scenario(
+    name="bulk_unregister",
+    description="Clearing full rosters with bulk unregister requests",
+    users=_bulk_users,
+    setup=_bulk_setup,
+    check=_check_rosters_full,
+)
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (BROWSING, STAMPEDE, BULK_UNREGISTER)}
@@ -0,0 +1,161 @@
+"""
+Rate limiting and admission control for mutation endpoints
+
+Two layers protect signups and unregistrations:
+
+- Token buckets per client IP and per student email cap how fast any one
+  client can mutate. Buckets live in a bounded LRU map, so a flood of new
+  keys evicts idle buckets instead of growing memory; an evicted client
+  simply starts again with a full bucket.
+- A global concurrency cap admits a fixed number of mutations at once and
+  queues a bounded number more. When the queue is full, or a request has
+  waited too long, it is shed immediately instead of piling up.
+
+Rejections carry a Retry-After value, so well-behaved clients back off
+instead of retrying in a tight loop. Reads are never limited.
+
+All of this state is per process. Under ``--workers N`` every worker has
+its own buckets and its own cap, so the limits add up across workers.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+
+class AdmissionError(Exception):
+    """A mutation that was turned away before reaching the store"""
+
+    status_code = 503
+    message = "Server is busy, please retry shortly"
+
+    def __init__(self, retry_after):
+        super().__init__(self.message)
+        self.retry_after = retry_after
+
+    @property
+    def headers(self):
+        # Retry-After is whole seconds; never tell a client to retry at once
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class RateLimited(AdmissionError):
+    status_code = 429
+    message = "Too many requests, please slow down"
+
+
+class Overloaded(AdmissionError):
+    status_code = 503
+    message = "Server is busy, please retry shortly"
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by an arbitrary string, at most ``max_keys`` of them
+
+    Each key may make ``burst`` requests at once and ``rate`` per second
+    after that.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> [tokens, last refill time], least recently used first
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def acquire(self, key):
+        """Take a token for ``key``; returns 0 or the seconds until one is available"""
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = [float(self.burst), now]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class ConcurrencyGate:
+    """
+    At most ``limit`` holders at once, with up to ``queue_size`` waiting
+
+    Must be used from the event loop. A released slot is handed straight to
+    the longest waiter, so queued requests are admitted in arrival order.
+    """
+
+    def __init__(self, limit, queue_size, timeout):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Overloaded(1)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            raise Overloaded(self.timeout) from None
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot moves to the waiter, so ``active`` is unchanged
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionControl:
+    """Per-IP and per-email rate limits in front of a ConcurrencyGate"""
+
+    def __init__(self, ip_limiter, email_limiter, gate, enabled=True):
+        self.ip_limiter = ip_limiter
+        self.email_limiter = email_limiter
+        self.gate = gate
+        self.enabled = enabled
+
+    def check_rate(self, client_ip, email=None):
+        """Raise RateLimited if the client or student is over its rate"""
+        wait = self.ip_limiter.acquire(client_ip)
+        if not wait and email is not None:
+            wait = self.email_limiter.acquire(email)
+        if wait:
+            raise RateLimited(wait)
+
+    def reset(self):
+        self.ip_limiter.clear()
+        self.email_limiter.clear()
@@ -5,22 +5,66 @@ A super simple FastAPI application that allows students to view and sign up
 for extracurricular activities at Mergington High School.
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+import asyncio
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+from typing import Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 import os
 from pathlib import Path
 
+from src.admission import AdmissionControl, AdmissionError, ConcurrencyGate, TokenBucketLimiter
+from src.assets import AssetBundle
+from src.bulk import run_import
+from src.compression import MIN_COMPRESS_SIZE, choose_encoding, compress
+from src.emails import normalize_email
+from src.events import Broadcaster, stream, watch_version
+from src.metrics import (ADMISSION_REJECTIONS, MUTATIONS_QUEUED, REGISTRY, ROSTER_REJECTIONS,
+                         SERIALIZATION, MetricsMiddleware, SlowRequestProfiler, update_occupancy)
+from src.listing import DEFAULT_FIELDS, CatalogIndexCache, parse_fields
+from src.roster import ActivityStore, NotWaitlistedError, RosterError
+from src.schedule import DAYS, format_time, parse_day, parse_time
+from src.serialization import FastJSONResponse, encode_json, encode_json_fast
+from src.snapshot import SnapshotCache
+from src.storage import open_storage
+
+
+# Sampling profiler for slow requests, e.g. MERGINGTON_PROFILE_SLOW_MS=250
+profiler = SlowRequestProfiler(
+    output=os.environ.get("MERGINGTON_PROFILE_OUTPUT", "slow-requests.folded"),
+    threshold=float(os.environ.get("MERGINGTON_PROFILE_SLOW_MS", "250")) / 1000,
+)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Started here so that it samples the event loop's thread
+    if "MERGINGTON_PROFILE_SLOW_MS" in os.environ:
+        profiler.start()
+    # Other workers' changes never pass through this process's broadcaster
+    watcher = asyncio.create_task(watch_version(roster_events, storage.version)) if storage.shared else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    profiler.stop()
+    storage.close()
+
+
 app = FastAPI(title="Mergington High School API",
-              description="API for viewing and signing up for extracurricular activities")
+              description="API for viewing and signing up for extracurricular activities",
+              lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, profiler=profiler)
 
-# Mount the static files directory
+# Static frontend, hashed and compressed once at startup
 current_dir = Path(__file__).parent
-app.mount("/static", StaticFiles(directory=os.path.join(Path(__file__).parent,
-          "static")), name="static")
+static_assets = AssetBundle(os.path.join(current_dir, "static"), prefix="/static")
 
-# In-memory activity database
-activities = {
+# In-memory activity database, also used to seed persistent backends
+activities = ActivityStore({
     "Chess Club": {
         "description": "Learn strategies and compete in chess tournaments",
         "schedule": "Fridays, 3:30 PM - 5:00 PM",
@@ -75,52 +119,304 @@ activities = {
         "max_participants": 18,
         "participants": ["mia@mergington.edu", "liam@mergington.edu"]
     }
-}
+})
+
+# Storage the endpoints read and write, e.g. MERGINGTON_STORAGE=sqlite:///activities.db
+storage = open_storage(os.environ.get("MERGINGTON_STORAGE", "memory"), activities)
+
+# Opt-in encoding with orjson, when installed, e.g. MERGINGTON_FAST_JSON=on
+FAST_JSON = os.environ.get("MERGINGTON_FAST_JSON", "off") == "on"
+encode_body = encode_json_fast if FAST_JSON else encode_json
+# Handlers return these directly, so their plain data skips jsonable_encoder
+json_response = FastJSONResponse if FAST_JSON else JSONResponse
+
+# Serialized /activities responses, rebuilt only when the storage changes
+activity_snapshots = SnapshotCache(storage, encode=encode_body)
+
+# Indexes for filtered /activities queries, rebuilt once per snapshot
+activity_index = CatalogIndexCache(activity_snapshots)
+
+# Largest page a client may request with ?limit=
+MAX_PAGE_SIZE = 500
+
+# Roster deltas pushed to browsers over /activities/events
+roster_events = Broadcaster()
+
+# Limits on signups, unregistrations and bulk imports; reads are never limited
+admission = AdmissionControl(
+    # Per client IP, e.g. MERGINGTON_RATE_PER_IP=20 for 20 per second
+    ip_limiter=TokenBucketLimiter(rate=float(os.environ.get("MERGINGTON_RATE_PER_IP", "20")),
+                                  burst=int(os.environ.get("MERGINGTON_BURST_PER_IP", "60"))),
+    # Per student, so one address cannot be hammered from many clients
+    email_limiter=TokenBucketLimiter(rate=float(os.environ.get("MERGINGTON_RATE_PER_EMAIL", "5")),
+                                     burst=int(os.environ.get("MERGINGTON_BURST_PER_EMAIL", "20"))),
+    gate=ConcurrencyGate(limit=int(os.environ.get("MERGINGTON_MAX_MUTATIONS", "64")),
+                         queue_size=int(os.environ.get("MERGINGTON_MUTATION_QUEUE", "256")),
+                         timeout=float(os.environ.get("MERGINGTON_MUTATION_TIMEOUT", "2"))),
+    enabled=os.environ.get("MERGINGTON_ADMISSION", "on") != "off",
+)
 
 
-@app.get("/")
-def root():
-    return RedirectResponse(url="/static/index.html")
+async def admit_mutation(request: Request):
+    """Dependency that rate-limits a mutation and holds a concurrency slot for it"""
+    if not admission.enabled:
+        yield
+        return
+    client_ip = request.client.host if request.client else "unknown"
+    email = request.query_params.get("email")
+    # Validation comes later; only make the spellings of one address share a bucket
+    admission.check_rate(client_ip, email.strip().casefold() if email is not None else None)
+    await admission.gate.acquire()
+    try:
+        yield
+    finally:
+        admission.gate.release()
+
+
+def publish_change(activity_name, email, change, version):
+    """Tell connected browsers about one roster change, committed as ``version``"""
+    roster_events.publish({"activity": activity_name, "email": email, "change": change,
+                           "version": version})
+
+
+def asset_response(request, path):
+    """Serve a precomputed static asset with ETag revalidation"""
+    entry = static_assets.get(path)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    asset, cache_control = entry
+    body, etag, encoding = asset.variant(choose_encoding(request.headers.get("accept-encoding")))
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": cache_control}
+    if asset.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.content_type, headers=headers)
+
+
+@app.api_route("/", methods=["GET", "HEAD"])
+async def root(request: Request):
+    """The frontend, served directly to save a redirect"""
+    return asset_response(request, "index.html")
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_file(request: Request, path: str):
+    """Static files; content-hashed names are cached as immutable"""
+    return asset_response(request, path)
 
 
 @app.get("/activities")
-def get_activities():
-    return activities
+async def get_activities(request: Request,
+                         day: Optional[str] = None,
+                         starts_after: Optional[str] = None,
+                         ends_before: Optional[str] = None,
+                         has_spots: bool = False,
+                         q: Optional[str] = None,
+                         fields: Optional[str] = None,
+                         cursor: Optional[str] = None,
+                         limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE)):
+    """
+    Get activities, with ETag revalidation and compression
+
+    Without query parameters every activity is returned. Otherwise results
+    can be filtered by ``day`` ("Friday"), start and end time ("15:30" or
+    "3:30 PM"), open spots and words in the name or description (``q``),
+    limited to some ``fields``, and paged with ``limit``; the
+    ``X-Next-Cursor`` header holds the ``cursor`` for the next page.
+    """
+    if has_spots or any(value is not None for value in
+                        (day, starts_after, ends_before, q, fields, cursor, limit)):
+        return await get_activities_page(request, day, starts_after, ends_before, has_spots,
+                                         q, fields, cursor, limit)
+    snapshot = await activity_snapshots.current()
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    body, etag, encoding = snapshot.variant(encoding)
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        # Let browsers keep the copy but revalidate it on every use
+        "Cache-Control": "no-cache",
+        # Lets clients ignore events already reflected in this snapshot
+        "X-Activities-Version": str(snapshot.version),
+    }
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
 
+_LISTING_ENCODE_TIME = SERIALIZATION.labels("listing")
 
-@app.post("/activities/{activity_name}/signup")
-def signup_for_activity(activity_name: str, email: str):
+
+async def get_activities_page(request, day, starts_after, ends_before, has_spots,
+                              q, fields, cursor, limit):
+    """Filtered and paged part of the catalog, answered from precomputed indexes"""
+    try:
+        query = {
+            "day": parse_day(day) if day else None,
+            "starts_after": parse_time(starts_after) if starts_after else None,
+            "ends_before": parse_time(ends_before) if ends_before else None,
+            "has_spots": has_spots,
+            "text": q,
+            "cursor": cursor,
+            "limit": limit,
+        }
+        selected = parse_fields(fields) if fields is not None else DEFAULT_FIELDS
+        index = await activity_index.current()
+        names, next_cursor = index.query(**query)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    started = time.perf_counter()
+    body = encode_body(index.render(names, selected))
+    _LISTING_ENCODE_TIME.observe(time.perf_counter() - started)
+    headers = {
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+        "X-Activities-Version": str(index.version),
+    }
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None and len(body) >= MIN_COMPRESS_SIZE:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# Coroutines, so FastAPI calls them inline rather than in a worker thread
+async def student_email(email: str) -> str:
+    """Dependency for the ``email`` query parameter, trimmed, case-folded and validated"""
+    return normalize_email(email)
+
+
+async def optional_student_email(email: Optional[str] = None) -> Optional[str]:
+    """Dependency for an optional ``email`` query parameter, normalized when present"""
+    return normalize_email(email) if email is not None else None
+
+
+@app.exception_handler(RosterError)
+async def roster_error_handler(request: Request, exc: RosterError):
+    ROSTER_REJECTIONS.labels(type(exc).__name__).inc()
+    return json_response(status_code=exc.status_code, content={"detail": str(exc)})
+
+
+@app.exception_handler(AdmissionError)
+async def admission_error_handler(request: Request, exc: AdmissionError):
+    ADMISSION_REJECTIONS.labels(type(exc).__name__).inc()
+    return json_response(status_code=exc.status_code, content={"detail": str(exc)},
+                        headers=exc.headers)
+
+
+@app.post("/activities/{activity_name}/signup", dependencies=[Depends(admit_mutation)])
+async def signup_for_activity(activity_name: str, email: str = Depends(student_email)):
     """Sign up a student for an activity"""
-    # Validate activity exists
-    if activity_name not in activities:
-        raise HTTPException(status_code=404, detail="Activity not found")
-
-    # Get the specific activity
-    activity = activities[activity_name]
-    
-    # Validate student is not already signed up
-    if email in activity["participants"]:
-        raise HTTPException(status_code=400, detail="Student is already signed up for this activity")
-
-    # Add student
-    activity["participants"].append(email)
-    return {"message": f"Signed up {email} for {activity_name}"}
-
-
-@app.delete("/activities/{activity_name}/unregister")
-def unregister_from_activity(activity_name: str, email: str):
-    """Unregister a student from an activity"""
-    # Validate activity exists
-    if activity_name not in activities:
-        raise HTTPException(status_code=404, detail="Activity not found")
-
-    # Get the specific activity
-    activity = activities[activity_name]
-    
-    # Validate student is currently signed up
-    if email not in activity["participants"]:
-        raise HTTPException(status_code=400, detail="Student is not signed up for this activity")
-
-    # Remove student
-    activity["participants"].remove(email)
-    return {"message": f"Unregistered {email} from {activity_name}"}
+    # Checks for unknown activities, duplicates and capacity happen
+    # atomically inside the storage backend
+    position, version = await storage.signup(activity_name, email, versioned=True)
+    if position is not None:
+        # Rosters are unchanged, so there is nothing to publish
+        roster_events.cover(version)
+        # Full: the request is queued instead of being retried by the client
+        return json_response(status_code=202, content={
+            "message": f"{activity_name} is full; added {email} to the waitlist",
+            "waitlist_position": position,
+        })
+    publish_change(activity_name, email, "added", version)
+    return json_response({"message": f"Signed up {email} for {activity_name}"})
+
+
+@app.delete("/activities/{activity_name}/unregister", dependencies=[Depends(admit_mutation)])
+async def unregister_from_activity(activity_name: str, email: str = Depends(student_email)):
+    """Unregister a student from an activity or its waitlist"""
+    promoted, version = await storage.unregister(activity_name, email, versioned=True)
+    publish_change(activity_name, email, "removed", version)
+    if promoted is None:
+        return json_response({"message": f"Unregistered {email} from {activity_name}"})
+    publish_change(activity_name, promoted, "added", version)
+    return json_response({"message": f"Unregistered {email} from {activity_name}; {promoted} moved off the waitlist",
+                          "promoted": promoted})
+
+
+@app.get("/activities/{activity_name}/waitlist")
+async def get_waitlist(activity_name: str, email: Optional[str] = Depends(optional_student_email)):
+    """The activity's waitlist in order, or one student's position on it"""
+    if email is None:
+        return json_response({"activity": activity_name, "waitlist": await storage.waitlist(activity_name)})
+    position = await storage.waitlist_position(activity_name, email)
+    if position is None:
+        raise NotWaitlistedError()
+    return json_response({"activity": activity_name, "email": email, "position": position})
+
+
+@app.post("/activities/bulk", dependencies=[Depends(admit_mutation)])
+async def bulk_update_activities(request: Request):
+    """
+    Apply many signups and unregistrations from one streamed request
+
+    The body is a JSON array or, with an ``application/x-ndjson`` content
+    type, one JSON object per line. Each operation has ``activity``,
+    ``email`` and ``op`` ("signup" or "unregister"). The response is NDJSON
+    with one result per operation followed by a summary.
+    """
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    # Results spill to disk past 1 MiB, so huge imports stay out of memory
+    results = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    summary = await run_import(storage, request.stream(), ndjson, results)
+    results.seek(0)
+    if summary["succeeded"]:
+        # One refetch is cheaper for clients than thousands of deltas. Sent
+        # even with nobody listening, so the broadcaster covers the import
+        roster_events.publish({"type": "resync", "version": await storage.version()})
+
+    def stream_results():
+        with results:
+            while chunk := results.read(64 * 1024):
+                yield chunk
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@app.get("/activities/events")
+async def activity_events():
+    """Stream roster changes as server-sent events"""
+    subscription = roster_events.subscribe()
+    return StreamingResponse(stream(roster_events, subscription), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/students/{email}/activities")
+async def get_student_activities(email: str):
+    """List the activities a student is signed up for"""
+    return json_response(await storage.activities_for(normalize_email(email)))
+
+
+@app.get("/students/{email}/schedule")
+async def get_student_schedule(email: str, day: Optional[str] = None):
+    """
+    The student's week, one entry per time slot in day and time order
+
+    ``day`` ("Friday") keeps only that day. Activities whose schedule could
+    not be parsed have no slots and are left out.
+    """
+    email = normalize_email(email)
+    try:
+        only = parse_day(day) if day else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    slots = await storage.schedule_for(email)
+    return json_response({"email": email, "schedule": [
+        {"activity": name, "day": DAYS[weekday].capitalize(),
+         "start": format_time(start), "end": format_time(end)}
+        for weekday, start, end, name in slots if only is None or weekday == only
+    ]})
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Metrics in the Prometheus text exposition format"""
+    update_occupancy((await activity_snapshots.current()).data)
+    MUTATIONS_QUEUED.set(admission.gate.queued)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
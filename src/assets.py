@@ -0,0 +1,118 @@
+"""
+Startup-time pipeline for the static frontend
+
+Every file in the static directory is read once when the app starts. Files
+other than HTML get a content-hashed name such as ``app.1a2b3c4d.js`` that
+can be cached forever, and HTML pages have their references rewritten to
+those names. Compressed variants and ETags are computed up front, so
+serving an asset is a dict lookup.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from src.compression import MIN_COMPRESS_SIZE, SUPPORTED_ENCODINGS, compress
+from src.snapshot import etag_matches
+
+# For content-hashed names, whose content can never change
+IMMUTABLE = "public, max-age=31536000, immutable"
+# For HTML and unhashed names: keep a copy, but revalidate it on every use
+REVALIDATE = "no-cache"
+
+# href="...", src="..." and CSS url(...) references
+_REFERENCE = re.compile(r"""(?P<prefix>\b(?:href|src)=|url\()(?P<quote>["']?)(?P<url>[^"')\s]+)(?P=quote)""")
+_TEXT_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+class Asset:
+    """One static file with its precomputed encodings"""
+
+    __slots__ = ("content_type", "digest", "_variants")
+
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._variants = {None: (body, f'"{self.digest}"')}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            for encoding in SUPPORTED_ENCODINGS:
+                compressed = compress(body, encoding, best=True)
+                if len(compressed) < len(body):
+                    self._variants[encoding] = (compressed, f'"{self.digest}-{encoding}"')
+
+    def variant(self, encoding):
+        """Return ``(body, etag, encoding)``, falling back to the identity coding"""
+        if encoding not in self._variants:
+            encoding = None
+        body, etag = self._variants[encoding]
+        return body, etag, encoding
+
+    def matches(self, if_none_match):
+        return etag_matches(if_none_match, self.digest)
+
+
+def _content_type(name):
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith(_TEXT_TYPES):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _hashed_name(name, body):
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{hashlib.blake2b(body, digest_size=4).hexdigest()}{extension}"
+
+
+def _rewrite(text, base, urls):
+    """Point references to known files at their hashed URLs"""
+    def replace(match):
+        url = match.group("url")
+        target = urls.get(os.path.normpath(os.path.join(base, url)).replace(os.sep, "/"))
+        if target is None:
+            return match.group(0)
+        return f"{match.group('prefix')}{match.group('quote')}{target}{match.group('quote')}"
+    return _REFERENCE.sub(replace, text)
+
+
+class AssetBundle:
+    """
+    The static files under ``directory``, served from ``prefix``
+
+    ``get(path)`` finds an asset by its hashed name or by its original
+    name, together with its Cache-Control value; only the hashed names are
+    cached as immutable.
+    """
+
+    def __init__(self, directory, prefix="/static"):
+        self.prefix = prefix.rstrip("/")
+        self._assets = {}
+        # original relative path -> public URL of the hashed copy
+        self.urls = {}
+
+        files = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                with open(path, "rb") as file:
+                    files[relative] = file.read()
+
+        # Stylesheets may reference other files, so they are rewritten
+        # before being hashed; HTML is rewritten last and never hashed
+        rank = {".css": 1, ".html": 2}
+        for name in sorted(files, key=lambda name: rank.get(os.path.splitext(name)[1], 0)):
+            body = files[name]
+            content_type = _content_type(name)
+            if name.endswith((".css", ".html")):
+                base = os.path.dirname(name)
+                body = _rewrite(body.decode("utf-8"), base, self.urls).encode("utf-8")
+            asset = Asset(body, content_type)
+            self._assets[name] = (asset, REVALIDATE)
+            if not name.endswith(".html"):
+                hashed = _hashed_name(name, body)
+                self._assets[hashed] = (asset, IMMUTABLE)
+                self.urls[name] = f"{self.prefix}/{hashed}"
+
+    def get(self, path):
+        """``(asset, cache_control)`` for a path under the prefix, or None"""
+        return self._assets.get(path)
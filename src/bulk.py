@@ -0,0 +1,226 @@
+"""
+Streaming bulk signup/unregister imports
+
+The request body is a JSON array or NDJSON stream of operations such as
+``{"activity": "Chess Club", "email": "a@mergington.edu", "op": "signup"}``,
+where ``op`` defaults to "signup". It is parsed incrementally as it
+arrives and applied to storage in batches, so an import of any size only
+holds one batch in memory. Results are written as NDJSON lines, one per
+operation, followed by a summary line.
+"""
+import codecs
+import json
+
+from src.emails import normalize_email
+from src.roster import InvalidEmailError
+
+BATCH_SIZE = 1000
+# Longest single operation accepted before the body is considered malformed
+MAX_ITEM_CHARS = 64 * 1024
+
+OPERATIONS = ("signup", "unregister")
+
+
+class BulkFormatError(ValueError):
+    """The body is not a well-formed JSON array or NDJSON stream"""
+
+
+class InvalidItem:
+    """Placeholder for an NDJSON line that is not valid JSON"""
+
+    __slots__ = ("detail",)
+
+    def __init__(self, detail):
+        self.detail = detail
+
+
+class NDJSONParser:
+    """
+    Incremental parser for newline-delimited JSON
+
+    ``feed`` and ``close`` return the items completed so far. A structural
+    problem is recorded in ``error`` and ends parsing.
+    """
+
+    def __init__(self):
+        self._tail = ""
+        self.error = None
+
+    def feed(self, text):
+        if self.error is not None:
+            return []
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()
+        if len(self._tail) > MAX_ITEM_CHARS:
+            self.error = BulkFormatError("Line too long")
+        return [self._parse(line) for line in lines if line.strip()]
+
+    def close(self):
+        tail, self._tail = self._tail, ""
+        if self.error is not None or not tail.strip():
+            return []
+        return [self._parse(tail)]
+
+    @staticmethod
+    def _parse(line):
+        # A bad line only fails its own operation
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as exc:
+            return InvalidItem(f"Invalid JSON: {exc.msg}")
+
+
+class JSONArrayParser:
+    """
+    Incremental parser for the elements of a top-level JSON array
+
+    Same interface as NDJSONParser. Elements decoded before a syntax error
+    are still returned.
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self):
+        self._buffer = ""
+        # "start" -> "first" -> ("after" <-> "item") -> "end"
+        self._state = "start"
+        self.error = None
+
+    def feed(self, text):
+        if self.error is not None:
+            return []
+        self._buffer += text
+        return self._drain(final=False)
+
+    def close(self):
+        if self.error is not None:
+            return []
+        items = self._drain(final=True)
+        if self.error is None and self._state != "end":
+            self.error = BulkFormatError("Unterminated JSON array")
+        return items
+
+    def _drain(self, final):
+        items = []
+        try:
+            self._buffer = self._drain_into(items, self._buffer, final)
+        except BulkFormatError as exc:
+            self.error = exc
+        return items
+
+    def _drain_into(self, items, buffer, final):
+        """Append complete elements to ``items`` and return the unread rest"""
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buffer):
+                return ""
+            char = buffer[pos]
+            if self._state == "start":
+                if char != "[":
+                    raise BulkFormatError("Expected a JSON array")
+                self._state, pos = "first", pos + 1
+            elif self._state == "after":
+                if char not in ",]":
+                    raise BulkFormatError(f"Expected ',' or ']' at {char!r}")
+                self._state, pos = ("item" if char == "," else "end"), pos + 1
+            elif self._state == "first" and char == "]":
+                self._state, pos = "end", pos + 1
+            elif self._state in ("first", "item"):
+                try:
+                    value, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as exc:
+                    # Most likely the element continues in the next chunk
+                    if final or len(buffer) - pos > MAX_ITEM_CHARS:
+                        raise BulkFormatError(f"Invalid JSON: {exc.msg}") from None
+                    return buffer[pos:]
+                if end == len(buffer) and not final and not isinstance(value, (dict, list)):
+                    # A scalar at the very end may still be cut short
+                    return buffer[pos:]
+                items.append(value)
+                self._state, pos = "after", end
+            else:
+                raise BulkFormatError("Unexpected data after the JSON array")
+
+
+def parse_operation(item):
+    """
+    Turn a decoded item into ``(op, activity, email)``
+
+    Raises ValueError for a malformed item and InvalidEmailError for a bad
+    address.
+    """
+    if isinstance(item, InvalidItem):
+        raise ValueError(item.detail)
+    if not isinstance(item, dict):
+        raise ValueError("Each operation must be a JSON object")
+    op, activity, email = item.get("op", "signup"), item.get("activity"), item.get("email")
+    if op not in OPERATIONS:
+        raise ValueError(f"op must be one of {', '.join(OPERATIONS)}")
+    if not isinstance(activity, str) or not isinstance(email, str):
+        raise ValueError("activity and email must be strings")
+    return op, activity, normalize_email(email)
+
+
+def _result_line(index, result=None):
+    if result is None:
+        return json.dumps({"index": index, "status": 200}) + "\n"
+    if isinstance(result, int):
+        return json.dumps({"index": index, "status": 202, "waitlist_position": result}) + "\n"
+    return json.dumps({"index": index, "status": getattr(result, "status_code", 422),
+                       "detail": str(result)}) + "\n"
+
+
+async def run_import(storage, chunks, ndjson, out):
+    """
+    Apply every operation read from ``chunks`` and write results to ``out``
+
+    ``chunks`` is an async iterator of body bytes and ``out`` a binary file.
+    Operations are applied in batches of BATCH_SIZE through
+    ``storage.apply_batch``. A malformed body stops the import; operations
+    before that point stay applied and the summary line reports the error.
+    Returns the summary dict.
+    """
+    parser = NDJSONParser() if ndjson else JSONArrayParser()
+    text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    summary = {"total": 0, "succeeded": 0, "failed": 0}
+    # Operations waiting for the next batch, and every pending result slot
+    # in input order: None for a queued operation or the parse error
+    batch, pending = [], []
+
+    async def flush():
+        applied = iter(await storage.apply_batch(batch) if batch else ())
+        for index, error in pending:
+            result = error if error is not None else next(applied)
+            # Joining a waitlist (an int position) counts as success
+            summary["failed" if isinstance(result, Exception) else "succeeded"] += 1
+            out.write(_result_line(index, result).encode())
+        batch.clear()
+        pending.clear()
+
+    async def consume(items):
+        for item in items:
+            index = summary["total"]
+            summary["total"] += 1
+            try:
+                batch.append(parse_operation(item))
+            except (ValueError, InvalidEmailError) as exc:
+                pending.append((index, exc))
+            else:
+                pending.append((index, None))
+            if len(pending) >= BATCH_SIZE:
+                await flush()
+
+    async for chunk in chunks:
+        await consume(parser.feed(text.decode(chunk)))
+        if parser.error is not None:
+            break
+    else:
+        await consume(parser.feed(text.decode(b"", final=True)))
+        await consume(parser.close())
+    if parser.error is not None:
+        summary["error"] = str(parser.error)
+    await flush()
+    out.write((json.dumps({"summary": summary}) + "\n").encode())
+    return summary
@@ -0,0 +1,58 @@
+"""
+Content negotiation helpers for pre-compressed responses
+
+Brotli is used when the optional ``brotli`` package is installed; gzip is
+always available from the standard library.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Bodies smaller than this are cheaper to send as-is
+MIN_COMPRESS_SIZE = 512
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the best supported content-coding from an Accept-Encoding header
+
+    Returns ``None`` when the client accepts none of the supported codings.
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for coding in SUPPORTED_ENCODINGS:
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def compress(body, encoding, best=False):
+    """
+    Compress ``body`` with the given content-coding
+
+    ``best`` trades CPU time for the smallest output, for bodies that are
+    compressed once and served many times.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else 5)
+    if encoding == "gzip":
+        # mtime=0 keeps the output deterministic for a given body
+        return gzip.compress(body, compresslevel=9 if best else 6, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
@@ -0,0 +1,44 @@
+"""
+Student email validation and normalization
+
+Every email that reaches the roster goes through ``normalize_email`` first,
+so ``Alex@Mergington.edu`` and ``alex@mergington.edu`` with stray
+whitespace around it are the same student. Addresses are trimmed and
+case-folded, and must be a plain ``local@domain`` address in an allowed
+domain (``mergington.edu`` unless MERGINGTON_EMAIL_DOMAINS lists others,
+comma separated).
+
+The same students sign up, unregister and look themselves up over and over,
+so results are memoized in a bounded LRU cache and a repeat costs one dict
+lookup. Rejections are not cached, so junk input cannot evict real students.
+"""
+import os
+import re
+from functools import lru_cache
+
+from src.roster import InvalidEmailError
+
+ALLOWED_DOMAINS = frozenset(
+    domain.strip().casefold()
+    for domain in os.environ.get("MERGINGTON_EMAIL_DOMAINS", "mergington.edu").split(",")
+    if domain.strip()
+)
+# Distinct addresses remembered by normalize_email
+CACHE_SIZE = 65536
+MAX_LENGTH = 254
+MAX_LOCAL_LENGTH = 64
+
+# The RFC 5322 dot-atom form, lower case only because input is case-folded
+# first; "+" tags are allowed. Quoted local parts are not.
+_LOCAL_PART = re.compile(r"[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_email(email):
+    """Canonical form of ``email``, or InvalidEmailError if it is not acceptable"""
+    email = email.strip().casefold()
+    local, _, domain = email.rpartition("@")
+    if (len(email) > MAX_LENGTH or len(local) > MAX_LOCAL_LENGTH
+            or domain not in ALLOWED_DOMAINS or not _LOCAL_PART.fullmatch(local)):
+        raise InvalidEmailError()
+    return email
@@ -0,0 +1,137 @@
+"""
+Server-sent events for roster changes
+
+Mutation handlers publish small deltas to a Broadcaster, which fans them
+out to every connected browser. Each subscriber has a bounded queue; a
+subscriber that falls behind and fills it is evicted and told to refetch
+the full catalog, so a slow client can never hold up publishers or grow
+memory without limit.
+
+Deltas only reach clients connected to the worker process that made the
+change. Each is labelled with the version its change was committed as, and
+the Broadcaster keeps track of which versions its events have covered.
+When several workers share a database, each one also runs
+``watch_version``, which polls the stored version and sends a resync when
+it finds a version no event of this worker covered, so changes made by
+other workers show up within a poll interval.
+"""
+import asyncio
+import json
+
+# Events a subscriber may fall behind by before it is evicted
+QUEUE_SIZE = 256
+# Seconds between keepalive comments on an idle stream
+KEEPALIVE_INTERVAL = 15.0
+# Seconds between checks for changes made by other workers
+POLL_INTERVAL = 1.0
+
+
+class Subscription:
+    """One connected client's queue of pending events"""
+
+    __slots__ = ("queue", "evicted")
+
+    def __init__(self, size):
+        self.queue = asyncio.Queue(maxsize=size)
+        self.evicted = False
+
+
+class Broadcaster:
+    """Fan-out of events to subscribers; must be used from the event loop"""
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._subscribers = set()
+        # Every storage version up to this one is covered by a published
+        # event, or -1 before the first. Versions covered past a gap wait in
+        # _ahead until the gap is filled
+        self.version = -1
+        self._ahead = set()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        subscription = Subscription(self._queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        """Queue ``event`` for every subscriber without ever waiting"""
+        if "version" in event:
+            if event.get("type") == "resync":
+                # Subscribers refetch everything, which covers every version before it
+                self._cover_through(event["version"])
+            else:
+                self.cover(event["version"])
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.evicted = True
+                self._subscribers.discard(subscription)
+
+    def cover(self, version):
+        """Record that subscribers need nothing more for the change committed as ``version``"""
+        if self.version < 0:
+            self.version = version
+        elif version > self.version:
+            self._ahead.add(version)
+            self._cover_through(self.version)
+            if len(self._ahead) > self._queue_size:
+                # Too far past a gap to keep track; let subscribers refetch
+                self.publish({"type": "resync", "version": max(self._ahead)})
+
+    def _cover_through(self, version):
+        self.version = max(self.version, version)
+        self._ahead = {ahead for ahead in self._ahead if ahead > self.version}
+        while self.version + 1 in self._ahead:
+            self.version += 1
+            self._ahead.remove(self.version)
+
+
+async def watch_version(broadcaster, version, interval=POLL_INTERVAL):
+    """
+    Publish a resync whenever the ``version()`` coroutine reports a change
+    no published event covered; runs until cancelled
+
+    Checked even with no subscribers, so one that connects later is not
+    sent a resync for changes made before it fetched the catalog.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        current = await version()
+        if current > broadcaster.version:
+            broadcaster.publish({"type": "resync", "version": current})
+
+
+def format_event(event):
+    """Render an event dict in text/event-stream framing"""
+    kind = event.get("type", "roster")
+    lines = []
+    if "version" in event:
+        lines.append(f"id: {event['version']}")
+    lines.append(f"event: {kind}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream(broadcaster, subscription, keepalive=KEEPALIVE_INTERVAL):
+    """Yield SSE text for ``subscription`` until the client goes away"""
+    try:
+        # Tell EventSource how long to wait before reconnecting
+        yield "retry: 3000\n\n"
+        while not subscription.evicted:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                # Comments keep proxies from closing idle connections
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event)
+        yield format_event({"type": "resync"})
+    finally:
+        broadcaster.unsubscribe(subscription)
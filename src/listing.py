@@ -0,0 +1,172 @@
+"""
+Filtered, paginated and projected views of the activity catalog
+
+A CatalogIndex is built once per snapshot version. Catalog metadata
+(descriptions and schedules) rarely changes, so the day, time and text
+indexes are carried over to the next version when it is unchanged; only
+the set of activities with open spots is recomputed after a signup.
+Queries then intersect precomputed sets instead of scanning every activity.
+"""
+import base64
+import binascii
+import bisect
+import re
+
+from src.schedule import parse_schedule
+
+# Fields a client may ask for with ?fields=; the first four are stored
+FIELDS = ("description", "schedule", "max_participants", "participants",
+          "participant_count", "spots_left")
+DEFAULT_FIELDS = FIELDS[:4]
+
+_WORD = re.compile(r"\w+")
+
+
+class ListingError(ValueError):
+    """A query parameter could not be understood"""
+
+
+def encode_cursor(name):
+    return base64.urlsafe_b64encode(name.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ListingError("Invalid cursor") from None
+
+
+def parse_fields(text):
+    """Validate a comma-separated ?fields= value"""
+    fields = tuple(field.strip() for field in text.split(",") if field.strip())
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ListingError(f"Unknown field: {unknown[0]}")
+    return fields
+
+
+class _CatalogTerms:
+    """Indexes over the parts of the catalog that signups do not change"""
+
+    __slots__ = ("key", "names", "positions", "by_day", "starts", "ends", "tokens", "by_token")
+
+    def __init__(self, key):
+        self.key = key
+        self.names = [name for name, _, _ in key]
+        self.positions = {name: position for position, name in enumerate(self.names)}
+        self.by_day = {}
+        starts, ends = [], []
+        by_token = {}
+        for name, description, schedule in key:
+            for slot in parse_schedule(schedule):
+                self.by_day.setdefault(slot.day, set()).add(name)
+                starts.append((slot.start, name))
+                ends.append((slot.end, name))
+            for token in _WORD.findall(f"{name} {description}".lower()):
+                by_token.setdefault(token, set()).add(name)
+        self.starts = sorted(starts)
+        self.ends = sorted(ends)
+        self.tokens = sorted(by_token)
+        self.by_token = by_token
+
+    def matching_prefix(self, word):
+        """Activities with a word in their name or description starting with ``word``"""
+        matches = set()
+        start = bisect.bisect_left(self.tokens, word)
+        for token in self.tokens[start:]:
+            if not token.startswith(word):
+                break
+            matches |= self.by_token[token]
+        return matches
+
+
+class CatalogIndex:
+    """Query indexes for one snapshot version of the catalog"""
+
+    def __init__(self, version, data, previous=None):
+        self.version = version
+        self.data = data
+        key = tuple((name, details["description"], details["schedule"])
+                    for name, details in data.items())
+        if previous is not None and previous._terms.key == key:
+            self._terms = previous._terms
+        else:
+            self._terms = _CatalogTerms(key)
+        self.open = {name for name, details in data.items()
+                     if len(details["participants"]) < details["max_participants"]}
+
+    def query(self, day=None, starts_after=None, ends_before=None, has_spots=False,
+              text=None, cursor=None, limit=None):
+        """
+        Names of matching activities in catalog order, and the cursor for the
+        next page (None on the last page)
+        """
+        terms = self._terms
+        candidates = []
+        if day is not None:
+            candidates.append(terms.by_day.get(day, set()))
+        if starts_after is not None:
+            start = bisect.bisect_left(terms.starts, (starts_after, ""))
+            candidates.append({name for _, name in terms.starts[start:]})
+        if ends_before is not None:
+            end = bisect.bisect_right(terms.ends, (ends_before, "\U0010ffff"))
+            candidates.append({name for _, name in terms.ends[:end]})
+        if has_spots:
+            candidates.append(self.open)
+        if text:
+            for word in _WORD.findall(text.lower()):
+                candidates.append(terms.matching_prefix(word))
+
+        start = 0
+        if cursor is not None:
+            position = terms.positions.get(decode_cursor(cursor))
+            if position is None:
+                raise ListingError("Invalid cursor")
+            start = position + 1
+
+        if candidates:
+            # Intersect from the smallest set so the work tracks the result size
+            candidates.sort(key=len)
+            matches = set(candidates[0]).intersection(*candidates[1:])
+            positions = sorted(terms.positions[name] for name in matches)
+            positions = positions[bisect.bisect_left(positions, start):]
+            names = [terms.names[position] for position in positions]
+        else:
+            names = terms.names[start:]
+
+        if limit is not None and len(names) > limit:
+            return names[:limit], encode_cursor(names[limit - 1])
+        return names, None
+
+    def render(self, names, fields=DEFAULT_FIELDS):
+        """The catalog entries for ``names`` restricted to ``fields``"""
+        result = {}
+        for name in names:
+            details = self.data[name]
+            entry = {}
+            for field in fields:
+                if field == "participant_count":
+                    entry[field] = len(details["participants"])
+                elif field == "spots_left":
+                    entry[field] = details["max_participants"] - len(details["participants"])
+                else:
+                    entry[field] = details[field]
+            result[name] = entry
+        return result
+
+
+class CatalogIndexCache:
+    """The CatalogIndex for the latest snapshot of a SnapshotCache"""
+
+    def __init__(self, snapshots):
+        self._snapshots = snapshots
+        self._index = None
+
+    async def current(self):
+        snapshot = await self._snapshots.current()
+        index = self._index
+        if index is None or index.version != snapshot.version:
+            index = CatalogIndex(snapshot.version, snapshot.data, previous=index)
+            self._index = index
+        return index
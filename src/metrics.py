@@ -0,0 +1,372 @@
+"""
+Prometheus-style metrics and request instrumentation
+
+Metrics are plain objects with preallocated fields: a counter is one
+number, a histogram a fixed list of bucket counts. Labeled children are
+created the first time a label combination is seen and reused after that,
+so recording a request is a few attribute updates and dict lookups. The
+text exposition format is only produced when /metrics is scraped.
+
+Hot-path metrics are updated from the event loop thread. Metrics that can
+be touched from other threads (lock waits) are only updated on the slow,
+contended path and take a lock there.
+
+SlowRequestProfiler is an optional sampling profiler: while enabled, a
+background thread samples the event loop thread's stack, and requests
+slower than a threshold have the samples taken during them appended to a
+file in the folded format used by flamegraph.pl and speedscope.
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Finer buckets for in-process work such as JSON encoding and lock waits
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge(Counter):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # One count per bound plus the +Inf bucket; cumulated when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Family:
+    """A named metric with zero or more labels"""
+
+    def __init__(self, kind, name, documentation, labelnames=(), bounds=None):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._bounds = bounds
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new()
+
+    def _new(self):
+        if self.kind == "histogram":
+            return Histogram(self._bounds)
+        return Gauge() if self.kind == "gauge" else Counter()
+
+    def labels(self, *values):
+        """The child for ``values``, created on first use"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._new())
+        return child
+
+    def remove_all(self):
+        if self.labelnames:
+            self._children.clear()
+
+    # Unlabeled families act as their only child
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def dec(self, amount=1):
+        self._children[()].dec(amount)
+
+    def set(self, value):
+        self._children[()].set(value)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    @property
+    def value(self):
+        return self._children[()].value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{{{labels}}} {_number(child.value)}" if labels
+                             else f"{self.name} {_number(child.value)}")
+                continue
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self._bounds + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {_number(child.sum)}")
+            lines.append(f"{self.name}_count{suffix} {child.count}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self._families = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Family("counter", name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Family("gauge", name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), bounds=LATENCY_BUCKETS):
+        return self._add(Family("histogram", name, documentation, labelnames, tuple(bounds)))
+
+    def _add(self, family):
+        self._families.append(family)
+        return family
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        return "\n".join(family.render() for family in self._families) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route and status",
+                            ("method", "route", "status"))
+REQUEST_DURATION = REGISTRY.histogram("http_request_duration_seconds",
+                                      "Time until the response was fully sent", ("method", "route"))
+IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests currently being handled")
+EVENT_STREAMS = REGISTRY.gauge("http_event_streams_open", "Server-sent event streams currently connected")
+SERIALIZATION = REGISTRY.histogram("activities_serialization_seconds",
+                                   "Time spent encoding /activities responses to JSON",
+                                   ("view",), bounds=FAST_BUCKETS)
+ROSTER_REJECTIONS = REGISTRY.counter("roster_rejections_total",
+                                     "Signups and unregistrations rejected, by reason", ("reason",))
+LOCK_CONTENDED = REGISTRY.counter("roster_lock_contended_total",
+                                  "Activity lock acquisitions that had to wait")
+LOCK_WAIT = REGISTRY.histogram("roster_lock_wait_seconds",
+                               "Time spent waiting for a contended activity lock", bounds=FAST_BUCKETS)
+ADMISSION_REJECTIONS = REGISTRY.counter("admission_rejections_total",
+                                        "Mutations turned away by rate limits or load shedding",
+                                        ("reason",))
+MUTATIONS_QUEUED = REGISTRY.gauge("admission_queued_mutations",
+                                  "Mutations waiting for a concurrency slot")
+PARTICIPANTS = REGISTRY.gauge("activity_participants", "Students signed up, per activity", ("activity",))
+CAPACITY = REGISTRY.gauge("activity_capacity", "Maximum participants, per activity", ("activity",))
+
+_contention_lock = threading.Lock()
+
+
+def acquire(lock):
+    """
+    Acquire ``lock``, timing the wait only when it is already held
+
+    The uncontended path is a single non-blocking acquire.
+    """
+    if lock.acquire(False):
+        return
+    started = time.perf_counter()
+    lock.acquire()
+    waited = time.perf_counter() - started
+    with _contention_lock:
+        LOCK_CONTENDED.inc()
+        LOCK_WAIT.observe(waited)
+
+
+def update_occupancy(catalog):
+    """Set the per-activity gauges from a ``to_dict()`` style catalog"""
+    PARTICIPANTS.remove_all()
+    CAPACITY.remove_all()
+    for name, details in catalog.items():
+        PARTICIPANTS.labels(name).set(len(details["participants"]))
+        CAPACITY.labels(name).set(details["max_participants"])
+
+
+class _RouteMetrics:
+    __slots__ = ("duration", "statuses", "method", "route")
+
+    def __init__(self, method, route):
+        self.method = method
+        self.route = route
+        self.duration = REQUEST_DURATION.labels(method, route)
+        self.statuses = {}
+
+    def status(self, code):
+        counter = self.statuses.get(code)
+        if counter is None:
+            counter = self.statuses[code] = REQUESTS.labels(self.method, self.route, str(code))
+        return counter
+
+
+def _is_event_stream(headers):
+    for name, value in headers:
+        if name.lower() == b"content-type":
+            return value.startswith(b"text/event-stream")
+    return False
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status and in-flight requests
+
+    Requests are labeled with the matched route's path template, such as
+    ``/activities/{activity_name}/signup``, so label sets stay bounded.
+
+    Server-sent event streams stay open for as long as the browser does.
+    Once their headers are sent they move from the in-flight gauge to the
+    open-streams gauge. Their latency is measured up to that point, and
+    they are never handed to the profiler.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+        # route path template -> method -> _RouteMetrics
+        self._routes = {}
+
+    def _metrics_for(self, scope):
+        path = getattr(scope.get("route"), "path", None) or "unmatched"
+        by_method = self._routes.get(path)
+        if by_method is None:
+            by_method = self._routes.setdefault(path, {})
+        metrics = by_method.get(scope["method"])
+        if metrics is None:
+            metrics = by_method[scope["method"]] = _RouteMetrics(scope["method"], path)
+        return metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stream_started = None
+
+        async def send_with_status(message):
+            nonlocal status, stream_started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if _is_event_stream(message.get("headers", ())):
+                    stream_started = time.perf_counter()
+                    IN_FLIGHT.dec()
+                    EVENT_STREAMS.inc()
+            await send(message)
+
+        profiler = self.profiler
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics = self._metrics_for(scope)
+            metrics.status(status).inc()
+            if stream_started is not None:
+                EVENT_STREAMS.dec()
+                metrics.duration.observe(stream_started - started)
+            else:
+                finished = time.perf_counter()
+                IN_FLIGHT.dec()
+                metrics.duration.observe(finished - started)
+                if profiler is not None and profiler.enabled:
+                    profiler.request_finished(metrics, started, finished)
+
+
+class SlowRequestProfiler:
+    """
+    Sampling profiler that dumps folded stacks for slow requests
+
+    Samples are of the event loop thread, so with concurrent requests a
+    slow request's samples also include whatever else the loop was doing
+    at the time; the request's route is the root frame of every stack.
+    """
+
+    def __init__(self, output, threshold=0.25, interval=0.005, history=5.0):
+        self.output = output
+        self.threshold = threshold
+        self.interval = interval
+        self.enabled = False
+        self._samples = deque(maxlen=max(1, int(history / interval)))
+        self._samples_lock = threading.Lock()
+        self._target = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, thread_id=None):
+        """Start sampling ``thread_id``, by default the calling thread"""
+        if self.enabled:
+            return
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+        self.enabled = True
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._thread.join()
+        with self._samples_lock:
+            self._samples.clear()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            with self._samples_lock:
+                self._samples.append((time.perf_counter(), ";".join(stack)))
+
+    def request_finished(self, metrics, started, finished):
+        if finished - started < self.threshold:
+            return
+        counts = {}
+        with self._samples_lock:
+            for taken, stack in self._samples:
+                if started <= taken <= finished:
+                    counts[stack] = counts.get(stack, 0) + 1
+        if not counts:
+            return
+        root = f"{metrics.method} {metrics.route}".replace(";", ",")
+        with open(self.output, "a") as file:
+            for stack, count in counts.items():
+                file.write(f"{root};{stack} {count}\n")
@@ -0,0 +1,543 @@
+"""
+Roster storage for the Mergington High School API
+
+Memory is dominated by memberships, so they are stored compactly. Every
+student email is interned once in a StudentDirectory, which gives it a
+small integer ID. A roster is an array of those IDs in signup order, four
+bytes per participant. The reverse index from student to activities holds
+an array of activity IDs per student, and is also what answers "is this
+student already signed up". Activities are ``__slots__`` records that still
+support ``activity["participants"]``. Emails and plain dicts and lists are
+only produced at the edges, by iteration, ``to_list`` and ``to_dict``.
+
+Schedules are parsed once, when an activity is stored, into weekly time
+slots kept by activity ID. A signup is refused if it overlaps an activity
+the student already holds a spot in or is waiting for, so a promotion off
+a waitlist can never double-book anyone. A second reverse index, from
+student to the waitlists they are on, sits next to the first; together
+they give those few activities directly, so the check never looks at the
+rest of the catalog.
+The same two structures answer "what is this student doing this week"
+without reading any roster.
+
+Each activity also has a FIFO waitlist: signups past capacity join it, and
+an unregistration promotes its head within the same critical section, so a
+freed spot is never visible to anyone else.
+
+Every activity has its own lock, so signups for different activities never
+wait on each other; waits for a contended lock are timed for /metrics. The
+reverse index is shared and guarded by a separate lock that is only held
+for the few dict operations that touch it. The same lock orders the
+``version`` counter, which goes up after every change so readers can
+cheaply tell whether cached output is stale.
+"""
+import threading
+from array import array
+from collections.abc import Mapping, MutableMapping
+
+from src.metrics import acquire
+from src.schedule import find_conflict, parse_schedule
+from src.waitlist import Waitlist
+
+
+class RosterError(Exception):
+    """Base class for rejected signup and unregister requests"""
+
+    status_code = 400
+    detail = "Invalid roster operation"
+
+    def __init__(self, detail=None):
+        super().__init__(detail or self.detail)
+
+
+class ActivityNotFoundError(RosterError):
+    status_code = 404
+    detail = "Activity not found"
+
+
+class AlreadySignedUpError(RosterError):
+    detail = "Student is already signed up for this activity"
+
+
+class NotSignedUpError(RosterError):
+    detail = "Student is not signed up for this activity"
+
+
+class AlreadyWaitlistedError(RosterError):
+    detail = "Student is already on the waitlist for this activity"
+
+
+class NotWaitlistedError(RosterError):
+    status_code = 404
+    detail = "Student is not on the waitlist for this activity"
+
+
+class ScheduleConflictError(RosterError):
+    detail = "Activity overlaps another activity the student is signed up for"
+
+
+class InvalidEmailError(RosterError):
+    detail = "Invalid email address"
+
+
+class StudentDirectory:
+    """
+    Interns student emails as dense integer IDs
+
+    Each email string is kept once however many activities the student is
+    in. IDs are never reused, so they stay valid for as long as the
+    directory lives.
+    """
+
+    __slots__ = ("_ids", "_emails", "_lock")
+
+    def __init__(self):
+        self._ids = {}
+        self._emails = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._emails)
+
+    def intern(self, email):
+        """ID of ``email``, assigning the next one if it is new"""
+        student = self._ids.get(email)
+        if student is None:
+            with self._lock:
+                student = self._ids.get(email)
+                if student is None:
+                    student = len(self._emails)
+                    self._emails.append(email)
+                    self._ids[email] = student
+        return student
+
+    def lookup(self, email):
+        """ID of ``email``, or None if it was never interned"""
+        return self._ids.get(email)
+
+    def email(self, student):
+        return self._emails[student]
+
+    def emails(self, students):
+        return list(map(self._emails.__getitem__, students))
+
+
+class Roster:
+    """Participant emails in signup order, stored as an array of student IDs"""
+
+    __slots__ = ("_ids", "_students")
+
+    def __init__(self, emails=(), students=None):
+        self._students = students if students is not None else StudentDirectory()
+        # dict.fromkeys drops repeats but keeps the first signup's place
+        self._ids = array("I", map(self._students.intern, dict.fromkeys(emails)))
+
+    def __contains__(self, email):
+        student = self._students.lookup(email)
+        return student is not None and student in self._ids
+
+    def __iter__(self):
+        return map(self._students.email, self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __eq__(self, other):
+        if isinstance(other, Roster):
+            return self.to_list() == other.to_list()
+        if isinstance(other, (list, tuple)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Roster({self.to_list()!r})"
+
+    def add(self, email):
+        """Add an email, returning False if it was already present"""
+        student = self._students.intern(email)
+        if student in self._ids:
+            return False
+        self._ids.append(student)
+        return True
+
+    def discard(self, email):
+        """Remove an email, returning False if it was not present"""
+        student = self._students.lookup(email)
+        return student is not None and self.remove_id(student)
+
+    def append_id(self, student):
+        # For callers that have already checked membership
+        self._ids.append(student)
+
+    def remove_id(self, student):
+        try:
+            del self._ids[self._ids.index(student)]
+        except ValueError:
+            return False
+        return True
+
+    def copy(self):
+        roster = Roster(students=self._students)
+        roster._ids = array("I", self._ids)
+        return roster
+
+    def to_list(self):
+        return self._students.emails(self._ids)
+
+
+class Activity(Mapping):
+    """
+    One activity's details and roster
+
+    A mapping over its fixed fields, so ``activity["participants"]``,
+    ``activity["max_participants"] = 20`` and ``{**activity}`` work as they
+    did when activities were plain dicts.
+    """
+
+    __slots__ = ("description", "schedule", "max_participants", "participants")
+
+    def __init__(self, description, schedule, max_participants, participants):
+        self.description = description
+        self.schedule = schedule
+        self.max_participants = max_participants
+        self.participants = participants
+
+    def __getitem__(self, field):
+        if field not in Activity.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in Activity.__slots__:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __iter__(self):
+        return iter(Activity.__slots__)
+
+    def __len__(self):
+        return len(Activity.__slots__)
+
+    def __repr__(self):
+        return f"Activity({dict(self)!r})"
+
+
+class ActivityStore(MutableMapping):
+    """
+    Mapping of activity name to Activity records backed by rosters
+
+    Assigned activities are copied into an Activity with a Roster, so plain
+    dicts (as in the seed data) can be stored directly. An optional
+    ``waitlist`` list of emails becomes the activity's waitlist.
+    Participants should be changed through ``signup`` and ``unregister`` so
+    that capacity is enforced and the reverse index stays in sync.
+    """
+
+    def __init__(self, activities=None):
+        self._activities = {}
+        self._locks = {}
+        self._waitlists = {}
+        self.students = StudentDirectory()
+        # Activity IDs for the reverse index; a deleted activity's name is None.
+        # Parsed schedules are kept alongside, by the same ID
+        self._activity_ids = {}
+        self._names = []
+        self._slots = []
+        # Student ID -> array of activity IDs in signup order, or None; the
+        # same for the waitlists each student is on
+        self._enrollments = []
+        self._waiting = []
+        self._index_lock = threading.Lock()
+        self._version = 0
+        if activities:
+            self.update(activities)
+
+    def __getitem__(self, name):
+        return self._activities[name]
+
+    def __setitem__(self, name, activity):
+        if name in self._activities:
+            del self[name]
+        details = dict(activity)
+        waitlist = Waitlist(details.pop("waitlist", ()))
+        details["participants"] = Roster(details.get("participants", ()), self.students)
+        record = Activity(**details)
+        self._locks[name] = threading.Lock()
+        self._waitlists[name] = waitlist
+        self._activities[name] = record
+        with self._index_lock:
+            activity_id = self._activity_ids[name] = len(self._names)
+            self._names.append(name)
+            self._slots.append(parse_schedule(record.schedule))
+            for student in record.participants._ids:
+                self._index(student, activity_id)
+            for email in waitlist:
+                self._index(self.students.intern(email), activity_id, waiting=True)
+            self._version += 1
+
+    def __delitem__(self, name):
+        record = self._activities.pop(name)
+        del self._locks[name]
+        waitlist = self._waitlists.pop(name)
+        with self._index_lock:
+            activity_id = self._activity_ids.pop(name)
+            self._names[activity_id] = None
+            self._slots[activity_id] = ()
+            for student in record.participants._ids:
+                self._unindex(student, activity_id)
+            for email in waitlist:
+                self._unindex(self.students.lookup(email), activity_id, waiting=True)
+            self._version += 1
+
+    def __iter__(self):
+        return iter(self._activities)
+
+    def __len__(self):
+        return len(self._activities)
+
+    def clear(self):
+        self._activities.clear()
+        self._locks.clear()
+        self._waitlists.clear()
+        with self._index_lock:
+            self.students = StudentDirectory()
+            self._activity_ids.clear()
+            self._names.clear()
+            self._enrollments.clear()
+            self._waiting.clear()
+            self._slots.clear()
+            self._version += 1
+
+    @property
+    def version(self):
+        """Counter that increases after every change to the store"""
+        return self._version
+
+    def _lookup(self, name):
+        try:
+            return self._activities[name], self._locks[name]
+        except KeyError:
+            raise ActivityNotFoundError() from None
+
+    def _enrolled(self, student, activity_id):
+        # Safe without the index lock: only the holder of the activity's
+        # lock adds or removes ``activity_id``, so the answer cannot change
+        # under the caller
+        enrollments = self._enrollments
+        held = enrollments[student] if student < len(enrollments) else None
+        return held is not None and activity_id in held
+
+    def _index(self, student, activity_id, waiting=False):
+        # Caller must hold the index lock
+        enrollments = self._waiting if waiting else self._enrollments
+        if student >= len(enrollments):
+            enrollments.extend([None] * (student + 1 - len(enrollments)))
+        held = enrollments[student]
+        if held is None:
+            enrollments[student] = array("I", (activity_id,))
+        else:
+            held.append(activity_id)
+
+    def _check_conflicts(self, student, activity_id):
+        # Caller must hold the index lock, so two overlapping signups for
+        # the same student cannot both pass before either is indexed.
+        # Spots held come first, then waitlists in the order they were joined
+        slots = self._slots[activity_id]
+        if not slots:
+            return
+        held = [held_id for index in (self._enrollments, self._waiting)
+                if student < len(index) and index[student] is not None
+                for held_id in index[student] if held_id != activity_id]
+        other = find_conflict(slots, ((held_id, self._slots[held_id]) for held_id in held))
+        if other is not None:
+            raise ScheduleConflictError(f"Schedule conflicts with {self._names[other]}")
+
+    def _unindex(self, student, activity_id, waiting=False):
+        # Caller must hold the index lock
+        enrollments = self._waiting if waiting else self._enrollments
+        held = enrollments[student]
+        held.remove(activity_id)
+        if not held:
+            enrollments[student] = None
+
+    def signup(self, name, email):
+        """
+        Atomically add a student to an activity, or to its waitlist when full
+
+        Returns None if the student got a spot, otherwise their 1-based
+        waitlist position. The duplicate and capacity checks run under the
+        activity's lock, so concurrent signups can never overbook it.
+        """
+        record, lock = self._lookup(name)
+        acquire(lock)
+        try:
+            return self._admit(name, record, email)
+        finally:
+            lock.release()
+
+    def unregister(self, name, email):
+        """
+        Atomically remove a student from an activity or its waitlist
+
+        Returns the email of the student promoted from the waitlist into the
+        freed spot, or None.
+        """
+        record, lock = self._lookup(name)
+        acquire(lock)
+        try:
+            return self._release(name, record, email)
+        finally:
+            lock.release()
+
+    def waitlist(self, name):
+        """Emails waiting for a spot in an activity, first in line first"""
+        _, lock = self._lookup(name)
+        with lock:
+            return self._waitlists[name].to_list()
+
+    def waitlist_position(self, name, email):
+        """1-based waitlist position of a student, or None if not waiting"""
+        _, lock = self._lookup(name)
+        with lock:
+            return self._waitlists[name].position(email)
+
+    def apply_batch(self, operations):
+        """
+        Apply ``(op, name, email)`` triples, where op is "signup" or "unregister"
+
+        Operations run in the given order, since a signup can depend on the
+        student's other activities. The lock of every activity involved is
+        taken once up front, in name order so that concurrent batches cannot
+        deadlock, and held for the whole batch. Returns a list with ``None``
+        for each applied operation, the waitlist position for each signup
+        that joined a waitlist, and the RosterError for each rejected one.
+        """
+        records = {}
+        for _, name, _ in operations:
+            if name not in records and name in self._activities:
+                records[name] = self._activities[name]
+        locks = [self._locks[name] for name in sorted(records)]
+        for lock in locks:
+            acquire(lock)
+        try:
+            results = []
+            for op, name, email in operations:
+                try:
+                    record = records.get(name)
+                    if record is None:
+                        raise ActivityNotFoundError()
+                    if op == "signup":
+                        results.append(self._admit(name, record, email))
+                    else:
+                        self._release(name, record, email)
+                        results.append(None)
+                except RosterError as exc:
+                    results.append(exc)
+            return results
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _admit(self, name, record, email):
+        # Caller must hold the activity's lock
+        roster = record.participants
+        student = self.students.intern(email)
+        activity_id = self._activity_ids[name]
+        if self._enrolled(student, activity_id):
+            raise AlreadySignedUpError()
+        if len(roster) >= record.max_participants:
+            waitlist = self._waitlists[name]
+            if email in waitlist:
+                raise AlreadyWaitlistedError()
+            with self._index_lock:
+                # Checked when joining the line, and the place counts as
+                # held from then on, so a promotion never needs checking
+                self._check_conflicts(student, activity_id)
+                position = waitlist.push(email)
+                self._index(student, activity_id, waiting=True)
+                self._version += 1
+            return position
+        with self._index_lock:
+            self._check_conflicts(student, activity_id)
+            roster.append_id(student)
+            self._index(student, activity_id)
+            self._version += 1
+        return None
+
+    def _release(self, name, record, email):
+        # Caller must hold the activity's lock
+        roster = record.participants
+        student = self.students.lookup(email)
+        activity_id = self._activity_ids[name]
+        if student is None or not self._enrolled(student, activity_id):
+            if not self._waitlists[name].remove(email):
+                raise NotSignedUpError()
+            with self._index_lock:
+                self._unindex(student, activity_id, waiting=True)
+                self._version += 1
+            return None
+        roster.remove_id(student)
+        promoted = None
+        if len(roster) < record.max_participants:
+            promoted = self._waitlists[name].pop()
+            if promoted is not None:
+                promoted_id = self.students.intern(promoted)
+                roster.append_id(promoted_id)
+        with self._index_lock:
+            self._unindex(student, activity_id)
+            if promoted is not None:
+                self._unindex(promoted_id, activity_id, waiting=True)
+                self._index(promoted_id, activity_id)
+            self._version += 1
+        return promoted
+
+    def activities_for(self, email):
+        """Names of the activities a student is signed up for, in signup order"""
+        student = self.students.lookup(email)
+        if student is None:
+            return []
+        with self._index_lock:
+            held = self._enrollments[student] if student < len(self._enrollments) else None
+            return [self._names[activity_id] for activity_id in held or ()]
+
+    def schedule_for(self, email):
+        """
+        ``(day, start, end, activity)`` for each weekly slot of the student's
+        activities, sorted by day and time
+        """
+        student = self.students.lookup(email)
+        if student is None:
+            return []
+        with self._index_lock:
+            held = self._enrollments[student] if student < len(self._enrollments) else None
+            slots = [(day, start, end, self._names[activity_id])
+                     for activity_id in held or ()
+                     for day, start, end in self._slots[activity_id]]
+        return sorted(slots)
+
+    def capture(self):
+        """
+        Cheap point-in-time copy of the store for encoding elsewhere
+
+        Returns ``(students, activities)``, where ``activities`` maps each
+        name to its details, a copy of its participant ID array and its
+        waitlist. Copying an ID array is a memcpy, so this is far quicker
+        than ``to_dict``. The directory only ever grows, so
+        ``students.emails`` can turn the IDs into emails later, from any
+        thread.
+        """
+        students, activities = self.students, {}
+        for name, record in list(self._activities.items()):
+            with self._locks[name]:
+                activities[name] = ((record.description, record.schedule, record.max_participants),
+                                    array("I", record.participants._ids),
+                                    self._waitlists[name].to_list())
+        return students, activities
+
+    def to_dict(self):
+        """Plain dict/list copy of every activity, ready for JSON encoding"""
+        data = {}
+        for name, record in list(self._activities.items()):
+            with self._locks[name]:
+                data[name] = {**record, "participants": record.participants.to_list()}
+        return data
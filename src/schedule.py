@@ -0,0 +1,101 @@
+"""
+Parsing of free-text activity schedules
+
+Schedules look like "Tuesdays and Thursdays, 3:30 PM - 4:30 PM". They are
+parsed into weekly time slots: a weekday (0 = Monday) plus start and end
+times in minutes after midnight. Text that does not follow this pattern
+parses to no slots rather than raising.
+"""
+import re
+from typing import NamedTuple
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+_DAY_ALIASES = {name: index for index, name in enumerate(DAYS)}
+_DAY_ALIASES.update({
+    "mon": 0, "tue": 1, "tues": 1, "wed": 2, "thu": 3, "thur": 3, "thurs": 3,
+    "fri": 4, "sat": 5, "sun": 6,
+})
+_DAY_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(_DAY_ALIASES, key=len, reverse=True)) + r")s?\b", re.IGNORECASE
+)
+_TIME = r"(\d{1,2})(?::(\d{2}))?\s*([AP]M)"
+_TIME_PATTERN = re.compile(r"^\s*" + _TIME + r"\s*$", re.IGNORECASE)
+_RANGE_PATTERN = re.compile(_TIME + r"\s*[-–]\s*" + _TIME, re.IGNORECASE)
+_CLOCK_PATTERN = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*$")
+
+
+class TimeSlot(NamedTuple):
+    """One weekly occurrence of an activity"""
+
+    day: int
+    start: int
+    end: int
+
+
+def _minutes(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if not (1 <= hour <= 12 and 0 <= minute < 60):
+        raise ValueError("Invalid time")
+    return (hour % 12 + (12 if meridiem.upper() == "PM" else 0)) * 60 + minute
+
+
+def overlaps(first, second):
+    """Whether two slots share any time; touching end and start times do not"""
+    return first.day == second.day and first.start < second.end and second.start < first.end
+
+
+def format_time(minutes):
+    """"15:30" for 930 minutes after midnight"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_day(text):
+    """Weekday index for a name such as "Friday", "fridays" or "fri" """
+    key = text.strip().lower().rstrip(".")
+    if key not in _DAY_ALIASES and key.endswith("s"):
+        key = key[:-1]
+    try:
+        return _DAY_ALIASES[key]
+    except KeyError:
+        raise ValueError(f"Unknown day: {text!r}") from None
+
+
+def parse_time(text):
+    """Minutes after midnight for "15:30" or "3:30 PM" """
+    match = _TIME_PATTERN.match(text)
+    if match:
+        return _minutes(*match.groups())
+    match = _CLOCK_PATTERN.match(text)
+    if match and int(match.group(1)) < 24 and int(match.group(2)) < 60:
+        return int(match.group(1)) * 60 + int(match.group(2))
+    raise ValueError(f"Invalid time: {text!r}")
+
+
+def parse_schedule(text):
+    """Weekly time slots described by a schedule string, sorted by day"""
+    times = _RANGE_PATTERN.search(text)
+    if times is None:
+        return ()
+    try:
+        start = _minutes(*times.groups()[:3])
+        end = _minutes(*times.groups()[3:])
+    except ValueError:
+        return ()
+    days = sorted({_DAY_ALIASES[match.group(1).lower()]
+                   for match in _DAY_PATTERN.finditer(text[:times.start()])})
+    return tuple(TimeSlot(day, start, end) for day in days)
+
+
+def find_conflict(slots, schedules):
+    """
+    Key of the first ``(key, slots)`` pair in ``schedules`` with a slot
+    overlapping one of ``slots``, or None
+    """
+    if slots:
+        for key, other_slots in schedules:
+            for other in other_slots:
+                for slot in slots:
+                    if overlaps(slot, other):
+                        return key
+    return None
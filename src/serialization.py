@@ -0,0 +1,44 @@
+"""
+JSON encoding of response bodies
+
+Handlers only ever return plain dicts, lists, strings and numbers (rosters
+leave the store through ``to_dict`` and ``to_list``), so none of the
+conversions ``jsonable_encoder`` does are needed. ``encode_json`` produces
+the exact bytes FastAPI's JSONResponse would, with the standard library.
+``encode_json_fast`` uses orjson when the optional ``orjson`` package is
+installed and falls back to ``encode_json`` otherwise; for plain data the
+two produce the same bytes.
+"""
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def encode_json(data):
+    """Encode data the same way FastAPI's JSONResponse does"""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def encode_json_fast(data):
+    """Encode plain data with orjson if it is installed, else like ``encode_json``"""
+    if orjson is None:
+        return encode_json(data)
+    return orjson.dumps(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse encoded with ``encode_json_fast``
+
+    Returning one from a handler also skips ``jsonable_encoder``, so the
+    content must already be plain data with string keys.
+    """
+
+    def render(self, content):
+        return encode_json_fast(content)
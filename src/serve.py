@@ -0,0 +1,53 @@
+"""
+Run the API under one or more uvicorn worker processes
+
+    python -m src.serve --workers 4 --storage sqlite:///activities.db
+
+Each worker is a separate process, so rosters must live in storage they can
+all see. With more than one worker the SQLite backend is required: every
+worker opens the same database file, SQLite's file locks serialize their
+writes, and each worker's /activities snapshot follows the version stored
+in the database.
+"""
+import argparse
+import os
+
+import uvicorn
+
+DEFAULT_SHARED_STORAGE = "sqlite:///activities.db"
+
+
+def resolve_storage(workers, storage):
+    """Pick the storage URL for a worker count, rejecting unsafe combinations"""
+    if storage is None:
+        storage = os.environ.get("MERGINGTON_STORAGE")
+    if storage is None:
+        return "memory" if workers == 1 else DEFAULT_SHARED_STORAGE
+    if workers > 1 and (storage == "memory" or storage.startswith("journal:")):
+        kind = storage.split(":")[0]
+        raise ValueError(f"{kind} storage cannot be shared between workers; use sqlite:///<path>")
+    return storage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Mergington High School API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--storage", help=f"storage URL (default: memory, or {DEFAULT_SHARED_STORAGE} "
+                                          "with more than one worker)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    try:
+        storage = resolve_storage(args.workers, args.storage)
+    except ValueError as exc:
+        parser.error(str(exc))
+    # Workers are spawned as new processes and inherit the environment
+    os.environ["MERGINGTON_STORAGE"] = storage
+    uvicorn.run("src.app:app", host=args.host, port=args.port, workers=args.workers,
+                log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
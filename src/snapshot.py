@@ -0,0 +1,101 @@
+"""
+Versioned, pre-serialized snapshots of the activity catalog
+
+The catalog is encoded to JSON once per store version and reused by every
+read until a mutation bumps the version. Compressed variants are built
+lazily, at most once per encoding and version.
+"""
+import asyncio
+import hashlib
+import time
+
+from src.compression import MIN_COMPRESS_SIZE, compress
+from src.metrics import SERIALIZATION
+from src.serialization import encode_json
+
+_ENCODE_TIME = SERIALIZATION.labels("snapshot")
+
+
+class Snapshot:
+    """Serialized catalog for one store version, with a strong ETag per encoding"""
+
+    __slots__ = ("version", "data", "body", "digest", "_variants")
+
+    def __init__(self, version, body, data=None):
+        self.version = version
+        # The decoded catalog, kept for indexes built from the same version
+        self.data = data
+        self.body = body
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._variants = {None: (body, f'"{self.digest}"')}
+
+    def variant(self, encoding):
+        """Return ``(body, etag, encoding)`` for the requested content-coding"""
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            body, etag = self._variants[None]
+            return body, etag, None
+        cached = self._variants.get(encoding)
+        if cached is None:
+            # Concurrent requests may race to build the same variant; both
+            # produce identical bytes, so the last write winning is harmless
+            cached = (compress(self.body, encoding), f'"{self.digest}-{encoding}"')
+            self._variants[encoding] = cached
+        return cached[0], cached[1], encoding
+
+    def matches(self, if_none_match):
+        """Whether an If-None-Match header names any variant of this snapshot"""
+        return etag_matches(if_none_match, self.digest)
+
+
+def etag_matches(if_none_match, digest):
+    """
+    Whether an If-None-Match header names ``digest`` or one of its
+    ``"digest-encoding"`` variants
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        # If-None-Match uses weak comparison, so W/ prefixes are ignored
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+class SnapshotCache:
+    """
+    Cache of the latest Snapshot of a storage backend
+
+    ``source`` must provide ``version()`` and ``to_dict()`` coroutines; the
+    version must change after every mutation. ``encode`` turns the catalog
+    into the response body.
+    """
+
+    def __init__(self, source, encode=encode_json):
+        self._source = source
+        self.encode = encode
+        self._snapshot = None
+        self._lock = asyncio.Lock()
+
+    async def current(self):
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == await self._source.version():
+            return snapshot
+        # Only one request rebuilds; the others wait and reuse its result
+        async with self._lock:
+            # Read the version before the data: a concurrent mutation can
+            # only make the snapshot newer than its label, never older
+            version = await self._source.version()
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                data = await self._source.to_dict()
+                started = time.perf_counter()
+                body = self.encode(data)
+                _ENCODE_TIME.observe(time.perf_counter() - started)
+                snapshot = Snapshot(version, body, data)
+                self._snapshot = snapshot
+            return snapshot
@@ -4,49 +4,62 @@ document.addEventListener("DOMContentLoaded", () => {
   const signupForm = document.getElementById("signup-form");
   const messageDiv = document.getElementById("message");
 
+  // Latest known state, updated in place by server-sent events
+  let activities = {};
+  let snapshotVersion = 0;
+  const activityCards = new Map();
+
+  // Function to render one activity card's contents
+  function renderActivityCard(name) {
+    const details = activities[name];
+    const spotsLeft = details.max_participants - details.participants.length;
+
+    // Create participants list HTML
+    const participantsList = details.participants.length > 0
+      ? `<div class="participants-list">
+           ${details.participants.map(participant => `
+             <div class="participant-item">
+               <span class="participant-email">${participant}</span>
+               <button class="delete-btn" onclick="unregisterParticipant('${name}', '${participant}')" title="Remove participant">
+                 <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                   <path d="M18 6L6 18M6 6l12 12"/>
+                 </svg>
+               </button>
+             </div>
+           `).join('')}
+         </div>`
+      : '<p class="no-participants">No participants yet</p>';
+
+    activityCards.get(name).innerHTML = `
+      <h4>${name}</h4>
+      <p>${details.description}</p>
+      <p><strong>Schedule:</strong> ${details.schedule}</p>
+      <p><strong>Availability:</strong> ${spotsLeft} spots left</p>
+      <div class="participants-section">
+        <h5>Current Participants:</h5>
+        ${participantsList}
+      </div>
+    `;
+  }
+
   // Function to fetch activities from API
   async function fetchActivities() {
     try {
       const response = await fetch("/activities");
-      const activities = await response.json();
+      activities = await response.json();
+      snapshotVersion = Number(response.headers.get("X-Activities-Version")) || 0;
 
-      // Clear loading message
+      // Clear loading message and any previous cards and options
       activitiesList.innerHTML = "";
+      activityCards.clear();
+      activitySelect.querySelectorAll("option:not([value=''])").forEach(option => option.remove());
 
       // Populate activities list
-      Object.entries(activities).forEach(([name, details]) => {
+      Object.keys(activities).forEach((name) => {
         const activityCard = document.createElement("div");
         activityCard.className = "activity-card";
-
-        const spotsLeft = details.max_participants - details.participants.length;
-
-        // Create participants list HTML
-        const participantsList = details.participants.length > 0 
-          ? `<div class="participants-list">
-               ${details.participants.map(participant => `
-                 <div class="participant-item">
-                   <span class="participant-email">${participant}</span>
-                   <button class="delete-btn" onclick="unregisterParticipant('${name}', '${participant}')" title="Remove participant">
-                     <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                       <path d="M18 6L6 18M6 6l12 12"/>
-                     </svg>
-                   </button>
-                 </div>
-               `).join('')}
-             </div>`
-          : '<p class="no-participants">No participants yet</p>';
-
-        activityCard.innerHTML = `
-          <h4>${name}</h4>
-          <p>${details.description}</p>
-          <p><strong>Schedule:</strong> ${details.schedule}</p>
-          <p><strong>Availability:</strong> ${spotsLeft} spots left</p>
-          <div class="participants-section">
-            <h5>Current Participants:</h5>
-            ${participantsList}
-          </div>
-        `;
-
+        activityCards.set(name, activityCard);
+        renderActivityCard(name);
         activitiesList.appendChild(activityCard);
 
         // Add option to select dropdown
@@ -61,6 +74,55 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  // Function to apply one roster change without refetching everything
+  function applyRosterChange(change) {
+    const details = activities[change.activity];
+    if (!details || change.version <= snapshotVersion) {
+      return;
+    }
+    const index = details.participants.indexOf(change.email);
+    if (change.change === "added" && index === -1) {
+      details.participants.push(change.email);
+    } else if (change.change === "removed" && index !== -1) {
+      details.participants.splice(index, 1);
+    }
+    renderActivityCard(change.activity);
+  }
+
+  // Function to subscribe to live roster changes
+  function subscribeToChanges() {
+    if (!window.EventSource) {
+      return false;
+    }
+    const events = new EventSource("/activities/events");
+    let reconnecting = false;
+
+    events.addEventListener("roster", (event) => applyRosterChange(JSON.parse(event.data)));
+    // Sent after bulk imports, when this tab fell too far behind, or when
+    // another server worker changed the rosters
+    events.addEventListener("resync", () => fetchActivities());
+    events.addEventListener("error", () => {
+      reconnecting = true;
+    });
+    events.addEventListener("open", () => {
+      // Changes may have been missed while disconnected
+      if (reconnecting) {
+        reconnecting = false;
+        fetchActivities();
+      }
+    });
+    return true;
+  }
+
+  // Without live updates, refetch after our own changes instead
+  let liveUpdates = false;
+
+  function refreshIfNotLive() {
+    if (!liveUpdates) {
+      fetchActivities();
+    }
+  }
+
   // Function to unregister a participant from an activity
   window.unregisterParticipant = async function(activityName, participantEmail) {
     if (!confirm(`Are you sure you want to remove ${participantEmail} from ${activityName}?`)) {
@@ -83,8 +145,8 @@ document.addEventListener("DOMContentLoaded", () => {
         messageDiv.className = "success";
         messageDiv.classList.remove("hidden");
 
-        // Refresh the activities list to show updated participants
-        fetchActivities();
+        // The change arrives as an event; refetch only without live updates
+        refreshIfNotLive();
 
         // Hide message after 5 seconds
         setTimeout(() => {
@@ -124,9 +186,9 @@ document.addEventListener("DOMContentLoaded", () => {
         messageDiv.textContent = result.message;
         messageDiv.className = "success";
         signupForm.reset();
-        
-        // Refresh the activities list to show the new participant
-        fetchActivities();
+
+        // The change arrives as an event; refetch only without live updates
+        refreshIfNotLive();
       } else {
         messageDiv.textContent = result.detail || "An error occurred";
         messageDiv.className = "error";
@@ -148,4 +210,5 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // Initialize app
   fetchActivities();
+  liveUpdates = subscribeToChanges();
 });
@@ -0,0 +1,31 @@
+"""
+Storage backends for the Mergington High School API
+
+The endpoints only talk to a Storage. ``open_storage`` picks the backend
+from a URL such as ``memory``, ``journal:///path/to/directory`` or
+``sqlite:///path/to/activities.db``.
+"""
+from src.storage.base import Storage
+from src.storage.journal import JournalStorage
+from src.storage.memory import MemoryStorage
+from src.storage.sqlite import SQLiteStorage
+
+
+def open_storage(url, activities):
+    """
+    Open the storage backend named by ``url``
+
+    ``activities`` is the in-process ActivityStore. The memory backend
+    serves it directly and the journal backend restores it from disk; other
+    backends use it to seed an empty database.
+    """
+    if url == "memory":
+        return MemoryStorage(activities)
+    if url.startswith("journal:///"):
+        return JournalStorage(url[len("journal:///"):], activities)
+    if url.startswith("sqlite:///"):
+        return SQLiteStorage(url[len("sqlite:///"):], seed=activities.to_dict())
+    raise ValueError(f"Unknown storage URL: {url!r}")
+
+
+__all__ = ["Storage", "MemoryStorage", "JournalStorage", "SQLiteStorage", "open_storage"]
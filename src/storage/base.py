@@ -0,0 +1,80 @@
+"""
+Storage interface shared by every backend
+"""
+from abc import ABC, abstractmethod
+
+
+class Storage(ABC):
+    """
+    Persistence for activities and their rosters
+
+    Every data method is a coroutine so request handlers can await storage
+    without tying up a thread. Mutations raise the RosterError subclasses
+    from ``src.roster`` when a request is rejected, whichever backend is in
+    use. Called with ``versioned=True``, a mutation returns
+    ``(result, version)`` instead, where ``version`` is the one the change
+    was committed as, even if other writers have committed since.
+    """
+
+    # Whether other processes may change the data behind this backend
+    shared = False
+
+    @abstractmethod
+    async def version(self):
+        """Counter that changes after every committed mutation"""
+
+    @abstractmethod
+    async def to_dict(self):
+        """Every activity as plain JSON-ready dicts and lists"""
+
+    @abstractmethod
+    async def signup(self, name, email, *, versioned=False):
+        """
+        Atomically add a student to an activity, or to its waitlist when full
+
+        Returns None if the student got a spot, otherwise their 1-based
+        waitlist position. When several errors apply, the first of these is
+        raised: already signed up, already waitlisted (full activities only),
+        schedule conflict.
+        """
+
+    @abstractmethod
+    async def unregister(self, name, email, *, versioned=False):
+        """
+        Atomically remove a student from an activity or its waitlist
+
+        A spot freed in the activity goes to the head of the waitlist in the
+        same transaction. Returns the promoted student's email, or None.
+        """
+
+    @abstractmethod
+    async def apply_batch(self, operations, *, versioned=False):
+        """
+        Apply a list of ``(op, name, email)`` triples in one pass
+
+        ``op`` is "signup" or "unregister". Returns one entry per operation:
+        ``None`` if it was applied, the waitlist position if a signup joined
+        the waitlist, otherwise the RosterError rejecting it.
+        """
+
+    @abstractmethod
+    async def activities_for(self, email):
+        """Names of the activities a student is signed up for"""
+
+    @abstractmethod
+    async def schedule_for(self, email):
+        """
+        ``(day, start, end, activity)`` for each weekly slot of the student's
+        activities, sorted by day and time
+        """
+
+    @abstractmethod
+    async def waitlist(self, name):
+        """Emails on an activity's waitlist, first in line first"""
+
+    @abstractmethod
+    async def waitlist_position(self, name, email):
+        """1-based waitlist position of a student, or None if not waiting"""
+
+    def close(self):
+        """Release any resources held by the backend"""
@@ -0,0 +1,401 @@
+"""
+In-memory storage made durable by an append-only mutation journal
+
+Rosters live in an ActivityStore exactly as with the memory backend. Every
+accepted mutation is also appended to a journal file, and the request is
+only answered once the journal has been fsynced. Appends are handed to a
+single writer thread, which writes everything queued since its last sync
+with one write and one fsync, so a burst of signups shares one sync.
+
+Each journal record is a frame holding its payload length, a CRC32 of the
+payload and the payload: the operations passed to one call, replayed
+through ``ActivityStore.apply_batch`` on restart. A crash can leave a torn
+frame at the end of the journal; recovery stops at the first frame whose
+length or checksum is wrong and truncates it away.
+
+Every ``compact_every`` records the journal is compacted: a binary snapshot
+of the whole store is written next to it and later appends go to a new
+journal segment, after which the old segments are deleted. The event loop
+only takes an ``ActivityStore.capture``, which copies ID arrays; turning
+it into emails and encoding the snapshot happen on the writer thread. On startup the
+snapshot is memory-mapped and decoded, then only the segments written
+since it are replayed, so restart time depends on the size of the catalog
+rather than on the number of operations ever logged.
+
+Mutations are applied to the store before they are journaled, so a failed
+write or fsync leaves memory ahead of the disk. The backend then fails
+hard: every later call raises JournalError until the process is restarted
+and recovers from what the journal holds.
+
+The directory holds ``snapshot.bin`` and ``journal-<segment>.log`` files.
+Only one process may use a directory at a time.
+"""
+import asyncio
+import mmap
+import os
+import queue
+import struct
+import threading
+import zlib
+from concurrent.futures import Future
+
+from src.storage.memory import MemoryStorage
+
+SNAPSHOT_MAGIC = b"MHSSNAP1"
+SNAPSHOT_NAME = "snapshot.bin"
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".log"
+
+# Frame header: payload length and CRC32 of the payload
+FRAME = struct.Struct("<II")
+# Snapshot header after the magic: first segment to replay, activity count
+SNAPSHOT_HEADER = struct.Struct("<QI")
+COUNT = struct.Struct("<I")
+OPS = {"signup": 0, "unregister": 1}
+OP_NAMES = {code: op for op, code in OPS.items()}
+
+
+class JournalError(Exception):
+    """The journal or snapshot is damaged somewhere a crash cannot explain"""
+
+
+def _pack_text(parts, text):
+    data = text.encode()
+    parts.append(COUNT.pack(len(data)))
+    parts.append(data)
+
+
+def _unpack_text(buffer, offset):
+    (length,) = COUNT.unpack_from(buffer, offset)
+    offset += COUNT.size
+    return bytes(buffer[offset:offset + length]).decode(), offset + length
+
+
+def encode_record(operations):
+    """One journal frame for a list of ``(op, name, email)`` triples"""
+    parts = [COUNT.pack(len(operations))]
+    for op, name, email in operations:
+        parts.append(bytes((OPS[op],)))
+        _pack_text(parts, name)
+        _pack_text(parts, email)
+    payload = b"".join(parts)
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_records(data):
+    """
+    Yield ``(end offset, operations)`` for each intact frame in ``data``
+
+    Stops at the end of the data or at the first torn or corrupt frame.
+    """
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        length, checksum = FRAME.unpack_from(data, offset)
+        start = offset + FRAME.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        (count,) = COUNT.unpack_from(payload, 0)
+        position = COUNT.size
+        operations = []
+        for _ in range(count):
+            op = OP_NAMES[payload[position]]
+            name, position = _unpack_text(payload, position + 1)
+            email, position = _unpack_text(payload, position)
+            operations.append((op, name, email))
+        offset = start + length
+        yield offset, operations
+
+
+def encode_snapshot(activities, waitlists, segment):
+    """Binary snapshot of a catalog; replay resumes at journal ``segment``"""
+    parts = [SNAPSHOT_MAGIC, SNAPSHOT_HEADER.pack(segment, len(activities))]
+    for name, details in activities.items():
+        _pack_text(parts, name)
+        _pack_text(parts, details["description"])
+        _pack_text(parts, details["schedule"])
+        parts.append(COUNT.pack(details["max_participants"]))
+        for emails in (details["participants"], waitlists[name]):
+            parts.append(COUNT.pack(len(emails)))
+            for email in emails:
+                _pack_text(parts, email)
+    body = b"".join(parts)
+    return body + COUNT.pack(zlib.crc32(body))
+
+
+def encode_capture(capture, segment):
+    """Binary snapshot of an ``ActivityStore.capture``"""
+    students, captured = capture
+    activities, waitlists = {}, {}
+    for name, ((description, schedule, max_participants), ids, waitlist) in captured.items():
+        activities[name] = {"description": description, "schedule": schedule,
+                            "max_participants": max_participants,
+                            "participants": students.emails(ids)}
+        waitlists[name] = waitlist
+    return encode_snapshot(activities, waitlists, segment)
+
+
+def decode_snapshot(buffer):
+    """Return ``(segment, activities)`` from an encoded snapshot"""
+    body = memoryview(buffer)[:-COUNT.size]
+    try:
+        if bytes(body[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise JournalError("Not a snapshot file")
+        if zlib.crc32(body) != COUNT.unpack_from(buffer, len(body))[0]:
+            raise JournalError("Snapshot checksum mismatch")
+        segment, count = SNAPSHOT_HEADER.unpack_from(body, len(SNAPSHOT_MAGIC))
+        offset = len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER.size
+        activities = {}
+        for _ in range(count):
+            name, offset = _unpack_text(body, offset)
+            description, offset = _unpack_text(body, offset)
+            schedule, offset = _unpack_text(body, offset)
+            (max_participants,) = COUNT.unpack_from(body, offset)
+            offset += COUNT.size
+            lists = []
+            for _ in range(2):
+                (length,) = COUNT.unpack_from(body, offset)
+                offset += COUNT.size
+                emails = []
+                for _ in range(length):
+                    email, offset = _unpack_text(body, offset)
+                    emails.append(email)
+                lists.append(emails)
+            activities[name] = {"description": description, "schedule": schedule,
+                                "max_participants": max_participants,
+                                "participants": lists[0], "waitlist": lists[1]}
+        return segment, activities
+    finally:
+        # An mmap cannot be closed while views of it are alive
+        body.release()
+
+
+def _fsync_directory(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+class JournalStorage(MemoryStorage):
+    """
+    Memory storage whose mutations are journaled to ``directory``
+
+    The contents of ``activities`` are replaced by the recovered catalog.
+    An empty directory is seeded from ``activities`` as it was passed in.
+    """
+
+    def __init__(self, directory, activities, compact_every=10_000):
+        super().__init__(activities)
+        self.directory = directory
+        self.compact_every = compact_every
+        os.makedirs(directory, exist_ok=True)
+        self._segment, self._segment_records = self._recover()
+        self._file = open(self._segment_path(self._segment), "ab", buffering=0)
+        _fsync_directory(directory)
+        self._writes = queue.SimpleQueue()
+        self._closed = False
+        # Set by the writer thread when a write or fsync fails
+        self._failed = None
+        self._writer = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:08d}{SEGMENT_SUFFIX}")
+
+    def _segments(self):
+        segments = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX):
+                segments.append(int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(segments)
+
+    def _recover(self):
+        """Load the snapshot and replay newer segments; returns the segment to append to"""
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        if not os.path.exists(path):
+            # A fresh directory: the caller's catalog is the starting point
+            segment = max(self._segments(), default=0) + 1
+            self._write_snapshot(encode_capture(self.activities.capture(), segment))
+            return segment, 0
+
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            segment, catalog = decode_snapshot(mapped)
+        self.activities.clear()
+        self.activities.update(catalog)
+
+        records = 0
+        segments = [number for number in self._segments() if number >= segment]
+        for number in segments:
+            records = 0
+            with open(self._segment_path(number), "rb") as file:
+                data = file.read()
+            end = 0
+            for end, operations in decode_records(data):
+                self.activities.apply_batch(operations)
+                records += 1
+            if end < len(data):
+                if number != segments[-1]:
+                    raise JournalError(f"Corrupt record in journal segment {number}")
+                # A write torn by a crash; it was never acknowledged
+                with open(self._segment_path(number), "r+b") as file:
+                    file.truncate(end)
+                    os.fsync(file.fileno())
+        for number in self._segments():
+            if number < segment:
+                # Left behind by a compaction interrupted after its snapshot
+                os.remove(self._segment_path(number))
+        return max(segments, default=segment), records
+
+    def _write_snapshot(self, snapshot):
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(snapshot)
+            file.flush()
+            os.fsync(file.fileno())
+        # The rename is atomic, so a crash leaves either snapshot intact
+        os.replace(temporary, path)
+        _fsync_directory(self.directory)
+
+    def _check(self, mutating=True):
+        if self._failed is not None:
+            raise self._failed
+        if mutating and self._closed:
+            raise RuntimeError("Storage is closed")
+
+    async def version(self):
+        self._check(mutating=False)
+        return await super().version()
+
+    async def to_dict(self):
+        self._check(mutating=False)
+        return await super().to_dict()
+
+    async def activities_for(self, email):
+        self._check(mutating=False)
+        return await super().activities_for(email)
+
+    async def schedule_for(self, email):
+        self._check(mutating=False)
+        return await super().schedule_for(email)
+
+    async def waitlist(self, name):
+        self._check(mutating=False)
+        return await super().waitlist(name)
+
+    async def waitlist_position(self, name, email):
+        self._check(mutating=False)
+        return await super().waitlist_position(name, email)
+
+    async def signup(self, name, email, *, versioned=False):
+        self._check()
+        result = self._result(self.activities.signup(name, email), versioned)
+        await self._log([("signup", name, email)])
+        return result
+
+    async def unregister(self, name, email, *, versioned=False):
+        self._check()
+        result = self._result(self.activities.unregister(name, email), versioned)
+        await self._log([("unregister", name, email)])
+        return result
+
+    async def apply_batch(self, operations, *, versioned=False):
+        self._check()
+        results = self.activities.apply_batch(operations)
+        returned = self._result(results, versioned)
+        # Journaled whole, rejections included: replay runs the same batch
+        # against the same state, so it accepts and rejects the same ones
+        if not all(isinstance(result, Exception) for result in results):
+            await self._log(operations)
+        return returned
+
+    def _log(self, operations):
+        # Called right after the store changed, with no await in between,
+        # so records are queued in the order the changes were made. The
+        # callers checked that the journal is open and healthy beforehand
+        future = Future()
+        self._writes.put((encode_record(operations), future))
+        self._segment_records += 1
+        if self._segment_records >= self.compact_every:
+            self._segment += 1
+            self._segment_records = 0
+            # Encoded on the writer thread; only the copy is made here
+            self._writes.put(((self._segment, self.activities.capture()), None))
+        return asyncio.wrap_future(future)
+
+    def _write_loop(self):
+        while True:
+            item = self._writes.get()
+            pending = []
+            while item is not None:
+                data, future = item
+                if future is None:
+                    # Compaction: everything before it belongs to the old segment
+                    self._flush(pending)
+                    pending = []
+                    self._compact(*data)
+                else:
+                    pending.append((data, future))
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+            self._flush(pending)
+            if item is None:
+                self._file.close()
+                return
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        if self._failed is None:
+            try:
+                self._file.write(b"".join(data for data, _ in pending))
+                _sync(self._file.fileno())
+            except Exception as exc:
+                # What reached the disk is unknown, so nothing more is
+                # written; recovery decides on restart
+                failure = JournalError(f"Journal write failed, restart to recover: {exc}")
+                failure.__cause__ = exc
+                self._failed = failure
+        if self._failed is not None:
+            for _, future in pending:
+                future.set_exception(self._failed)
+            return
+        for _, future in pending:
+            future.set_result(None)
+
+    def _compact(self, segment, capture):
+        # Every segment from the snapshot's onwards is replayed, so stopping
+        # at any step leaves a recoverable directory; old segments are only
+        # deleted once the new snapshot is in place
+        if self._failed is not None:
+            return
+        snapshot = encode_capture(capture, segment)
+        try:
+            new_file = open(self._segment_path(segment), "ab", buffering=0)
+        except OSError:
+            # Keep appending to the current segment; the next compaction retries
+            return
+        self._file.close()
+        self._file = new_file
+        try:
+            _fsync_directory(self.directory)
+            self._write_snapshot(snapshot)
+            for number in self._segments():
+                if number < segment:
+                    os.remove(self._segment_path(number))
+        except OSError:
+            pass
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._writes.put(None)
+        self._writer.join()
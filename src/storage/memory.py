@@ -0,0 +1,48 @@
+"""
+In-memory storage backed by an ActivityStore
+"""
+from src.storage.base import Storage
+
+
+class MemoryStorage(Storage):
+    """
+    Storage that keeps everything in the process; lost on restart
+
+    The ActivityStore critical sections are a few dict operations with no
+    awaits inside, so calling them straight from the event loop never
+    blocks it for longer than a lookup.
+    """
+
+    def __init__(self, activities):
+        self.activities = activities
+
+    async def version(self):
+        return self.activities.version
+
+    async def to_dict(self):
+        return self.activities.to_dict()
+
+    def _result(self, result, versioned):
+        # No await since the change, so nothing else has changed the store
+        return (result, self.activities.version) if versioned else result
+
+    async def signup(self, name, email, *, versioned=False):
+        return self._result(self.activities.signup(name, email), versioned)
+
+    async def unregister(self, name, email, *, versioned=False):
+        return self._result(self.activities.unregister(name, email), versioned)
+
+    async def apply_batch(self, operations, *, versioned=False):
+        return self._result(self.activities.apply_batch(operations), versioned)
+
+    async def activities_for(self, email):
+        return self.activities.activities_for(email)
+
+    async def schedule_for(self, email):
+        return self.activities.schedule_for(email)
+
+    async def waitlist(self, name):
+        return self.activities.waitlist(name)
+
+    async def waitlist_position(self, name, email):
+        return self.activities.waitlist_position(name, email)
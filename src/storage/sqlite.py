@@ -0,0 +1,436 @@
+"""
+SQLite storage with WAL, a read connection pool and group-commit writes
+
+Reads run on a small thread pool, one connection per thread; WAL mode lets
+them run while a write is in progress. Every mutation is handed to a single
+writer thread, which applies all queued mutations in one transaction and
+commits once, so a burst of signups pays for one commit instead of one
+each. Coroutines only ever await futures from these threads, so the event
+loop never blocks on SQLite. Statements are constant strings, so sqlite3's
+per-connection statement cache prepares each of them only once.
+
+Schedules are parsed into a ``slots`` table whenever the database is
+opened, so the signup conflict check is an indexed join from the student's
+memberships and waitlist places to their slots.
+"""
+import asyncio
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from src.roster import (
+    ActivityNotFoundError,
+    AlreadySignedUpError,
+    AlreadyWaitlistedError,
+    NotSignedUpError,
+    RosterError,
+    ScheduleConflictError,
+)
+from src.schedule import parse_schedule
+from src.storage.base import Storage
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS activities (
+        name TEXT PRIMARY KEY,
+        description TEXT NOT NULL,
+        schedule TEXT NOT NULL,
+        max_participants INTEGER NOT NULL,
+        enrolled INTEGER NOT NULL DEFAULT 0,
+        position INTEGER NOT NULL
+    )""",
+    # The integer primary key grows with every insert, so ordering by it
+    # gives signup order
+    """CREATE TABLE IF NOT EXISTS participants (
+        id INTEGER PRIMARY KEY,
+        activity TEXT NOT NULL REFERENCES activities (name),
+        email TEXT NOT NULL,
+        UNIQUE (activity, email)
+    )""",
+    "CREATE INDEX IF NOT EXISTS participants_email ON participants (email)",
+    # Ordered by id like participants; the (activity, id) index finds the
+    # head of a waitlist without scanning it
+    """CREATE TABLE IF NOT EXISTS waitlist (
+        id INTEGER PRIMARY KEY,
+        activity TEXT NOT NULL REFERENCES activities (name),
+        email TEXT NOT NULL,
+        UNIQUE (activity, email)
+    )""",
+    "CREATE INDEX IF NOT EXISTS waitlist_order ON waitlist (activity, id)",
+    "CREATE INDEX IF NOT EXISTS waitlist_email ON waitlist (email)",
+    # Derived from the schedules whenever the database is opened
+    """CREATE TABLE IF NOT EXISTS slots (
+        activity TEXT NOT NULL REFERENCES activities (name),
+        day INTEGER NOT NULL,
+        start INTEGER NOT NULL,
+        "end" INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS slots_activity ON slots (activity)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)",
+)
+
+
+def connect(path):
+    """Open a connection in autocommit mode with the pragmas every user needs"""
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                           cached_statements=64)
+    # Set first so that other processes holding the lock make us wait
+    # instead of failing, including while switching to WAL
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL is durable across application crashes in WAL mode
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class ConnectionPool:
+    """Fixed-size pool of read connections shared between threads"""
+
+    def __init__(self, path, size):
+        self._connections = [connect(path) for _ in range(size)]
+        self._idle = queue.LifoQueue()
+        for conn in self._connections:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+
+def _apply_signup(conn, name, email):
+    row = conn.execute(
+        "SELECT max_participants, enrolled FROM activities WHERE name = ?", (name,)
+    ).fetchone()
+    if row is None:
+        raise ActivityNotFoundError()
+    if conn.execute(
+        "SELECT 1 FROM participants WHERE activity = ? AND email = ?", (name, email)
+    ).fetchone():
+        raise AlreadySignedUpError()
+    full = row[1] >= row[0]
+    # Same rejection order as ActivityStore: full and waitlisted before conflicts
+    if full and conn.execute(
+        "SELECT 1 FROM waitlist WHERE activity = ? AND email = ?", (name, email)
+    ).fetchone():
+        raise AlreadyWaitlistedError()
+    # Waitlist places count as held, so a promotion never needs checking.
+    # CROSS JOIN keeps this order: the student's few memberships and
+    # waitlist places, then their slots, each found through an index
+    conflict = conn.execute(
+        "SELECT held.activity FROM ("
+        " SELECT 0 AS waiting, id, activity FROM participants WHERE email = ?"
+        " UNION ALL SELECT 1, id, activity FROM waitlist WHERE email = ?) held"
+        " CROSS JOIN slots theirs ON theirs.activity = held.activity"
+        " CROSS JOIN slots mine ON mine.activity = ? AND mine.day = theirs.day"
+        ' AND mine.start < theirs."end" AND theirs.start < mine."end"'
+        " WHERE held.activity != ? ORDER BY held.waiting, held.id LIMIT 1",
+        (email, email, name, name)
+    ).fetchone()
+    if conflict is not None:
+        raise ScheduleConflictError(f"Schedule conflicts with {conflict[0]}")
+    if full:
+        conn.execute("INSERT INTO waitlist (activity, email) VALUES (?, ?)", (name, email))
+        # The newest entry is last in line
+        return conn.execute("SELECT COUNT(*) FROM waitlist WHERE activity = ?", (name,)).fetchone()[0]
+    conn.execute("INSERT INTO participants (activity, email) VALUES (?, ?)", (name, email))
+    conn.execute("UPDATE activities SET enrolled = enrolled + 1 WHERE name = ?", (name,))
+    return None
+
+
+def _apply_unregister(conn, name, email):
+    row = conn.execute(
+        "SELECT max_participants, enrolled FROM activities WHERE name = ?", (name,)
+    ).fetchone()
+    if row is None:
+        raise ActivityNotFoundError()
+    deleted = conn.execute(
+        "DELETE FROM participants WHERE activity = ? AND email = ?", (name, email)
+    ).rowcount
+    if not deleted:
+        if not conn.execute(
+            "DELETE FROM waitlist WHERE activity = ? AND email = ?", (name, email)
+        ).rowcount:
+            raise NotSignedUpError()
+        return None
+    if row[1] - 1 < row[0]:
+        head = conn.execute(
+            "SELECT id, email FROM waitlist WHERE activity = ? ORDER BY id LIMIT 1", (name,)
+        ).fetchone()
+        if head is not None:
+            # The promoted student takes the freed spot, so enrolled is unchanged
+            conn.execute("DELETE FROM waitlist WHERE id = ?", (head[0],))
+            conn.execute("INSERT INTO participants (activity, email) VALUES (?, ?)", (name, head[1]))
+            return head[1]
+    conn.execute("UPDATE activities SET enrolled = enrolled - 1 WHERE name = ?", (name,))
+    return None
+
+
+def _apply_batch(conn, operations):
+    results = []
+    for op, name, email in operations:
+        try:
+            if op == "signup":
+                results.append(_apply_signup(conn, name, email))
+            else:
+                _apply_unregister(conn, name, email)
+                results.append(None)
+        except RosterError as exc:
+            results.append(exc)
+    return results
+
+
+class SQLiteStorage(Storage):
+    """
+    Storage in a SQLite database file
+
+    ``seed`` is loaded only when the database has no activities yet, so an
+    existing file keeps its rosters across restarts. At most ``max_batch``
+    queued mutations are committed together.
+    """
+
+    shared = True
+
+    def __init__(self, path, seed=None, pool_size=4, max_batch=256):
+        self.path = path
+        self._max_batch = max_batch
+        conn = connect(path)
+        try:
+            self._initialize(conn, seed or {})
+        finally:
+            conn.close()
+        self._pool = ConnectionPool(path, pool_size)
+        # As many reader threads as connections, so borrowing never waits
+        self._readers = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="sqlite-reader")
+        self._writes = queue.SimpleQueue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, args=(connect(path),),
+                                        name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _initialize(conn, seed):
+        # IMMEDIATE takes the write lock up front, so concurrent starters
+        # cannot both decide the database is empty
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            if conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 0:
+                for position, (name, details) in enumerate(seed.items()):
+                    participants = list(details.get("participants", ()))
+                    conn.execute(
+                        "INSERT INTO activities (name, description, schedule, max_participants, enrolled, position)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (name, details["description"], details["schedule"],
+                         details["max_participants"], len(participants), position),
+                    )
+                    conn.executemany(
+                        "INSERT INTO participants (activity, email) VALUES (?, ?)",
+                        [(name, email) for email in participants],
+                    )
+            SQLiteStorage._index_schedules(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _index_schedules(conn):
+        # Rebuilt on every open, so a change to the parser reaches old files
+        conn.execute("DELETE FROM slots")
+        conn.executemany(
+            'INSERT INTO slots (activity, day, start, "end") VALUES (?, ?, ?, ?)',
+            [(name, *slot) for name, schedule in conn.execute("SELECT name, schedule FROM activities").fetchall()
+             for slot in parse_schedule(schedule)],
+        )
+
+    async def _read(self, query, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._readers, query, *args)
+
+    async def version(self):
+        return await self._read(self._read_version)
+
+    async def to_dict(self):
+        return await self._read(self._read_activities)
+
+    async def activities_for(self, email):
+        return await self._read(self._read_activities_for, email)
+
+    async def schedule_for(self, email):
+        return await self._read(self._read_schedule_for, email)
+
+    async def waitlist(self, name):
+        return await self._read(self._read_waitlist, name)
+
+    async def waitlist_position(self, name, email):
+        return await self._read(self._read_waitlist_position, name, email)
+
+    async def signup(self, name, email, *, versioned=False):
+        return await self._write(versioned, _apply_signup, name, email)
+
+    async def unregister(self, name, email, *, versioned=False):
+        return await self._write(versioned, _apply_unregister, name, email)
+
+    async def apply_batch(self, operations, *, versioned=False):
+        # The whole batch is a single writer item, so it commits atomically
+        return await self._write(versioned, _apply_batch, operations)
+
+    async def _write(self, versioned, apply, *args):
+        result, version = await asyncio.wrap_future(self._submit(apply, *args))
+        return (result, version) if versioned else result
+
+    def _read_version(self):
+        with self._pool.connection() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _read_activities(self):
+        with self._pool.connection() as conn:
+            # One read transaction so rosters and details are consistent
+            conn.execute("BEGIN")
+            try:
+                activities = {
+                    name: {
+                        "description": description,
+                        "schedule": schedule,
+                        "max_participants": max_participants,
+                        "participants": [],
+                    }
+                    for name, description, schedule, max_participants in conn.execute(
+                        "SELECT name, description, schedule, max_participants"
+                        " FROM activities ORDER BY position"
+                    )
+                }
+                for name, email in conn.execute(
+                    "SELECT activity, email FROM participants ORDER BY id"
+                ):
+                    activities[name]["participants"].append(email)
+            finally:
+                conn.execute("COMMIT")
+        return activities
+
+    def _read_activities_for(self, email):
+        with self._pool.connection() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT activity FROM participants WHERE email = ? ORDER BY id", (email,)
+            )]
+
+    def _read_schedule_for(self, email):
+        with self._pool.connection() as conn:
+            return [tuple(row) for row in conn.execute(
+                'SELECT s.day, s.start, s."end", s.activity FROM participants p'
+                " JOIN slots s ON s.activity = p.activity WHERE p.email = ?"
+                ' ORDER BY s.day, s.start, s."end", s.activity', (email,)
+            )]
+
+    def _read_waitlist(self, name):
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                if conn.execute("SELECT 1 FROM activities WHERE name = ?", (name,)).fetchone() is None:
+                    raise ActivityNotFoundError()
+                return [row[0] for row in conn.execute(
+                    "SELECT email FROM waitlist WHERE activity = ? ORDER BY id", (name,)
+                )]
+            finally:
+                conn.execute("COMMIT")
+
+    def _read_waitlist_position(self, name, email):
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                if conn.execute("SELECT 1 FROM activities WHERE name = ?", (name,)).fetchone() is None:
+                    raise ActivityNotFoundError()
+                row = conn.execute(
+                    "SELECT id FROM waitlist WHERE activity = ? AND email = ?", (name, email)
+                ).fetchone()
+                if row is None:
+                    return None
+                # Counted on the (activity, id) index, without reading rows
+                return conn.execute(
+                    "SELECT COUNT(*) FROM waitlist WHERE activity = ? AND id <= ?", (name, row[0])
+                ).fetchone()[0]
+            finally:
+                conn.execute("COMMIT")
+
+    def _submit(self, apply, *args):
+        if self._closed:
+            raise RuntimeError("Storage is closed")
+        future = Future()
+        self._writes.put((apply, args, future))
+        return future
+
+    def _write_loop(self, conn):
+        try:
+            while True:
+                item = self._writes.get()
+                if item is None:
+                    return
+                batch = [item]
+                # Everything that queued up during the previous commit goes
+                # into this one
+                while len(batch) < self._max_batch:
+                    try:
+                        item = self._writes.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._commit(conn, batch)
+                        return
+                    batch.append(item)
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _commit(conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            changed = False
+            for apply, args, future in batch:
+                # Rejections are detected before anything is written, so a
+                # rejected item leaves nothing to roll back
+                try:
+                    result = apply(conn, *args)
+                except RosterError as exc:
+                    outcomes.append((future, None, exc))
+                else:
+                    outcomes.append((future, result, None))
+                    changed = True
+            if changed:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            # Read inside the transaction, so it is the version these changes
+            # were committed as whatever other processes do next
+            version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for *_, future in batch:
+                future.set_exception(exc)
+            return
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result((result, version))
+            else:
+                future.set_exception(exc)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._writes.put(None)
+        self._writer.join()
+        self._readers.shutdown()
+        self._pool.close()
@@ -0,0 +1,112 @@
+"""
+FIFO waitlists with fast position lookups
+
+Every student joining a waitlist gets the next ticket number. A deque of
+tickets gives the head of the queue, and a Fenwick tree with a 1 for every
+live ticket answers "how many live tickets are at or before mine" in
+O(log n), so positions never require walking the queue. Leaving the
+waitlist only clears the ticket's slot; the stale deque entry is skipped
+when it reaches the head. Ticket numbers are compacted whenever the tree
+runs out of slots.
+"""
+from collections import deque
+
+# Tree slots allocated for a new or compacted waitlist, at least
+MIN_SLOTS = 16
+
+
+class FenwickTree:
+    """Prefix sums over a fixed number of integer slots"""
+
+    __slots__ = ("_tree",)
+
+    def __init__(self, size):
+        self._tree = [0] * (size + 1)
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def add(self, slot, delta):
+        tree = self._tree
+        i = slot + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, slot):
+        """Sum of slots ``0..slot`` inclusive"""
+        tree = self._tree
+        total = 0
+        i = slot + 1
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
+class Waitlist:
+    """Queue of student emails in the order they joined"""
+
+    __slots__ = ("_queue", "_tickets", "_tree", "_next")
+
+    def __init__(self, emails=()):
+        self._compact(list(emails))
+
+    def __len__(self):
+        return len(self._tickets)
+
+    def __contains__(self, email):
+        return email in self._tickets
+
+    def __iter__(self):
+        tickets = self._tickets
+        return (email for ticket, email in self._queue if tickets.get(email) == ticket)
+
+    def to_list(self):
+        return list(self)
+
+    def _compact(self, emails):
+        # Renumber live entries from 0 and size the tree with room to grow
+        self._tickets = {email: ticket for ticket, email in enumerate(emails)}
+        self._queue = deque(enumerate(emails))
+        self._tree = FenwickTree(max(MIN_SLOTS, 2 * len(emails)))
+        for ticket in range(len(emails)):
+            self._tree.add(ticket, 1)
+        self._next = len(emails)
+
+    def push(self, email):
+        """Append ``email`` and return its 1-based position"""
+        if self._next == len(self._tree):
+            self._compact(self.to_list())
+        ticket = self._next
+        self._next += 1
+        self._tickets[email] = ticket
+        self._queue.append((ticket, email))
+        self._tree.add(ticket, 1)
+        return len(self._tickets)
+
+    def pop(self):
+        """Remove and return the first email, or None if the waitlist is empty"""
+        queue, tickets = self._queue, self._tickets
+        while queue:
+            ticket, email = queue.popleft()
+            if tickets.get(email) == ticket:
+                del tickets[email]
+                self._tree.add(ticket, -1)
+                return email
+        return None
+
+    def remove(self, email):
+        """Take ``email`` off the waitlist, returning False if it was not on it"""
+        ticket = self._tickets.pop(email, None)
+        if ticket is None:
+            return False
+        self._tree.add(ticket, -1)
+        return True
+
+    def position(self, email):
+        """1-based position of ``email``, or None if it is not waiting"""
+        ticket = self._tickets.get(email)
+        if ticket is None:
+            return None
+        return self._tree.prefix_sum(ticket)
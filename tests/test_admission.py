@@ -0,0 +1,139 @@
+"""
+Tests for rate limiting and load shedding of mutations
+"""
+import asyncio
+
+import pytest
+from fastapi import status
+from src.admission import ConcurrencyGate, Overloaded, TokenBucketLimiter
+from src.app import admission
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucketLimiter:
+    """Test the per-key token buckets"""
+
+    def test_burst_then_refill(self):
+        """Test that a key gets its burst at once and then ``rate`` per second"""
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(rate=2, burst=3, clock=clock)
+        assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+        assert limiter.acquire("a") == pytest.approx(0.5)
+        assert limiter.acquire("b") == 0
+
+        clock.now = 0.5
+        assert limiter.acquire("a") == 0
+        assert limiter.acquire("a") > 0
+        # Idle time never banks more than the burst
+        clock.now = 100
+        assert [limiter.acquire("a") for _ in range(4)].count(0) == 3
+
+    def test_least_recently_used_keys_evicted(self):
+        """Test that memory stays bounded however many clients appear"""
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=100, clock=FakeClock())
+        limiter.acquire("busy")
+        for i in range(1000):
+            limiter.acquire(f"client{i}")
+            if i % 50 == 0:
+                limiter.acquire("busy")
+        assert len(limiter) == 100
+        # Kept because it was used recently, so still out of tokens
+        assert limiter.acquire("busy") > 0
+        # Evicted long ago, so it starts again with a full bucket
+        assert limiter.acquire("client0") == 0
+
+
+class TestConcurrencyGate:
+    """Test the global cap on in-flight mutations"""
+
+    @pytest.mark.anyio
+    async def test_waiters_admitted_in_order(self):
+        """Test that queued mutations get slots in arrival order"""
+        gate = ConcurrencyGate(limit=1, queue_size=5, timeout=1)
+        await gate.acquire()
+        admitted = []
+
+        async def wait(name):
+            await gate.acquire()
+            admitted.append(name)
+
+        waiters = [asyncio.create_task(wait(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        assert gate.queued == 3
+        for _ in range(3):
+            gate.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiters)
+        assert admitted == ["a", "b", "c"]
+        assert gate.active == 1
+
+    @pytest.mark.anyio
+    async def test_sheds_when_queue_full_or_wait_too_long(self):
+        """Test that a full queue or an expired wait sheds the mutation"""
+        gate = ConcurrencyGate(limit=1, queue_size=1, timeout=0.05)
+        await gate.acquire()
+        queued = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await gate.acquire()
+        with pytest.raises(Overloaded):
+            await queued
+        # The timed-out waiter gave up its place without taking a slot
+        assert (gate.active, gate.queued) == (1, 0)
+        gate.release()
+        await gate.acquire()
+        assert gate.active == 1
+
+
+class TestAdmissionEndpoints:
+    """Test how limits surface over HTTP"""
+
+    @pytest.fixture
+    def strict(self, monkeypatch):
+        monkeypatch.setattr(admission, "ip_limiter", TokenBucketLimiter(rate=0.1, burst=3))
+        monkeypatch.setattr(admission, "email_limiter", TokenBucketLimiter(rate=0.1, burst=2))
+
+    def test_client_rate_limited_with_retry_after(self, client, reset_activities, strict):
+        """Test that a flooding client gets 429s it can back off from"""
+        codes = [client.post(f"/activities/Chess Club/signup?email=s{i}@mergington.edu").status_code
+                 for i in range(3)]
+        assert codes == [status.HTTP_200_OK] * 3
+        response = client.delete("/activities/Chess Club/unregister?email=s0@mergington.edu")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response.headers["retry-after"]) >= 1
+        assert "s0@mergington.edu" in client.get("/activities").json()["Chess Club"]["participants"]
+        # Reads are never limited
+        assert client.get("/activities").status_code == status.HTTP_200_OK
+        assert "admission_rejections_total{reason=\"RateLimited\"}" in client.get("/metrics").text
+
+    def test_student_rate_limited_across_clients(self, client, reset_activities, strict):
+        """Test that the per-email bucket is shared by every client"""
+        url = "/activities/{}/signup?email=same@mergington.edu"
+        assert client.post(url.format("Chess Club")).status_code == status.HTTP_200_OK
+        admission.ip_limiter.clear()
+        assert client.post(url.format("Art Club")).status_code == status.HTTP_200_OK
+        admission.ip_limiter.clear()
+        assert client.post(url.format("Gym Class")).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_overloaded_server_sheds_mutations(self, client, reset_activities, monkeypatch):
+        """Test that a saturated gate answers 503 at once instead of queueing"""
+        monkeypatch.setattr(admission, "gate", ConcurrencyGate(limit=0, queue_size=0, timeout=1))
+        response = client.post("/activities/Chess Club/signup?email=new@mergington.edu")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["retry-after"] == "1"
+        response = client.post("/activities/bulk", json=[])
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def test_disabled(self, client, reset_activities, strict, monkeypatch):
+        """Test that MERGINGTON_ADMISSION=off lets every mutation through"""
+        monkeypatch.setattr(admission, "enabled", False)
+        for i in range(5):
+            response = client.post(f"/activities/Chess Club/signup?email=s{i}@mergington.edu")
+            assert response.status_code == status.HTTP_200_OK
@@ -0,0 +1,78 @@
+"""
+Tests for hashed, precompressed static assets
+"""
+import gzip
+import re
+
+from fastapi import status
+from src.assets import IMMUTABLE, AssetBundle
+
+
+def asset_urls(html):
+    return re.findall(r'(?:href|src)="(/static/[^"]+)"', html)
+
+
+class TestAssetBundle:
+    """Test the startup-time asset pipeline"""
+
+    def test_references_rewritten_to_hashed_names(self, tmp_path):
+        """Test that HTML and CSS point at content-hashed copies"""
+        (tmp_path / "index.html").write_text('<link href="site.css"><script src="app.js"></script>'
+                                             '<a href="https://example.com/app.js">x</a>')
+        (tmp_path / "site.css").write_text("body { background: url('img/bg.png'); }")
+        (tmp_path / "app.js").write_text("console.log(1)")
+        (tmp_path / "img").mkdir()
+        (tmp_path / "img" / "bg.png").write_bytes(b"\x89PNG")
+
+        bundle = AssetBundle(str(tmp_path))
+        html = bundle.get("index.html")[0].variant(None)[0].decode()
+        assert asset_urls(html) == [bundle.urls["site.css"], bundle.urls["app.js"]]
+        assert "https://example.com/app.js" in html
+        css = bundle.get("site.css")[0].variant(None)[0].decode()
+        assert f"url('{bundle.urls['img/bg.png']}')" in css
+        assert re.fullmatch(r"/static/img/bg\.[0-9a-f]{8}\.png", bundle.urls["img/bg.png"])
+
+    def test_hash_changes_with_content(self, tmp_path):
+        """Test that editing a file gives it a new cache-busting name"""
+        (tmp_path / "app.js").write_text("one")
+        first = AssetBundle(str(tmp_path)).urls["app.js"]
+        (tmp_path / "app.js").write_text("two")
+        assert AssetBundle(str(tmp_path)).urls["app.js"] != first
+
+
+class TestStaticEndpoints:
+    """Test serving of the frontend"""
+
+    def test_hashed_assets_are_immutable(self, client):
+        """Test that assets referenced by the page are cached forever"""
+        html = client.get("/").text
+        urls = asset_urls(html)
+        assert len(urls) == 2
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["cache-control"] == IMMUTABLE
+
+    def test_assets_compressed_and_revalidated(self, client):
+        """Test gzip variants, strong ETags and 304 responses"""
+        url = next(url for url in asset_urls(client.get("/").text) if url.endswith(".js"))
+        with client.stream("GET", url, headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(raw) == client.get(url, headers={"Accept-Encoding": "identity"}).content
+
+        etag = response.headers["etag"]
+        revalidated = client.get(url, headers={"If-None-Match": etag})
+        assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_original_names_still_served(self, client):
+        """Test that unhashed URLs work but must be revalidated"""
+        response = client.get("/static/index.html")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["cache-control"] == "no-cache"
+        assert client.get("/static/app.js").headers["cache-control"] == "no-cache"
+
+    def test_unknown_asset(self, client):
+        """Test that missing files are 404s"""
+        assert client.get("/static/missing.js").status_code == status.HTTP_404_NOT_FOUND
+        assert client.get("/static/../app.py").status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,115 @@
+"""
+Tests for the streaming bulk signup/unregister endpoint
+"""
+import json
+
+import pytest
+from fastapi import status
+from src.app import activities
+from src.bulk import JSONArrayParser
+
+
+def read_results(response):
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return lines[:-1], lines[-1]["summary"]
+
+
+class TestBulkEndpoint:
+    """Test POST /activities/bulk"""
+
+    def test_json_array_import(self, client, reset_activities):
+        """Test that a JSON array is applied with one result per operation"""
+        operations = [
+            {"activity": "Chess Club", "email": "bulk1@mergington.edu", "op": "signup"},
+            {"activity": "Chess Club", "email": "michael@mergington.edu", "op": "signup"},
+            {"activity": "Nonexistent", "email": "bulk1@mergington.edu", "op": "signup"},
+            {"activity": "Art Club", "email": "zoe@mergington.edu", "op": "unregister"},
+            {"activity": "Art Club", "email": "ghost@mergington.edu", "op": "unregister"},
+        ]
+        response = client.post("/activities/bulk", json=operations)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+
+        results, summary = read_results(response)
+        assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+        assert [r["status"] for r in results] == [200, 400, 404, 200, 400]
+        assert "already signed up" in results[1]["detail"].lower()
+        assert summary == {"total": 5, "succeeded": 2, "failed": 3}
+        assert "bulk1@mergington.edu" in activities["Chess Club"]["participants"]
+        assert "zoe@mergington.edu" not in activities["Art Club"]["participants"]
+
+    def test_ndjson_import_with_bad_lines(self, client, reset_activities):
+        """Test that invalid NDJSON lines only fail their own operation"""
+        body = "\n".join([
+            json.dumps({"activity": "Debate Club", "email": "speaker@mergington.edu"}),
+            "{not json",
+            json.dumps({"activity": "Debate Club", "email": "x@mergington.edu", "op": "delete"}),
+            json.dumps({"activity": "Debate Club", "email": "speaker@mergington.edu", "op": "unregister"}),
+        ])
+        response = client.post("/activities/bulk", content=body,
+                               headers={"Content-Type": "application/x-ndjson"})
+        results, summary = read_results(response)
+        assert [r["status"] for r in results] == [200, 422, 422, 200]
+        assert summary["succeeded"] == 2
+
+    def test_capacity_enforced_in_bulk(self, client, reset_activities):
+        """Test that bulk signups past max_participants join the waitlist like single ones"""
+        capacity = activities["Chess Club"]["max_participants"]
+        operations = [{"activity": "Chess Club", "email": f"s{i}@mergington.edu"} for i in range(20)]
+        results, summary = read_results(client.post("/activities/bulk", json=operations))
+        assert summary["succeeded"] == 20
+        assert all(r["status"] == 200 for r in results[:capacity - 2])
+        assert [r["waitlist_position"] for r in results[capacity - 2:]] == list(range(1, 23 - capacity))
+        assert all(r["status"] == 202 for r in results[capacity - 2:])
+        assert len(activities["Chess Club"]["participants"]) == capacity
+
+    def test_malformed_array_reports_error(self, client, reset_activities):
+        """Test that a broken array stops the import but keeps earlier results"""
+        body = '[{"activity": "Chess Club", "email": "early@mergington.edu"} {"oops": 1}]'
+        results, summary = read_results(client.post("/activities/bulk", content=body))
+        assert [r["status"] for r in results] == [200]
+        assert "error" in summary
+
+    def test_large_streamed_import(self, client, reset_activities):
+        """Test a 100k-row NDJSON import sent as a chunked stream"""
+        activities["Bulk Import"] = {
+            "description": "Roster import target",
+            "schedule": "Mondays, 1:00 PM - 2:00 PM",
+            "max_participants": 200000,
+            "participants": [],
+        }
+
+        def body():
+            for start in range(0, 100000, 5000):
+                yield "".join(
+                    json.dumps({"activity": "Bulk Import", "email": f"student{i}@mergington.edu"}) + "\n"
+                    for i in range(start, start + 5000)
+                ).encode()
+
+        response = client.post("/activities/bulk", content=body(),
+                               headers={"Content-Type": "application/x-ndjson"})
+        summary = json.loads(response.text.rsplit("\n", 2)[-2])["summary"]
+        assert summary == {"total": 100000, "succeeded": 100000, "failed": 0}
+        assert len(activities["Bulk Import"]["participants"]) == 100000
+
+
+class TestJSONArrayParser:
+    """Test incremental JSON array parsing"""
+
+    def test_elements_split_across_chunks(self):
+        """Test that elements split at arbitrary byte boundaries are reassembled"""
+        text = json.dumps([{"activity": "Chess Club", "email": f"s{i}@mergington.edu"} for i in range(50)])
+        parser = JSONArrayParser()
+        items = []
+        for start in range(0, len(text), 7):
+            items.extend(parser.feed(text[start:start + 7]))
+        items.extend(parser.close())
+        assert [item["email"] for item in items] == [f"s{i}@mergington.edu" for i in range(50)]
+
+    @pytest.mark.parametrize("text", ['{"a": 1}', '[{"a": 1}', '[{"a": 1}] []'])
+    def test_rejects_malformed_arrays(self, text):
+        """Test that non-arrays, unterminated arrays and trailing data are rejected"""
+        parser = JSONArrayParser()
+        parser.feed(text)
+        parser.close()
+        assert parser.error is not None
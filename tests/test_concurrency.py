@@ -0,0 +1,100 @@
+"""
+Concurrency and capacity tests for signups
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import status
+from src.app import activities
+from src.roster import ActivityStore, AlreadySignedUpError, RosterError
+
+WAITLISTED = "waitlisted"
+
+
+def _attempt(store, name, email):
+    """Try a signup and return the rejection type, WAITLISTED, or None on success"""
+    try:
+        if store.signup(name, email) is not None:
+            return WAITLISTED
+    except RosterError as exc:
+        return type(exc)
+    return None
+
+
+class TestCapacity:
+    """Test that max_participants is enforced"""
+
+    def test_signup_waitlisted_when_full(self, client, reset_activities):
+        """Test that signups past capacity join the waitlist instead of the roster"""
+        activity = activities["Chess Club"]
+        for i in range(activity["max_participants"] - len(activity["participants"])):
+            response = client.post(f"/activities/Chess Club/signup?email=fill{i}@mergington.edu")
+            assert response.status_code == status.HTTP_200_OK
+
+        response = client.post("/activities/Chess Club/signup?email=late@mergington.edu")
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert "full" in response.json()["message"].lower()
+        assert response.json()["waitlist_position"] == 1
+        assert len(activities["Chess Club"]["participants"]) == activity["max_participants"]
+        assert "late@mergington.edu" not in activities["Chess Club"]["participants"]
+
+
+class TestConcurrentSignups:
+    """Stress tests that hammer the store from many threads"""
+
+    @pytest.fixture
+    def store(self, sample_activity):
+        return ActivityStore({
+            "Crowded": {**sample_activity, "max_participants": 50, "participants": []},
+            "Quiet": {**sample_activity, "max_participants": 1000, "participants": []},
+        })
+
+    def test_no_overbooking_under_contention(self, store):
+        """Test that parallel signups for one activity never exceed capacity"""
+        emails = [f"student{i}@mergington.edu" for i in range(2000)]
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            outcomes = list(pool.map(lambda email: _attempt(store, "Crowded", email), emails))
+
+        assert outcomes.count(None) == 50
+        assert outcomes.count(WAITLISTED) == 1950
+        assert len(store["Crowded"]["participants"]) == 50
+        assert len(store.waitlist("Crowded")) == 1950
+
+    def test_duplicate_signups_admit_once(self, store):
+        """Test that racing signups with the same email admit exactly one"""
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            outcomes = list(pool.map(lambda _: _attempt(store, "Crowded", "same@mergington.edu"), range(200)))
+
+        assert outcomes.count(None) == 1
+        assert outcomes.count(AlreadySignedUpError) == 199
+        assert store.activities_for("same@mergington.edu") == ["Crowded"]
+
+    def test_mixed_signup_and_unregister_keeps_index_consistent(self, store):
+        """Test that the reverse index matches rosters after concurrent churn"""
+        emails = [f"churn{i}@mergington.edu" for i in range(40)]
+
+        def churn(email):
+            for _ in range(50):
+                for name in ("Crowded", "Quiet"):
+                    if _attempt(store, name, email) is None:
+                        store.unregister(name, email)
+            _attempt(store, "Quiet", email)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(churn, emails))
+
+        assert len(store["Crowded"]["participants"]) == 0
+        assert sorted(store["Quiet"]["participants"]) == sorted(emails)
+        for email in emails:
+            assert store.activities_for(email) == ["Quiet"]
+
+    def test_activities_do_not_block_each_other(self, store):
+        """Test that holding one activity's lock does not stall another"""
+        done = threading.Event()
+        with store._locks["Crowded"]:
+            worker = threading.Thread(target=lambda: (store.signup("Quiet", "free@mergington.edu"), done.set()))
+            worker.start()
+            assert done.wait(timeout=5)
+        worker.join()
+        assert "free@mergington.edu" in store["Quiet"]["participants"]
@@ -22,8 +22,8 @@ class TestEdgeCases:
     def test_empty_email_signup(self, client, reset_activities):
         """Test signup with empty email"""
         response = client.post("/activities/Chess Club/signup?email=")
-        # Should still process but with empty string
-        assert response.status_code in [status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST]
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid email address"
     
     def test_activity_name_with_spaces(self, client, reset_activities):
         """Test activity names with spaces work correctly"""
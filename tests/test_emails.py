@@ -0,0 +1,91 @@
+"""
+Tests for student email validation and normalization
+"""
+import json
+
+import pytest
+from fastapi import status
+from src.app import activities
+from src.emails import normalize_email
+from src.roster import InvalidEmailError
+
+
+class TestNormalizeEmail:
+    """Test the normalization function"""
+
+    @pytest.mark.parametrize("raw, normalized", [
+        ("alex@mergington.edu", "alex@mergington.edu"),
+        ("Alex@Mergington.EDU", "alex@mergington.edu"),
+        ("  alex@mergington.edu\t", "alex@mergington.edu"),
+        ("alex+chess@mergington.edu", "alex+chess@mergington.edu"),
+        ("first.last@mergington.edu", "first.last@mergington.edu"),
+    ])
+    def test_valid(self, raw, normalized):
+        """Test that addresses are trimmed and case-folded"""
+        assert normalize_email(raw) == normalized
+
+    @pytest.mark.parametrize("raw", [
+        "",
+        "alex",
+        "alex@",
+        "@mergington.edu",
+        "alex@gmail.com",
+        "alex@sub.mergington.edu",
+        "alex@@mergington.edu",
+        "a lex@mergington.edu",
+        "alex..b@mergington.edu",
+        ".alex@mergington.edu",
+        "\"alex\"@mergington.edu",
+        "ålex@mergington.edu",
+        "a" * 65 + "@mergington.edu",
+    ])
+    def test_invalid(self, raw):
+        """Test that malformed or foreign-domain addresses are rejected"""
+        with pytest.raises(InvalidEmailError):
+            normalize_email(raw)
+
+    def test_repeats_are_cached(self):
+        """Test that a repeated address is answered from the cache"""
+        normalize_email("cached@mergington.edu")
+        hits = normalize_email.cache_info().hits
+        normalize_email("cached@mergington.edu")
+        assert normalize_email.cache_info().hits == hits + 1
+
+
+class TestEmailEndpoints:
+    """Test that every endpoint sees the normalized address"""
+
+    def test_spellings_of_one_address_are_one_student(self, client, reset_activities):
+        """Test that differently spelled addresses reach the same roster entry"""
+        response = client.post("/activities/Chess Club/signup", params={"email": " New@Mergington.edu "})
+        assert response.status_code == status.HTTP_200_OK
+        assert "new@mergington.edu" in activities["Chess Club"]["participants"]
+
+        response = client.post("/activities/Chess Club/signup", params={"email": "new@mergington.edu"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert client.get("/students/NEW@mergington.edu/activities").json() == ["Chess Club"]
+
+        response = client.delete("/activities/Chess Club/unregister", params={"email": "NEW@MERGINGTON.EDU"})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_invalid_addresses_rejected(self, client, reset_activities):
+        """Test that invalid addresses get a 400 and change nothing"""
+        before = activities["Chess Club"]["participants"].to_list()
+        for email in ("someone@example.com", "not-an-email"):
+            response = client.post("/activities/Chess Club/signup", params={"email": email})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert response.json() == {"detail": "Invalid email address"}
+        assert activities["Chess Club"]["participants"] == before
+        response = client.get("/activities/Chess Club/waitlist", params={"email": "nope"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_bulk_normalizes_each_operation(self, client, reset_activities):
+        """Test that bulk imports validate and normalize every operation"""
+        response = client.post("/activities/bulk", json=[
+            {"activity": "Art Club", "email": "Bulk@Mergington.edu"},
+            {"activity": "Art Club", "email": "bulk@example.com"},
+        ])
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line.get("status") for line in lines[:2]] == [200, 400]
+        assert lines[1]["detail"] == "Invalid email address"
+        assert "bulk@mergington.edu" in activities["Art Club"]["participants"]
@@ -0,0 +1,176 @@
+"""
+Tests for server-sent roster change events
+"""
+import asyncio
+import json
+
+import pytest
+from src.app import roster_events
+from src.events import Broadcaster, format_event, stream, watch_version
+from src.storage import SQLiteStorage
+
+
+@pytest.fixture
+def subscription():
+    """A subscription to the app's broadcaster, removed after the test"""
+    subscription = roster_events.subscribe()
+    yield subscription
+    roster_events.unsubscribe(subscription)
+
+
+class TestBroadcaster:
+    """Test fan-out and slow-consumer eviction"""
+
+    def test_publish_reaches_every_subscriber(self):
+        """Test that each subscriber gets its own copy of an event"""
+        broadcaster = Broadcaster()
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+        broadcaster.publish({"activity": "Chess Club"})
+        assert first.queue.get_nowait() == second.queue.get_nowait() == {"activity": "Chess Club"}
+
+    def test_slow_consumer_is_evicted(self):
+        """Test that a full queue evicts only that subscriber"""
+        broadcaster = Broadcaster(queue_size=2)
+        slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+        for i in range(2):
+            broadcaster.publish({"n": i})
+            fast.queue.get_nowait()
+        broadcaster.publish({"n": 2})
+
+        assert slow.evicted and not fast.evicted
+        assert len(broadcaster) == 1
+        assert fast.queue.get_nowait() == {"n": 2}
+
+    def test_versions_covered_past_a_gap(self):
+        """Test that only versions covered without a gap count as published"""
+        broadcaster = Broadcaster()
+        broadcaster.publish({"activity": "Chess Club", "version": 4})
+        broadcaster.publish({"activity": "Chess Club", "version": 6})
+        assert broadcaster.version == 4
+        broadcaster.cover(5)
+        assert broadcaster.version == 6
+        broadcaster.publish({"activity": "Chess Club", "version": 9})
+        broadcaster.publish({"type": "resync", "version": 8})
+        assert broadcaster.version == 9
+
+    @pytest.mark.anyio
+    async def test_stream_resyncs_after_eviction(self):
+        """Test that an evicted stream skips stale events and asks for a resync"""
+        broadcaster = Broadcaster(queue_size=1)
+        subscription = broadcaster.subscribe()
+        broadcaster.publish({"activity": "Chess Club", "version": 1})
+        broadcaster.publish({"activity": "Chess Club", "version": 2})
+
+        chunks = [chunk async for chunk in stream(broadcaster, subscription)]
+        assert len(chunks) == 2
+        assert chunks[0].startswith("retry:")
+        assert chunks[1].startswith("event: resync")
+        assert len(broadcaster) == 0
+
+    @pytest.mark.anyio
+    async def test_stream_delivers_events(self):
+        """Test that queued events are framed in order"""
+        broadcaster = Broadcaster()
+        subscription = broadcaster.subscribe()
+        broadcaster.publish({"activity": "Chess Club", "version": 1})
+        events = stream(broadcaster, subscription)
+        assert (await anext(events)).startswith("retry:")
+        assert (await anext(events)).startswith("id: 1\nevent: roster\n")
+        await events.aclose()
+        assert len(broadcaster) == 0
+
+    def test_format_event(self):
+        """Test text/event-stream framing"""
+        text = format_event({"activity": "Art Club", "change": "added", "version": 7})
+        lines = text.splitlines()
+        assert lines[:2] == ["id: 7", "event: roster"]
+        assert json.loads(lines[2][len("data: "):])["change"] == "added"
+        assert text.endswith("\n\n")
+
+
+class TestMutationEvents:
+    """Test that mutation handlers publish deltas"""
+
+    def test_signup_and_unregister_publish(self, client, reset_activities, subscription):
+        """Test that each successful change publishes one delta"""
+        email = "live@mergington.edu"
+        client.post(f"/activities/Chess Club/signup?email={email}")
+        client.post(f"/activities/Chess Club/signup?email={email}")  # duplicate, no event
+        client.delete(f"/activities/Chess Club/unregister?email={email}")
+
+        added = subscription.queue.get_nowait()
+        removed = subscription.queue.get_nowait()
+        assert subscription.queue.empty()
+        assert (added["activity"], added["email"], added["change"]) == ("Chess Club", email, "added")
+        assert removed["change"] == "removed"
+        assert removed["version"] > added["version"]
+
+    def test_snapshot_version_header(self, client, reset_activities, subscription):
+        """Test that /activities reports the version events are compared with"""
+        client.post("/activities/Art Club/signup?email=painter@mergington.edu")
+        event = subscription.queue.get_nowait()
+        response = client.get("/activities")
+        assert int(response.headers["x-activities-version"]) == event["version"]
+
+    def test_bulk_import_publishes_one_resync(self, client, reset_activities, subscription):
+        """Test that bulk imports ask clients to refetch instead of sending every delta"""
+        operations = [{"activity": "Gym Class", "email": f"g{i}@mergington.edu"} for i in range(10)]
+        client.post("/activities/bulk", json=operations)
+        assert subscription.queue.get_nowait()["type"] == "resync"
+        assert subscription.queue.empty()
+
+
+class TestOtherWorkers:
+    """Test that changes made through another process reach subscribers"""
+
+    @pytest.mark.anyio
+    async def test_watcher_resyncs_on_foreign_change(self, sample_activity, tmp_path):
+        """Test that only changes no local event covered trigger a resync"""
+        path = str(tmp_path / "activities.db")
+        seed = {"Test Activity": sample_activity}
+        # Two backends on one file stand in for two workers
+        mine, theirs = SQLiteStorage(path, seed=seed), SQLiteStorage(path, seed=seed)
+        broadcaster = Broadcaster()
+        subscription = broadcaster.subscribe()
+        watcher = asyncio.create_task(watch_version(broadcaster, mine.version, interval=0.01))
+        try:
+            _, version = await mine.signup("Test Activity", "local@mergington.edu", versioned=True)
+            broadcaster.publish({"activity": "Test Activity", "version": version})
+            await asyncio.sleep(0.05)
+            assert subscription.queue.get_nowait()["activity"] == "Test Activity"
+            assert subscription.queue.empty()
+
+            await theirs.signup("Test Activity", "remote@mergington.edu")
+            event = await asyncio.wait_for(subscription.queue.get(), 1)
+            assert event == {"type": "resync", "version": await theirs.version()}
+            await asyncio.sleep(0.05)
+            assert subscription.queue.empty()
+        finally:
+            watcher.cancel()
+            mine.close()
+            theirs.close()
+
+    @pytest.mark.anyio
+    async def test_watcher_finds_foreign_change_between_local_ones(self, sample_activity, tmp_path):
+        """Test that a foreign change followed by a local one still triggers a resync"""
+        path = str(tmp_path / "activities.db")
+        seed = {"Test Activity": sample_activity}
+        mine, theirs = SQLiteStorage(path, seed=seed), SQLiteStorage(path, seed=seed)
+        broadcaster = Broadcaster()
+        subscription = broadcaster.subscribe()
+        try:
+            for storage, email in ((mine, "first"), (theirs, "remote"), (mine, "second")):
+                _, version = await storage.signup("Test Activity", f"{email}@mergington.edu", versioned=True)
+                if storage is mine:
+                    broadcaster.publish({"activity": "Test Activity", "version": version})
+            assert [subscription.queue.get_nowait()["version"] for _ in range(2)] == [version - 2, version]
+
+            watcher = asyncio.create_task(watch_version(broadcaster, mine.version, interval=0.01))
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), 1)
+            finally:
+                watcher.cancel()
+            assert event == {"type": "resync", "version": version}
+        finally:
+            mine.close()
+            theirs.close()
@@ -0,0 +1,292 @@
+"""
+Tests for the journaled storage backend and its crash recovery
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+from src.roster import ActivityStore, NotSignedUpError, RosterError, ScheduleConflictError
+from src.storage import journal
+from src.storage.journal import (
+    SNAPSHOT_NAME,
+    JournalError,
+    JournalStorage,
+    decode_records,
+    decode_snapshot,
+    encode_capture,
+    encode_record,
+    encode_snapshot,
+)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Signs up and unregisters students forever, printing each acknowledged
+# operation's number; the operations are a function of that number only
+WRITER_SCRIPT = textwrap.dedent("""
+    import asyncio, json, sys
+    from src.roster import ActivityStore
+    from src.storage.journal import JournalStorage
+
+    def operation(i):
+        if i % 3 == 2:
+            return "unregister", f"s{i - 1}@mergington.edu"
+        return "signup", f"s{i}@mergington.edu"
+
+    async def main(directory, seed):
+        storage = JournalStorage(directory, ActivityStore(seed), compact_every=25)
+        i = 0
+        while True:
+            op, email = operation(i)
+            await getattr(storage, op)("Busy", email)
+            print(i, flush=True)
+            i += 1
+
+    asyncio.run(main(sys.argv[1], json.loads(sys.argv[2])))
+""")
+
+
+def script_operation(i):
+    if i % 3 == 2:
+        return "unregister", "Busy", f"s{i - 1}@mergington.edu"
+    return "signup", "Busy", f"s{i}@mergington.edu"
+
+
+@pytest.fixture
+def seed(sample_activity):
+    return {
+        "Busy": {**sample_activity, "max_participants": 20, "participants": []},
+        "Quiet": sample_activity,
+    }
+
+
+def state(store):
+    return store.to_dict(), {name: store.waitlist(name) for name in store}
+
+
+def reopen(directory, **options):
+    store = ActivityStore()
+    JournalStorage(directory, store, **options).close()
+    return store
+
+
+class TestEncoding:
+    """Test the on-disk formats"""
+
+    def test_records_round_trip_and_stop_at_torn_frame(self):
+        """Test that records decode intact and decoding stops at a torn or flipped frame"""
+        first = encode_record([("signup", "Chess Club", "a@mergington.edu")])
+        second = encode_record([("unregister", "Art Club", "b@mergington.edu"),
+                                ("signup", "Art Club", "c@mergington.edu")])
+        data = first + second
+        assert [operations for _, operations in decode_records(data)] == [
+            [("signup", "Chess Club", "a@mergington.edu")],
+            [("unregister", "Art Club", "b@mergington.edu"), ("signup", "Art Club", "c@mergington.edu")],
+        ]
+        assert [end for end, _ in decode_records(data[:-1])] == [len(first)]
+        flipped = data[:-1] + bytes([data[-1] ^ 1])
+        assert [end for end, _ in decode_records(flipped)] == [len(first)]
+
+    def test_snapshot_round_trip(self, seed):
+        """Test that a snapshot keeps rosters, waitlists and its segment, and rejects corruption"""
+        snapshot = encode_snapshot(seed, {"Busy": ["w@mergington.edu"], "Quiet": []}, segment=7)
+        segment, activities = decode_snapshot(snapshot)
+        assert segment == 7
+        assert activities["Busy"]["waitlist"] == ["w@mergington.edu"]
+        assert activities["Quiet"]["participants"] == seed["Quiet"]["participants"]
+        with pytest.raises(JournalError):
+            decode_snapshot(snapshot[:20] + b"x" + snapshot[21:])
+
+
+class TestJournalStorage:
+    """Test persistence across restarts"""
+
+    @pytest.mark.anyio
+    async def test_rosters_and_waitlists_survive_restart(self, seed, tmp_path):
+        """Test that a reopened journal restores rosters and waitlists"""
+        directory = str(tmp_path / "journal")
+        store = ActivityStore(seed)
+        storage = JournalStorage(directory, store)
+        for email in ("a", "b", "c", "waiting", "next"):
+            await storage.signup("Quiet", f"{email}@mergington.edu")
+        await storage.unregister("Quiet", "test1@mergington.edu")
+        await storage.apply_batch([("signup", "Busy", "a@mergington.edu"),
+                                   ("signup", "Missing", "b@mergington.edu")])
+        with pytest.raises(RosterError):
+            await storage.signup("Busy", "a@mergington.edu")
+        storage.close()
+
+        restored = reopen(directory)
+        assert state(restored) == state(store)
+        assert restored.waitlist("Quiet") == ["next@mergington.edu"]
+
+    @pytest.mark.anyio
+    async def test_batch_with_rejections_replays_as_applied(self, tmp_path):
+        """Test that a batch whose outcome depends on its rejections recovers as acknowledged"""
+        directory = str(tmp_path / "journal")
+        store = ActivityStore({
+            "Early": {"description": "", "schedule": "Mondays, 3:00 PM - 4:00 PM",
+                      "max_participants": 5, "participants": ["x@mergington.edu"]},
+            "Late": {"description": "", "schedule": "Mondays, 3:30 PM - 4:30 PM",
+                     "max_participants": 5, "participants": []},
+        })
+        storage = JournalStorage(directory, store)
+        results = await storage.apply_batch([("unregister", "Early", "q@mergington.edu"),
+                                             ("signup", "Late", "x@mergington.edu"),
+                                             ("unregister", "Early", "x@mergington.edu")])
+        assert [type(result) for result in results] == [NotSignedUpError, ScheduleConflictError, type(None)]
+        await storage.signup("Late", "x@mergington.edu")
+        storage.close()
+
+        restored = reopen(directory)
+        assert state(restored) == state(store)
+        assert restored.activities_for("x@mergington.edu") == ["Late"]
+
+    @pytest.mark.anyio
+    async def test_existing_directory_ignores_seed(self, seed, tmp_path):
+        """Test that a directory with a snapshot is not reseeded"""
+        directory = str(tmp_path / "journal")
+        JournalStorage(directory, ActivityStore(seed)).close()
+        store = ActivityStore({"Other": seed["Quiet"]})
+        JournalStorage(directory, store).close()
+        assert list(store) == ["Busy", "Quiet"]
+
+    @pytest.mark.anyio
+    async def test_compaction_bounds_replay(self, seed, tmp_path):
+        """Test that old segments are replaced by the snapshot"""
+        directory = tmp_path / "journal"
+        store = ActivityStore(seed)
+        storage = JournalStorage(str(directory), store, compact_every=10)
+        for i in range(95):
+            await storage.signup("Busy", f"s{i}@mergington.edu")
+        storage.close()
+
+        assert sorted(path.name for path in directory.iterdir()) == [
+            "journal-00000010.log", SNAPSHOT_NAME]
+        assert len(list(decode_records((directory / "journal-00000010.log").read_bytes()))) == 5
+        assert state(reopen(str(directory), compact_every=10)) == state(store)
+
+    @pytest.mark.anyio
+    async def test_torn_tail_is_truncated(self, seed, tmp_path):
+        """Test recovery from a record cut off by a crash"""
+        directory = tmp_path / "journal"
+        store = ActivityStore(seed)
+        storage = JournalStorage(str(directory), store)
+        await storage.signup("Busy", "kept@mergington.edu")
+        storage.close()
+        segment = directory / "journal-00000001.log"
+        intact = segment.read_bytes()
+        segment.write_bytes(intact + encode_record([("signup", "Busy", "torn@mergington.edu")])[:-3])
+
+        restored = ActivityStore()
+        storage = JournalStorage(str(directory), restored)
+        assert segment.read_bytes() == intact
+        await storage.signup("Busy", "after@mergington.edu")
+        storage.close()
+        assert reopen(str(directory))["Busy"]["participants"] == ["kept@mergington.edu",
+                                                                 "after@mergington.edu"]
+
+    @pytest.mark.anyio
+    async def test_interrupted_compaction(self, seed, tmp_path):
+        """Test leftovers of a compaction that crashed part way"""
+        directory = tmp_path / "journal"
+        storage = JournalStorage(str(directory), ActivityStore(seed))
+        await storage.signup("Busy", "a@mergington.edu")
+        storage.close()
+        # Crashed before the rename: a partial temporary snapshot and a new,
+        # still empty segment
+        (directory / (SNAPSHOT_NAME + ".tmp")).write_bytes(b"MHSSNAP1\x00")
+        (directory / "journal-00000002.log").touch()
+
+        storage = JournalStorage(str(directory), ActivityStore())
+        await storage.signup("Busy", "b@mergington.edu")
+        storage.close()
+        assert reopen(str(directory))["Busy"]["participants"] == ["a@mergington.edu", "b@mergington.edu"]
+
+    def test_capture_encodes_like_the_store(self, seed, tmp_path):
+        """Test that a snapshot from a capture matches one from plain dicts"""
+        store = ActivityStore(seed)
+        store.signup("Busy", "a@mergington.edu")
+        capture = store.capture()
+        expected = encode_snapshot(store.to_dict(), {name: store.waitlist(name) for name in store}, 3)
+        # Later changes do not leak into the copy
+        store.signup("Busy", "b@mergington.edu")
+        assert encode_capture(capture, 3) == expected
+
+    @pytest.mark.anyio
+    async def test_failed_fsync_fails_the_backend(self, seed, tmp_path, monkeypatch):
+        """Test that a change the journal could not record is never served"""
+        directory = str(tmp_path / "journal")
+        storage = JournalStorage(directory, ActivityStore(seed))
+        await storage.signup("Busy", "kept@mergington.edu")
+
+        def broken_sync(fd):
+            raise OSError("disk on fire")
+
+        monkeypatch.setattr(journal, "_sync", broken_sync)
+        with pytest.raises(JournalError):
+            await storage.signup("Busy", "lost@mergington.edu")
+        for call in (storage.to_dict(), storage.version(), storage.signup("Busy", "next@mergington.edu")):
+            with pytest.raises(JournalError):
+                await call
+        storage.close()
+        monkeypatch.undo()
+        # The record may or may not have reached the disk before fsync failed
+        assert reopen(directory)["Busy"]["participants"].to_list() in (
+            ["kept@mergington.edu"], ["kept@mergington.edu", "lost@mergington.edu"])
+
+    @pytest.mark.anyio
+    async def test_closed_storage_rejects_mutations_untouched(self, seed, tmp_path):
+        """Test that a mutation after close changes nothing in memory"""
+        store = ActivityStore(seed)
+        storage = JournalStorage(str(tmp_path / "journal"), store)
+        storage.close()
+        with pytest.raises(RuntimeError):
+            await storage.signup("Busy", "late@mergington.edu")
+        assert store["Busy"]["participants"] == []
+
+    def test_corrupt_snapshot_refused(self, seed, tmp_path):
+        """Test that a damaged snapshot stops the backend from opening"""
+        directory = tmp_path / "journal"
+        JournalStorage(str(directory), ActivityStore(seed)).close()
+        with open(directory / SNAPSHOT_NAME, "r+b") as file:
+            file.seek(12)
+            file.write(b"\xff")
+        with pytest.raises(JournalError):
+            JournalStorage(str(directory), ActivityStore())
+
+
+class TestCrashRecovery:
+    """Kill a writing process and check what survives"""
+
+    @pytest.mark.parametrize("kill_after", [1, 40, 160])
+    def test_killed_writer_loses_no_acknowledged_operation(self, seed, tmp_path, kill_after):
+        """Test that every operation acknowledged before SIGKILL survives"""
+        directory = str(tmp_path / "journal")
+        writer = subprocess.Popen([sys.executable, "-c", WRITER_SCRIPT, directory, json.dumps(seed)],
+                                  cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+        try:
+            for _ in range(kill_after):
+                acknowledged = int(writer.stdout.readline())
+            os.kill(writer.pid, signal.SIGKILL)
+        finally:
+            writer.wait()
+        # The process may have logged a few more operations than it printed
+        for _ in writer.stdout:
+            acknowledged += 1
+        writer.stdout.close()
+
+        recovered = state(reopen(directory))
+        model = ActivityStore(seed)
+        candidates = []
+        for i in range(acknowledged + 1):
+            model.apply_batch([script_operation(i)])
+        candidates.append(state(model))
+        for i in range(acknowledged + 1, acknowledged + 4):
+            model.apply_batch([script_operation(i)])
+            candidates.append(state(model))
+        assert recovered in candidates
@@ -0,0 +1,138 @@
+"""
+Tests for filtered, paginated and projected activity listings
+"""
+import pytest
+from fastapi import status
+from src.app import activities
+from src.listing import CatalogIndex
+from src.schedule import TimeSlot, parse_day, parse_schedule, parse_time
+
+
+class TestScheduleParsing:
+    """Test parsing of free-text schedules"""
+
+    def test_several_days(self):
+        """Test comma and "and" separated day lists"""
+        assert parse_schedule("Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM") == (
+            TimeSlot(0, 840, 900), TimeSlot(2, 840, 900), TimeSlot(4, 840, 900))
+        assert [slot.day for slot in parse_schedule("Tuesdays and Thursdays, 3:30 PM - 4:30 PM")] == [1, 3]
+
+    def test_morning_times(self):
+        """Test AM times and 12 o'clock edge cases"""
+        assert parse_schedule("Saturdays, 9:00 AM - 11:00 AM") == (TimeSlot(5, 540, 660),)
+        assert parse_schedule("Sundays, 12:00 AM - 12:30 PM") == (TimeSlot(6, 0, 750),)
+
+    def test_unparseable_schedule(self):
+        """Test that free text without a time range has no slots"""
+        assert parse_schedule("By arrangement") == ()
+        assert parse_schedule("Test day, 1:00 PM - 2:00 PM") == ()
+
+    @pytest.mark.parametrize("text,expected", [("Friday", 4), ("fridays", 4), ("Thurs", 3), ("MON", 0)])
+    def test_parse_day(self, text, expected):
+        """Test that day names are matched by prefix, ignoring case and plurals"""
+        assert parse_day(text) == expected
+
+    @pytest.mark.parametrize("text,expected", [("15:30", 930), ("3:30 PM", 930), ("9 am", 540)])
+    def test_parse_time(self, text, expected):
+        """Test that 24-hour and AM/PM times become minutes since midnight"""
+        assert parse_time(text) == expected
+
+    def test_rejects_invalid_input(self):
+        """Test that unknown days and impossible times raise ValueError"""
+        for parse, text in [(parse_day, "Someday"), (parse_time, "25:00"), (parse_time, "13:00 PM")]:
+            with pytest.raises(ValueError):
+                parse(text)
+
+
+class TestListingEndpoint:
+    """Test query parameters on GET /activities"""
+
+    def test_no_parameters_returns_everything(self, client):
+        """Test that the unfiltered response keeps its shape and ETag"""
+        response = client.get("/activities")
+        assert "etag" in response.headers
+        assert "x-next-cursor" not in response.headers
+        assert set(response.json()) == set(activities)
+
+    def test_filter_by_day(self, client):
+        """Test that ?day= matches any of an activity's weekdays"""
+        response = client.get("/activities?day=Friday")
+        assert response.status_code == status.HTTP_200_OK
+        assert list(response.json()) == ["Chess Club", "Gym Class", "Drama Society"]
+
+    def test_filter_by_time(self, client):
+        """Test start and end time bounds"""
+        data = client.get("/activities?starts_after=4:00 PM&ends_before=18:00").json()
+        assert list(data) == ["Basketball Team", "Soccer Club", "Drama Society"]
+
+    def test_text_search_matches_word_prefixes(self, client):
+        """Test that every query word must prefix a word in the name or description"""
+        assert list(client.get("/activities?q=compet").json()) == [
+            "Chess Club", "Basketball Team", "Debate Club", "Science Olympiad"]
+        assert list(client.get("/activities?q=compete science").json()) == ["Science Olympiad"]
+        assert client.get("/activities?q=underwater").json() == {}
+
+    def test_has_spots_tracks_signups(self, client, reset_activities):
+        """Test that the open-capacity filter is rebuilt after a mutation"""
+        activities["Chess Club"]["max_participants"] = 3
+        assert "Chess Club" in client.get("/activities?has_spots=true").json()
+        client.post("/activities/Chess Club/signup?email=last@mergington.edu")
+        assert "Chess Club" not in client.get("/activities?has_spots=true").json()
+
+    def test_field_projection(self, client):
+        """Test that ?fields= returns only the named fields, including counts"""
+        data = client.get("/activities?fields=schedule,participant_count,spots_left").json()
+        assert data["Art Club"] == {"schedule": "Wednesdays, 3:30 PM - 5:00 PM",
+                                    "participant_count": 2, "spots_left": 14}
+
+    def test_cursor_pagination(self, client):
+        """Test that following X-Next-Cursor visits every activity once, in order"""
+        names, cursor = [], None
+        while True:
+            url = "/activities?limit=4" + (f"&cursor={cursor}" if cursor else "")
+            response = client.get(url)
+            page = list(response.json())
+            assert len(page) <= 4
+            names += page
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert names == list(activities)
+
+    def test_pagination_with_filters(self, client):
+        """Test that cursors page through filtered results"""
+        first = client.get("/activities?day=friday&limit=2")
+        assert list(first.json()) == ["Chess Club", "Gym Class"]
+        cursor = first.headers["x-next-cursor"]
+        second = client.get(f"/activities?day=friday&limit=2&cursor={cursor}")
+        assert list(second.json()) == ["Drama Society"]
+        assert "x-next-cursor" not in second.headers
+
+    @pytest.mark.parametrize("query", ["day=Someday", "starts_after=noon", "fields=email",
+                                       "cursor=bm9uZXhpc3RlbnQ"])
+    def test_invalid_parameters(self, client, query):
+        """Test that bad filters, fields and cursors are rejected"""
+        response = client.get(f"/activities?{query}")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_limit_is_bounded(self, client):
+        """Test that oversized pages are rejected by validation"""
+        assert client.get("/activities?limit=0").status_code == 422
+        assert client.get("/activities?limit=100000").status_code == 422
+
+
+class TestCatalogIndex:
+    """Test index reuse between versions"""
+
+    def test_metadata_indexes_reused_when_unchanged(self):
+        """Test that a roster-only change keeps the day, time and text indexes"""
+        data = activities.to_dict()
+        first = CatalogIndex(1, data)
+        data["Chess Club"]["participants"] = data["Chess Club"]["participants"] + ["x@mergington.edu"]
+        second = CatalogIndex(2, data, previous=first)
+        assert second._terms is first._terms
+
+        data["Chess Club"] = {**data["Chess Club"], "schedule": "Mondays, 1:00 PM - 2:00 PM"}
+        third = CatalogIndex(3, data, previous=second)
+        assert third._terms is not second._terms
+        assert "Chess Club" in third.query(day=0)[0]
@@ -0,0 +1,164 @@
+"""
+Tests for the /metrics endpoint and instrumentation
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import status
+from src.metrics import (EVENT_STREAMS, IN_FLIGHT, LOCK_CONTENDED, REQUESTS, Family, MetricsMiddleware,
+                         SlowRequestProfiler, _RouteMetrics, acquire)
+
+
+def sample(text, name):
+    """Value of the sample line starting with ``name`` in exposition text"""
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestMetricTypes:
+    """Test metric objects and text rendering"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that rendered buckets count every observation at or below the bound"""
+        family = Family("histogram", "work_seconds", "Work", bounds=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            family.observe(value)
+        text = family.render()
+        assert sample(text, 'work_seconds_bucket{le="0.1"}') == 2
+        assert sample(text, 'work_seconds_bucket{le="1.0"}') == 3
+        assert sample(text, 'work_seconds_bucket{le="+Inf"}') == 4
+        assert sample(text, "work_seconds_count") == 4
+
+    def test_labeled_children_are_reused(self):
+        """Test that a label combination maps to one preallocated child"""
+        family = Family("counter", "things_total", "Things", ("kind",))
+        assert family.labels("a") is family.labels("a")
+        family.labels("a").inc()
+        family.labels('say "hi"').inc(2)
+        text = family.render()
+        assert sample(text, 'things_total{kind="a"}') == 1
+        assert sample(text, 'things_total{kind="say \\"hi\\""}') == 2
+
+
+class TestMetricsEndpoint:
+    """Test GET /metrics"""
+
+    def test_rejections_counted_per_route_and_status(self, client, reset_activities):
+        """Test that 400 and 404 signups are counted under the route template"""
+        route = "/activities/{activity_name}/signup"
+        before_400 = REQUESTS.labels("POST", route, "400").value
+        before_404 = REQUESTS.labels("POST", route, "404").value
+        client.post("/activities/Chess Club/signup?email=michael@mergington.edu")
+        client.post("/activities/Unknown/signup?email=michael@mergington.edu")
+
+        text = client.get("/metrics").text
+        assert sample(text, f'http_requests_total{{method="POST",route="{route}",status="400"}}') == before_400 + 1
+        assert sample(text, f'http_requests_total{{method="POST",route="{route}",status="404"}}') == before_404 + 1
+        assert sample(text, 'roster_rejections_total{reason="ActivityNotFoundError"}') >= 1
+
+    def test_exposition_content(self, client, reset_activities):
+        """Test latency, serialization and occupancy series"""
+        client.post("/activities/Art Club/signup?email=painter@mergington.edu")
+        client.get("/activities")
+        response = client.get("/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert sample(text, 'http_request_duration_seconds_count{method="GET",route="/activities"}') >= 1
+        assert sample(text, 'activities_serialization_seconds_count{view="snapshot"}') >= 1
+        assert sample(text, 'activity_participants{activity="Art Club"}') == 3
+        assert sample(text, 'activity_capacity{activity="Art Club"}') == 16
+        # The scrape itself is in flight
+        assert sample(text, "http_requests_in_flight") >= 1
+
+
+class TestInstrumentation:
+    """Test lock contention timing and the slow request profiler"""
+
+    def test_only_contended_acquisitions_are_counted(self):
+        """Test that a free lock is taken without recording a wait"""
+        lock = threading.Lock()
+        before = LOCK_CONTENDED.value
+        acquire(lock)
+        lock.release()
+        assert LOCK_CONTENDED.value == before
+
+        lock.acquire()
+        releaser = threading.Timer(0.02, lock.release)
+        releaser.start()
+        acquire(lock)
+        lock.release()
+        releaser.join()
+        assert LOCK_CONTENDED.value == before + 1
+
+    def test_profiler_dumps_folded_stacks(self, tmp_path):
+        """Test that slow requests write flamegraph-ready stacks rooted at the route"""
+        output = tmp_path / "slow.folded"
+        profiler = SlowRequestProfiler(str(output), threshold=0.05, interval=0.001)
+        profiler.start()
+        try:
+            started = time.perf_counter()
+            while time.perf_counter() - started < 0.1:
+                sum(range(1000))
+            finished = time.perf_counter()
+            route = _RouteMetrics("GET", "/activities")
+            profiler.request_finished(route, started, started + 0.01)  # fast: ignored
+            assert not output.exists()
+            profiler.request_finished(route, started, finished)
+        finally:
+            profiler.stop()
+
+        lines = output.read_text().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert stack.startswith("GET /activities;")
+        assert int(count) >= 1
+        assert any("test_profiler_dumps_folded_stacks" in line for line in lines)
+
+
+class TestEventStreams:
+    """Test that long-lived event streams are kept apart from requests"""
+
+    @pytest.mark.anyio
+    async def test_stream_leaves_request_metrics(self):
+        """Test that an open stream is counted as a stream and never profiled"""
+        opened, release = asyncio.Event(), asyncio.Event()
+
+        async def streaming_app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/event-stream; charset=utf-8")]})
+            opened.set()
+            await release.wait()
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        class RecordingProfiler:
+            enabled = True
+            finished = []
+
+            def request_finished(self, metrics, started, finished):
+                self.finished.append(metrics.route)
+
+        async def send(message):
+            pass
+
+        profiler = RecordingProfiler()
+        middleware = MetricsMiddleware(streaming_app, profiler=profiler)
+        in_flight, streams = IN_FLIGHT.value, EVENT_STREAMS.value
+        scope = {"type": "http", "method": "GET", "path": "/events"}
+        duration = middleware._metrics_for(scope).duration
+        observed = duration.sum
+        task = asyncio.create_task(middleware(scope, None, send))
+        await opened.wait()
+        assert (IN_FLIGHT.value, EVENT_STREAMS.value) == (in_flight, streams + 1)
+
+        await asyncio.sleep(0.05)
+        release.set()
+        await task
+        assert (IN_FLIGHT.value, EVENT_STREAMS.value) == (in_flight, streams)
+        assert profiler.finished == []
+        # Timed up to the headers, not the 50 ms the stream stayed open
+        assert duration.sum - observed < 0.05
@@ -0,0 +1,124 @@
+"""
+Tests for the roster store and the student reverse index
+"""
+import pytest
+from fastapi import status
+from src.roster import Activity, ActivityStore, Roster, StudentDirectory
+
+
+class TestRoster:
+    """Test the insertion-ordered roster"""
+
+    def test_keeps_signup_order(self):
+        """Test that iteration follows signup order"""
+        roster = Roster(["b@mergington.edu", "a@mergington.edu"])
+        roster.add("c@mergington.edu")
+        assert roster.to_list() == ["b@mergington.edu", "a@mergington.edu", "c@mergington.edu"]
+
+    def test_add_and_discard_report_changes(self):
+        """Test that add/discard return whether the roster changed"""
+        roster = Roster(["a@mergington.edu"])
+        assert roster.add("a@mergington.edu") is False
+        assert roster.discard("b@mergington.edu") is False
+        assert roster.discard("a@mergington.edu") is True
+        assert len(roster) == 0
+
+    def test_compares_equal_to_lists(self):
+        """Test that rosters compare equal to lists with the same order"""
+        roster = Roster(["a@mergington.edu", "b@mergington.edu"])
+        assert roster == ["a@mergington.edu", "b@mergington.edu"]
+        assert roster != ["b@mergington.edu", "a@mergington.edu"]
+        assert roster.copy() == roster
+
+
+class TestCompactModel:
+    """Test interned students and slotted activity records"""
+
+    def test_directory_interns_each_email_once(self):
+        """Test that equal emails share one dense ID, assigned in order"""
+        students = StudentDirectory()
+        first = students.intern("".join(["a", "@mergington.edu"]))
+        assert students.intern("a@mergington.edu") == first
+        assert students.intern("b@mergington.edu") == first + 1
+        assert students.lookup("c@mergington.edu") is None
+        assert students.emails([first + 1, first]) == ["b@mergington.edu", "a@mergington.edu"]
+
+    def test_store_shares_emails_between_rosters(self, sample_activity):
+        """Test that a student in several activities costs one string"""
+        store = ActivityStore({"One": sample_activity, "Two": sample_activity})
+        for name in store:
+            store.signup(name, "".join(["shared", "@mergington.edu"]))
+        one, two = (store[name]["participants"].to_list()[-1] for name in store)
+        assert one is two
+        assert len(store.students) == 3
+
+    def test_activity_record_acts_like_a_dict(self, sample_activity):
+        """Test that slotted records still read and write like dicts"""
+        record = ActivityStore({"One": sample_activity})["One"]
+        assert isinstance(record, Activity)
+        assert not hasattr(record, "__dict__")
+        assert record["max_participants"] == record.max_participants == 5
+        record["max_participants"] = 6
+        assert {**record}["max_participants"] == 6
+        assert record == {**sample_activity, "max_participants": 6}
+        with pytest.raises(KeyError):
+            record["room"]
+
+
+class TestActivityStore:
+    """Test the activity store and its reverse index"""
+
+    @pytest.fixture
+    def store(self, sample_activity):
+        return ActivityStore({"Test Activity": sample_activity})
+
+    def test_plain_dicts_are_converted(self, store, sample_activity):
+        """Test that assigned activities get a roster without aliasing the input"""
+        assert isinstance(store["Test Activity"]["participants"], Roster)
+        store.signup("Test Activity", "new@mergington.edu")
+        assert "new@mergington.edu" not in sample_activity["participants"]
+
+    def test_reverse_index_follows_mutations(self, store):
+        """Test that activities_for tracks adds and removes"""
+        assert store.activities_for("test1@mergington.edu") == ["Test Activity"]
+        store.signup("Test Activity", "new@mergington.edu")
+        assert store.activities_for("new@mergington.edu") == ["Test Activity"]
+        store.unregister("Test Activity", "new@mergington.edu")
+        assert store.activities_for("new@mergington.edu") == []
+
+    def test_replacing_activity_reindexes(self, store, sample_activity):
+        """Test that overwriting or deleting an activity drops stale index entries"""
+        store["Test Activity"] = {**sample_activity, "participants": ["other@mergington.edu"]}
+        assert store.activities_for("test1@mergington.edu") == []
+        assert store.activities_for("other@mergington.edu") == ["Test Activity"]
+        del store["Test Activity"]
+        assert store.activities_for("other@mergington.edu") == []
+
+    def test_to_dict_is_plain_json(self, store):
+        """Test that to_dict returns plain lists for participants"""
+        data = store.to_dict()
+        assert data["Test Activity"]["participants"] == ["test1@mergington.edu", "test2@mergington.edu"]
+        assert type(data["Test Activity"]["participants"]) is list
+
+
+class TestStudentActivities:
+    """Test the student activities endpoint"""
+
+    def test_lists_student_activities(self, client, reset_activities):
+        """Test that a student's activities follow signups"""
+        email = "multi@mergington.edu"
+        client.post(f"/activities/Chess Club/signup?email={email}")
+        client.post(f"/activities/Art Club/signup?email={email}")
+
+        response = client.get(f"/students/{email}/activities")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == ["Chess Club", "Art Club"]
+
+        client.delete(f"/activities/Chess Club/unregister?email={email}")
+        assert client.get(f"/students/{email}/activities").json() == ["Art Club"]
+
+    def test_unknown_student_has_no_activities(self, client, reset_activities):
+        """Test that an unknown student gets an empty list"""
+        response = client.get("/students/nobody@mergington.edu/activities")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
@@ -0,0 +1,108 @@
+"""
+Tests for schedule overlaps, signup conflicts and student schedules
+"""
+import json
+
+import pytest
+from fastapi import status
+from src.app import activities
+from src.schedule import TimeSlot, find_conflict, format_time, overlaps, parse_schedule
+
+
+class TestOverlaps:
+    """Test slot overlap checks"""
+
+    def test_overlaps(self):
+        """Test that only slots sharing a day and some time overlap"""
+        assert overlaps(TimeSlot(4, 930, 1020), TimeSlot(4, 960, 1080))
+        # Back to back is not a conflict, and neither is another day
+        assert not overlaps(TimeSlot(4, 840, 900), TimeSlot(4, 900, 960))
+        assert not overlaps(TimeSlot(3, 930, 1020), TimeSlot(4, 930, 1020))
+
+    def test_find_conflict(self):
+        """Test that the first overlapping held activity is reported"""
+        programming = parse_schedule("Tuesdays and Thursdays, 3:30 PM - 4:30 PM")
+        held = [("Lunch", parse_schedule("Thursdays, 12:00 PM - 3:30 PM")),
+                ("Unparsed", ()),
+                ("Debate", parse_schedule("Thursdays, 3:30 PM - 4:30 PM")),
+                ("Soccer", parse_schedule("Tuesdays and Thursdays, 4:00 PM - 5:30 PM"))]
+        assert find_conflict(programming, held) == "Debate"
+        assert find_conflict(programming, held[:2]) is None
+        assert find_conflict((), held) is None
+
+    def test_format_time(self):
+        """Test that minutes since midnight are formatted as HH:MM"""
+        assert format_time(930) == "15:30"
+        assert format_time(0) == "00:00"
+
+
+class TestConflictingSignups:
+    """Test the signup endpoint's schedule check"""
+
+    def test_overlapping_signup_refused(self, client, reset_activities):
+        """Test that a signup overlapping a held activity is refused with a 400"""
+        email = "busy@mergington.edu"
+        assert client.post(f"/activities/Programming Class/signup?email={email}").status_code == 200
+        response = client.post(f"/activities/Soccer Club/signup?email={email}")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Schedule conflicts with Programming Class"
+        assert email not in activities["Soccer Club"]["participants"]
+        # Different days, so no conflict
+        assert client.post(f"/activities/Chess Club/signup?email={email}").status_code == 200
+
+    def test_waitlisted_signup_refused(self, client, reset_activities):
+        """Test that a waitlist place blocks overlapping signups until it is given up"""
+        email = "waiting@mergington.edu"
+        programming = activities["Programming Class"]
+        programming["max_participants"] = len(programming["participants"])
+        assert client.post(f"/activities/Programming Class/signup?email={email}").status_code == 202
+        response = client.post(f"/activities/Soccer Club/signup?email={email}")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Schedule conflicts with Programming Class"
+
+        # Promoted into the freed spot without a clash
+        client.delete("/activities/Programming Class/unregister?email=emma@mergington.edu")
+        assert email in programming["participants"]
+        days = [entry["day"] for entry in client.get(f"/students/{email}/schedule").json()["schedule"]]
+        assert days == ["Tuesday", "Thursday"]
+
+    def test_bulk_signups_are_checked(self, client, reset_activities):
+        """Test that bulk imports refuse conflicting signups per operation"""
+        body = [{"activity": name, "email": "bulk@mergington.edu", "op": "signup"}
+                for name in ("Chess Club", "Drama Society", "Gym Class")]
+        response = client.post("/activities/bulk", json=body)
+        results = [json.loads(line) for line in response.text.splitlines()[:-1]]
+        assert [result["status"] for result in results] == [200, 400, 200]
+        assert results[1]["detail"] == "Schedule conflicts with Chess Club"
+
+
+class TestStudentSchedule:
+    """Test the per-student schedule endpoint"""
+
+    def test_week_in_day_and_time_order(self, client, reset_activities):
+        """Test that a student's week is listed by day, then start time"""
+        email = "week@mergington.edu"
+        for name in ("Chess Club", "Gym Class", "Science Olympiad"):
+            client.post(f"/activities/{name}/signup?email={email}")
+        response = client.get(f"/students/{email}/schedule")
+        assert response.status_code == status.HTTP_200_OK
+        assert [(entry["day"], entry["start"], entry["activity"]) for entry in response.json()["schedule"]] == [
+            ("Monday", "14:00", "Gym Class"),
+            ("Wednesday", "14:00", "Gym Class"),
+            ("Friday", "14:00", "Gym Class"),
+            ("Friday", "15:30", "Chess Club"),
+            ("Saturday", "09:00", "Science Olympiad"),
+        ]
+
+    def test_filter_by_day_and_normalized_email(self, client, reset_activities):
+        """Test that the day filter applies and the email is normalized"""
+        response = client.get("/students/ Michael@Mergington.edu/schedule?day=fri")
+        assert response.json() == {"email": "michael@mergington.edu", "schedule": [
+            {"activity": "Chess Club", "day": "Friday", "start": "15:30", "end": "17:00"}]}
+        assert client.get("/students/nobody@mergington.edu/schedule").json()["schedule"] == []
+
+    @pytest.mark.parametrize("url", ["/students/michael@mergington.edu/schedule?day=someday",
+                                     "/students/not-an-email/schedule"])
+    def test_bad_requests(self, client, url):
+        """Test that an unknown day or invalid email is rejected"""
+        assert client.get(url).status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,70 @@
+"""
+Tests for the opt-in fast JSON encoding of responses
+"""
+import pytest
+import src.app as app_module
+from src import serialization
+from src.serialization import FastJSONResponse, encode_json, encode_json_fast
+
+from tests.conftest import SEED_ACTIVITIES
+
+PLAIN_DATA = [
+    SEED_ACTIVITIES,
+    {"detail": "Schedule conflicts with Débat Club ✓", "quote": 'say "hi"\n\t\\', "empty": []},
+    ["a@mergington.edu", 0, -1, 10**12, True, False, None],
+]
+
+
+class TestEncoders:
+    """Test that both encoders agree on plain data"""
+
+    @pytest.mark.parametrize("data", PLAIN_DATA)
+    def test_same_bytes(self, data):
+        """Test that orjson and the standard library produce the same bytes"""
+        assert encode_json_fast(data) == encode_json(data)
+
+    def test_stdlib_fallback(self, monkeypatch):
+        """Test that a missing orjson falls back to the standard library"""
+        monkeypatch.setattr(serialization, "orjson", None)
+        assert encode_json_fast(SEED_ACTIVITIES) == encode_json(SEED_ACTIVITIES)
+
+    def test_response_class(self):
+        """Test that FastJSONResponse renders compact JSON with the usual headers"""
+        response = FastJSONResponse({"message": "Signed up"}, status_code=202)
+        assert response.body == b'{"message":"Signed up"}'
+        assert response.status_code == 202
+        assert response.headers["content-type"] == "application/json"
+
+
+class TestFastMode:
+    """Test that MERGINGTON_FAST_JSON=on changes no response"""
+
+    REQUESTS = [
+        ("GET", "/activities"),
+        ("GET", "/activities?day=friday&fields=participant_count"),
+        ("POST", "/activities/Chess Club/signup?email=fast@mergington.edu"),
+        ("POST", "/activities/Chess Club/signup?email=fast@mergington.edu"),
+        ("GET", "/activities/Chess Club/waitlist"),
+        ("GET", "/students/fast@mergington.edu/activities"),
+        ("GET", "/students/fast@mergington.edu/schedule"),
+        ("DELETE", "/activities/Chess Club/unregister?email=fast@mergington.edu"),
+        ("GET", "/activities/Missing/waitlist"),
+    ]
+
+    def responses(self, client):
+        results = []
+        for method, url in self.REQUESTS:
+            response = client.request(method, url, headers={"Accept-Encoding": "identity"})
+            results.append((response.status_code, response.headers["content-type"], response.content))
+        return results
+
+    def test_same_responses(self, client, reset_activities, monkeypatch):
+        """Test that every endpoint answers byte for byte the same in fast mode"""
+        default = self.responses(client)
+        monkeypatch.setattr(app_module, "json_response", FastJSONResponse)
+        monkeypatch.setattr(app_module, "encode_body", encode_json_fast)
+        monkeypatch.setattr(app_module.activity_snapshots, "encode", encode_json_fast)
+        # Force a fresh snapshot, encoded the fast way
+        app_module.activities.clear()
+        app_module.activities.update(SEED_ACTIVITIES)
+        assert self.responses(client) == default
@@ -0,0 +1,71 @@
+"""
+Tests for the cached /activities snapshot, ETags and compression
+"""
+import gzip
+import json
+
+import pytest
+from fastapi import status
+from src.app import activity_snapshots
+from src.compression import SUPPORTED_ENCODINGS, choose_encoding
+
+
+class TestActivitiesCaching:
+    """Test conditional GET and snapshot reuse for /activities"""
+
+    def test_response_has_strong_etag(self, client, reset_activities):
+        """Test that the listing carries a strong ETag"""
+        response = client.get("/activities", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["etag"]
+        assert etag.startswith('"') and not etag.startswith("W/")
+        assert response.headers["vary"] == "Accept-Encoding"
+
+    def test_if_none_match_returns_304(self, client, reset_activities):
+        """Test that a matching If-None-Match gets 304 without a body"""
+        etag = client.get("/activities").headers["etag"]
+        response = client.get("/activities", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+
+    def test_mutation_changes_etag(self, client, reset_activities):
+        """Test that a signup invalidates the cached snapshot"""
+        etag = client.get("/activities").headers["etag"]
+        client.post("/activities/Chess Club/signup?email=etag@mergington.edu")
+
+        response = client.get("/activities", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+        assert "etag@mergington.edu" in response.json()["Chess Club"]["participants"]
+
+    @pytest.mark.anyio
+    async def test_snapshot_reused_between_mutations(self, client, reset_activities):
+        """Test that reads without mutations reuse the same serialized bytes"""
+        first = await activity_snapshots.current()
+        client.get("/activities")
+        assert await activity_snapshots.current() is first
+
+    def test_gzip_variant(self, client, reset_activities):
+        """Test that gzip is served when accepted and decodes to the same data"""
+        identity = client.get("/activities", headers={"Accept-Encoding": "identity"})
+        with client.stream("GET", "/activities", headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.headers["etag"] != identity.headers["etag"]
+        assert json.loads(gzip.decompress(raw)) == identity.json()
+
+
+class TestChooseEncoding:
+    """Test Accept-Encoding negotiation"""
+
+    @pytest.mark.parametrize("header, expected", [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0", None),
+        ("*;q=0.1", SUPPORTED_ENCODINGS[0]),
+        ("deflate, GZIP;q=0.5", "gzip"),
+    ])
+    def test_negotiation(self, header, expected):
+        """Test that q-values and unsupported codings are respected"""
+        assert choose_encoding(header) == expected
@@ -0,0 +1,286 @@
+"""
+Contract tests shared by every storage backend
+"""
+import asyncio
+
+import pytest
+from src.roster import (
+    ActivityNotFoundError,
+    ActivityStore,
+    AlreadySignedUpError,
+    AlreadyWaitlistedError,
+    NotSignedUpError,
+    RosterError,
+    ScheduleConflictError,
+)
+from src.storage import JournalStorage, MemoryStorage, SQLiteStorage, open_storage
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def seed(sample_activity):
+    return {
+        "Test Activity": sample_activity,
+        "Other Activity": {**sample_activity, "max_participants": 100, "participants": []},
+    }
+
+
+BACKENDS = {
+    "memory": lambda seed, tmp_path: MemoryStorage(ActivityStore(seed)),
+    "journal": lambda seed, tmp_path: JournalStorage(str(tmp_path / "journal"), ActivityStore(seed)),
+    "sqlite": lambda seed, tmp_path: SQLiteStorage(str(tmp_path / "activities.db"), seed=seed),
+}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def storage_kind(request):
+    """Opens the backend under test with a given seed"""
+    return BACKENDS[request.param]
+
+
+@pytest.fixture
+def storage(storage_kind, seed, tmp_path):
+    """Each backend, freshly seeded"""
+    backend = storage_kind(seed, tmp_path)
+    yield backend
+    backend.close()
+
+
+class TestStorageContract:
+    """Behaviour every backend must share"""
+
+    async def test_to_dict_matches_seed(self, storage, seed):
+        """Test that the catalog round-trips with participant order intact"""
+        assert await storage.to_dict() == seed
+
+    async def test_signup_and_unregister(self, storage):
+        """Test that mutations show up in reads and the reverse index"""
+        await storage.signup("Test Activity", "new@mergington.edu")
+        assert (await storage.to_dict())["Test Activity"]["participants"][-1] == "new@mergington.edu"
+        assert await storage.activities_for("new@mergington.edu") == ["Test Activity"]
+
+        await storage.unregister("Test Activity", "new@mergington.edu")
+        assert "new@mergington.edu" not in (await storage.to_dict())["Test Activity"]["participants"]
+        assert await storage.activities_for("new@mergington.edu") == []
+
+    @pytest.mark.parametrize("operation, name, email, error", [
+        ("signup", "Missing", "a@mergington.edu", ActivityNotFoundError),
+        ("signup", "Test Activity", "test1@mergington.edu", AlreadySignedUpError),
+        ("unregister", "Missing", "a@mergington.edu", ActivityNotFoundError),
+        ("unregister", "Test Activity", "nobody@mergington.edu", NotSignedUpError),
+    ])
+    async def test_rejections(self, storage, operation, name, email, error):
+        """Test that every backend raises the same rejection types"""
+        with pytest.raises(error):
+            await getattr(storage, operation)(name, email)
+
+    async def test_capacity_enforced(self, storage):
+        """Test that signups past max_participants join the waitlist"""
+        for i in range(3):
+            assert await storage.signup("Test Activity", f"fill{i}@mergington.edu") is None
+        assert await storage.signup("Test Activity", "late@mergington.edu") == 1
+        assert await storage.signup("Test Activity", "later@mergington.edu") == 2
+        with pytest.raises(AlreadyWaitlistedError):
+            await storage.signup("Test Activity", "late@mergington.edu")
+        assert len((await storage.to_dict())["Test Activity"]["participants"]) == 5
+        assert await storage.activities_for("late@mergington.edu") == []
+
+    async def test_unregister_promotes_head_of_waitlist(self, storage):
+        """Test that a freed spot goes to the first student in line"""
+        for i in range(3):
+            await storage.signup("Test Activity", f"fill{i}@mergington.edu")
+        for email in ("first@mergington.edu", "second@mergington.edu"):
+            await storage.signup("Test Activity", email)
+        version = await storage.version()
+
+        assert await storage.unregister("Test Activity", "test1@mergington.edu") == "first@mergington.edu"
+        participants = (await storage.to_dict())["Test Activity"]["participants"]
+        assert participants[-1] == "first@mergington.edu" and len(participants) == 5
+        assert await storage.activities_for("first@mergington.edu") == ["Test Activity"]
+        assert await storage.waitlist("Test Activity") == ["second@mergington.edu"]
+        assert await storage.waitlist_position("Test Activity", "second@mergington.edu") == 1
+        assert await storage.version() != version
+
+    async def test_leave_waitlist(self, storage):
+        """Test that unregistering a waiting student removes them from the queue"""
+        for i in range(3):
+            await storage.signup("Test Activity", f"fill{i}@mergington.edu")
+        for email in ("a@mergington.edu", "b@mergington.edu", "c@mergington.edu"):
+            await storage.signup("Test Activity", email)
+        assert await storage.unregister("Test Activity", "b@mergington.edu") is None
+        assert await storage.waitlist("Test Activity") == ["a@mergington.edu", "c@mergington.edu"]
+        assert await storage.waitlist_position("Test Activity", "c@mergington.edu") == 2
+        assert await storage.waitlist_position("Test Activity", "b@mergington.edu") is None
+        with pytest.raises(NotSignedUpError):
+            await storage.unregister("Test Activity", "b@mergington.edu")
+        with pytest.raises(ActivityNotFoundError):
+            await storage.waitlist("Missing")
+
+    async def test_version_changes_only_on_mutation(self, storage):
+        """Test that reads and rejections leave the version alone"""
+        version = await storage.version()
+        await storage.to_dict()
+        with pytest.raises(RosterError):
+            await storage.unregister("Test Activity", "nobody@mergington.edu")
+        assert await storage.version() == version
+
+        await storage.signup("Test Activity", "new@mergington.edu")
+        assert await storage.version() != version
+
+    async def test_mutations_report_their_version(self, storage):
+        """Test that versioned=True returns the result with the version committed"""
+        assert await storage.signup("Test Activity", "new@mergington.edu", versioned=True) == (
+            None, await storage.version())
+        results, version = await storage.apply_batch([("unregister", "Test Activity", "new@mergington.edu")],
+                                                     versioned=True)
+        assert results == [None] and version == await storage.version()
+        assert await storage.unregister("Test Activity", "test1@mergington.edu", versioned=True) == (
+            None, await storage.version())
+
+    async def test_schedule_conflicts(self, tmp_path, storage_kind):
+        """Test that overlapping signups are refused and schedules read back"""
+        seed = {
+            "Early": {"description": "", "schedule": "Mondays and Fridays, 3:00 PM - 4:00 PM",
+                      "max_participants": 1, "participants": []},
+            "Late": {"description": "", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+                     "max_participants": 1, "participants": ["full@mergington.edu"]},
+            "After": {"description": "", "schedule": "Fridays, 4:00 PM - 5:00 PM",
+                      "max_participants": 5, "participants": []},
+        }
+        storage = storage_kind(seed, tmp_path)
+        try:
+            await storage.signup("Early", "a@mergington.edu")
+            with pytest.raises(ScheduleConflictError, match="Early"):
+                await storage.signup("Late", "a@mergington.edu")
+            # Joining the waitlist is checked too
+            assert await storage.waitlist("Late") == []
+            await storage.signup("After", "a@mergington.edu")
+            assert await storage.schedule_for("a@mergington.edu") == [
+                (0, 900, 960, "Early"), (4, 900, 960, "Early"), (4, 960, 1020, "After")]
+            assert await storage.schedule_for("nobody@mergington.edu") == []
+
+            await storage.unregister("Early", "a@mergington.edu")
+            with pytest.raises(ScheduleConflictError, match="After"):
+                await storage.signup("Late", "a@mergington.edu")
+        finally:
+            storage.close()
+
+    async def test_rejection_order(self, tmp_path, storage_kind):
+        """Test that every backend picks the same error when several apply"""
+        seed = {
+            "Full": {"description": "", "schedule": "Fridays, 3:00 PM - 4:00 PM",
+                     "max_participants": 1, "participants": ["full@mergington.edu"]},
+            "Overlapping": {"description": "", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+                            "max_participants": 5, "participants": []},
+        }
+        storage = storage_kind(seed, tmp_path)
+        try:
+            assert await storage.signup("Full", "a@mergington.edu") == 1
+            # Not a conflict with the waitlist place itself
+            with pytest.raises(AlreadyWaitlistedError):
+                await storage.signup("Full", "a@mergington.edu")
+            await storage.signup("Overlapping", "b@mergington.edu")
+            with pytest.raises(AlreadySignedUpError):
+                await storage.signup("Overlapping", "b@mergington.edu")
+        finally:
+            storage.close()
+
+    async def test_waitlist_places_count_as_held(self, tmp_path, storage_kind):
+        """Test that a waitlisted student cannot be promoted into an overlap"""
+        seed = {
+            "Full": {"description": "", "schedule": "Mondays, 3:00 PM - 4:00 PM",
+                     "max_participants": 1, "participants": ["full@mergington.edu"]},
+            "Overlapping": {"description": "", "schedule": "Mondays, 3:30 PM - 4:30 PM",
+                            "max_participants": 5, "participants": []},
+        }
+        storage = storage_kind(seed, tmp_path)
+        try:
+            assert await storage.signup("Full", "a@mergington.edu") == 1
+            with pytest.raises(ScheduleConflictError, match="Full"):
+                await storage.signup("Overlapping", "a@mergington.edu")
+            results = await storage.apply_batch([("signup", "Overlapping", "a@mergington.edu")])
+            assert isinstance(results[0], ScheduleConflictError)
+
+            assert await storage.unregister("Full", "full@mergington.edu") == "a@mergington.edu"
+            assert await storage.schedule_for("a@mergington.edu") == [(0, 900, 960, "Full")]
+
+            # Leaving a waitlist gives its slots back
+            assert await storage.signup("Full", "b@mergington.edu") == 1
+            await storage.unregister("Full", "b@mergington.edu")
+            assert await storage.signup("Overlapping", "b@mergington.edu") is None
+        finally:
+            storage.close()
+
+    async def test_batch_runs_in_order(self, tmp_path, storage_kind):
+        """Test that a batch's conflict checks see its earlier operations only"""
+        seed = {
+            "Early": {"description": "", "schedule": "Mondays, 3:00 PM - 4:00 PM",
+                      "max_participants": 5, "participants": ["x@mergington.edu"]},
+            "Late": {"description": "", "schedule": "Mondays, 3:30 PM - 4:30 PM",
+                     "max_participants": 5, "participants": []},
+        }
+        storage = storage_kind(seed, tmp_path)
+        try:
+            results = await storage.apply_batch([("signup", "Early", "w@mergington.edu"),
+                                                 ("signup", "Late", "x@mergington.edu"),
+                                                 ("unregister", "Early", "x@mergington.edu")])
+            assert results[0] is None and results[2] is None
+            assert isinstance(results[1], ScheduleConflictError)
+            assert await storage.activities_for("x@mergington.edu") == []
+        finally:
+            storage.close()
+
+    async def test_concurrent_signups_do_not_overbook(self, storage):
+        """Test that concurrent signups respect capacity"""
+        async def attempt(i):
+            return await storage.signup("Other Activity", f"student{i}@mergington.edu") is None
+
+        admitted = sum(await asyncio.gather(*(attempt(i) for i in range(300))))
+        assert admitted == 100
+        assert len((await storage.to_dict())["Other Activity"]["participants"]) == 100
+
+
+class TestSQLiteStorage:
+    """Behaviour specific to the SQLite backend"""
+
+    async def test_rosters_survive_reopen(self, seed, tmp_path):
+        """Test that signups persist and the seed is not reapplied"""
+        path = str(tmp_path / "activities.db")
+        storage = SQLiteStorage(path, seed=seed)
+        await storage.signup("Test Activity", "durable@mergington.edu")
+        storage.close()
+
+        reopened = SQLiteStorage(path, seed={})
+        try:
+            assert "durable@mergington.edu" in (await reopened.to_dict())["Test Activity"]["participants"]
+        finally:
+            reopened.close()
+
+    def test_uses_wal_mode(self, seed, tmp_path):
+        """Test that the database is switched to write-ahead logging"""
+        storage = SQLiteStorage(str(tmp_path / "activities.db"), seed=seed)
+        try:
+            with storage._pool.connection() as conn:
+                assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        finally:
+            storage.close()
+
+    async def test_open_storage_urls(self, seed, tmp_path):
+        """Test that storage URLs select the backend"""
+        store = ActivityStore(seed)
+        assert isinstance(open_storage("memory", store), MemoryStorage)
+        sqlite = open_storage(f"sqlite:///{tmp_path / 'activities.db'}", store)
+        try:
+            assert isinstance(sqlite, SQLiteStorage)
+            assert await sqlite.to_dict() == seed
+        finally:
+            sqlite.close()
+        journal = open_storage(f"journal:///{tmp_path / 'journal'}", store)
+        try:
+            assert isinstance(journal, JournalStorage)
+            assert await journal.to_dict() == seed
+        finally:
+            journal.close()
+        with pytest.raises(ValueError):
+            open_storage("postgres://example", store)
@@ -0,0 +1,120 @@
+"""
+Tests for activity waitlists and promotion on unregister
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import status
+from src.app import activities, roster_events
+from src.roster import ActivityStore
+from src.waitlist import FenwickTree, Waitlist
+
+
+def fill(client, name):
+    """Sign up students until ``name`` is full"""
+    activity = activities[name]
+    for i in range(activity["max_participants"] - len(activity["participants"])):
+        client.post(f"/activities/{name}/signup?email=fill{i}@mergington.edu")
+
+
+class TestWaitlist:
+    """Test the waitlist data structure"""
+
+    def test_fenwick_prefix_sums(self):
+        """Test that prefix sums count the set slots at or before each slot"""
+        tree = FenwickTree(10)
+        for slot in (0, 3, 4, 9):
+            tree.add(slot, 1)
+        assert [tree.prefix_sum(slot) for slot in range(10)] == [1, 1, 1, 2, 3, 3, 3, 3, 3, 4]
+
+    def test_fifo_order_and_positions(self):
+        """Test that positions shift as earlier students leave"""
+        waitlist = Waitlist()
+        assert [waitlist.push(email) for email in "abcde"] == [1, 2, 3, 4, 5]
+        assert waitlist.remove("b")
+        assert not waitlist.remove("b")
+        assert waitlist.pop() == "a"
+        assert [waitlist.position(email) for email in "cde"] == [1, 2, 3]
+        assert waitlist.position("a") is None
+        assert list(waitlist) == ["c", "d", "e"]
+
+    def test_matches_list_model_through_compactions(self):
+        """Test random churn well past the initial tree size against a plain list"""
+        rng = random.Random(7)
+        waitlist, model = Waitlist(), []
+        for step in range(5000):
+            roll = rng.random()
+            if roll < 0.5:
+                email = f"s{step}"
+                assert waitlist.push(email) == len(model) + 1
+                model.append(email)
+            elif roll < 0.75 and model:
+                assert waitlist.pop() == model.pop(0)
+            elif model:
+                email = rng.choice(model)
+                waitlist.remove(email)
+                model.remove(email)
+        assert list(waitlist) == model
+        assert all(waitlist.position(email) == i + 1 for i, email in enumerate(model))
+        assert waitlist.pop() == (model[0] if model else None)
+
+    def test_promotion_under_contention(self, sample_activity):
+        """Test that concurrent churn never overbooks or loses a waiting student"""
+        store = ActivityStore({"Busy": {**sample_activity, "max_participants": 10, "participants": []}})
+        emails = [f"student{i}@mergington.edu" for i in range(200)]
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(lambda email: store.signup("Busy", email), emails))
+        enrolled = store["Busy"]["participants"].to_list()
+        waiting = store.waitlist("Busy")
+        assert sorted(enrolled + waiting) == sorted(emails)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(lambda email: store.unregister("Busy", email), enrolled[:5]))
+        # Each promotion takes the head in turn, so they join in queue order
+        assert store["Busy"]["participants"].to_list() == enrolled[5:] + waiting[:5]
+        assert store.waitlist("Busy") == waiting[5:]
+
+
+class TestWaitlistEndpoints:
+    """Test the HTTP side of waitlists"""
+
+    def test_unregister_promotes_and_publishes(self, client, reset_activities):
+        """Test that the promoted student is announced like a normal signup"""
+        fill(client, "Debate Club")
+        client.post("/activities/Debate Club/signup?email=next@mergington.edu")
+        subscription = roster_events.subscribe()
+        try:
+            response = client.delete("/activities/Debate Club/unregister?email=ava@mergington.edu")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["promoted"] == "next@mergington.edu"
+            removed = subscription.queue.get_nowait()
+            added = subscription.queue.get_nowait()
+        finally:
+            roster_events.unsubscribe(subscription)
+        assert (removed["email"], removed["change"]) == ("ava@mergington.edu", "removed")
+        assert (added["email"], added["change"]) == ("next@mergington.edu", "added")
+        assert "next@mergington.edu" in activities["Debate Club"]["participants"]
+
+    def test_waitlist_and_position(self, client, reset_activities):
+        """Test listing a waitlist and looking up one student's place"""
+        fill(client, "Art Club")
+        for email in ("one@mergington.edu", "two@mergington.edu"):
+            client.post(f"/activities/Art Club/signup?email={email}")
+
+        response = client.get("/activities/Art Club/waitlist")
+        assert response.json() == {"activity": "Art Club",
+                                   "waitlist": ["one@mergington.edu", "two@mergington.edu"]}
+        response = client.get("/activities/Art Club/waitlist?email=two@mergington.edu")
+        assert response.json()["position"] == 2
+
+    def test_duplicate_and_missing_waitlist_entries(self, client, reset_activities):
+        """Test repeated joins and lookups of students who are not waiting"""
+        fill(client, "Art Club")
+        client.post("/activities/Art Club/signup?email=one@mergington.edu")
+        response = client.post("/activities/Art Club/signup?email=one@mergington.edu")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "waitlist" in response.json()["detail"].lower()
+
+        response = client.get("/activities/Art Club/waitlist?email=zoe@mergington.edu")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert client.get("/activities/Nope/waitlist").status_code == status.HTTP_404_NOT_FOUND
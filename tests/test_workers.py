@@ -0,0 +1,101 @@
+"""
+Tests for running several worker processes against shared storage
+"""
+import json
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+from src.serve import DEFAULT_SHARED_STORAGE, resolve_storage
+from src.snapshot import SnapshotCache
+from src.storage import SQLiteStorage
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+WORKER_SCRIPT = textwrap.dedent("""
+    import asyncio, json, sys
+    from src.storage import SQLiteStorage
+
+    async def main(path, worker):
+        storage = SQLiteStorage(path)
+        admitted = 0
+        for i in range(50):
+            # Signups past capacity return a waitlist position
+            if await storage.signup("Shared", f"w{worker}-{i}@mergington.edu") is None:
+                admitted += 1
+        storage.close()
+        return admitted
+
+    print(json.dumps(asyncio.run(main(sys.argv[1], int(sys.argv[2])))))
+""")
+
+
+@pytest.fixture
+def db_path(tmp_path, sample_activity):
+    path = str(tmp_path / "activities.db")
+    SQLiteStorage(path, seed={
+        "Shared": {**sample_activity, "max_participants": 120, "participants": []},
+    }).close()
+    return path
+
+
+class TestResolveStorage:
+    """Test storage selection for the worker count"""
+
+    def test_single_worker_defaults_to_memory(self, monkeypatch):
+        """Test that one worker keeps the memory backend by default"""
+        monkeypatch.delenv("MERGINGTON_STORAGE", raising=False)
+        assert resolve_storage(1, None) == "memory"
+
+    def test_multiple_workers_default_to_sqlite(self, monkeypatch):
+        """Test that several workers default to the shared SQLite file"""
+        monkeypatch.delenv("MERGINGTON_STORAGE", raising=False)
+        assert resolve_storage(4, None) == DEFAULT_SHARED_STORAGE
+
+    def test_memory_rejected_for_multiple_workers(self):
+        """Test that per-process backends are refused for several workers"""
+        with pytest.raises(ValueError):
+            resolve_storage(2, "memory")
+        with pytest.raises(ValueError):
+            resolve_storage(2, "journal:///tmp/activities")
+
+
+class TestSharedSQLite:
+    """Test that separate storage instances behave like one database"""
+
+    @pytest.mark.anyio
+    async def test_writes_visible_to_other_instances(self, db_path):
+        """Test that a second instance sees writes and drops its stale snapshot"""
+        first, second = SQLiteStorage(db_path), SQLiteStorage(db_path)
+        try:
+            snapshots = SnapshotCache(second)
+            before = await snapshots.current()
+            await first.signup("Shared", "cross@mergington.edu")
+
+            after = await snapshots.current()
+            assert after is not before
+            assert "cross@mergington.edu" in json.loads(after.body)["Shared"]["participants"]
+            assert await second.activities_for("cross@mergington.edu") == ["Shared"]
+        finally:
+            first.close()
+            second.close()
+
+    @pytest.mark.anyio
+    async def test_processes_cannot_overbook(self, db_path):
+        """Test that signups from several processes respect capacity"""
+        workers = [
+            subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT, db_path, str(worker)],
+                             cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+            for worker in range(4)
+        ]
+        admitted = sum(json.loads(worker.communicate(timeout=60)[0]) for worker in workers)
+
+        storage = SQLiteStorage(db_path)
+        try:
+            assert admitted == 120
+            assert len((await storage.to_dict())["Shared"]["participants"]) == 120
+            assert len(await storage.waitlist("Shared")) == 80
+        finally:
+            storage.close()